@@ -0,0 +1,346 @@
+"""
+Backtester for Elliott Wave Trading Signals
+===========================================
+
+Replays the signal generation of ElliottWaveTradingSystem bar by bar over the candles of the candle
+cache and simulates the SL/TP exits of the signals.
+
+- Analysis: every bar sees the same window of candles analyze_symbol would see live, the wave search
+  is updated incrementally (streaming mode) instead of being recomputed for every window
+- Exits: the price path after every entry is scanned for the stop loss / take profit with NumPy for
+  all trades at once
+- Report: trades, win rate, expectancy and max drawdown per (symbol, interval)
+
+Pairs are replayed in parallel processes.
+
+Usage:
+    python backtester.py --symbols BTCUSDT ETHUSDT --intervals 1h --days 365 --download
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from candle_cache import CandleCache
+
+
+def first_exits(direction, entry_bars, stop_losses, take_profits, highs, lows, max_holding):
+    """
+    First bar hitting the stop loss or take profit of every trade, vectorized over all trades
+
+    Args:
+        direction: 1 for long, -1 for short, per trade
+        entry_bars: Bar index of the entries (the exit is searched from the next bar on)
+        stop_losses: Stop loss price per trade
+        take_profits: Take profit price per trade
+        highs: High of every bar
+        lows: Low of every bar
+        max_holding: Maximum number of bars a trade is held
+
+    Returns:
+        Tuple of exit bar and exit reason per trade: 'STOP_LOSS', 'TAKE_PROFIT', 'TIME' (held max_holding
+        bars) or 'OPEN' (data ended first). If both levels are hit in the same bar the stop loss is assumed.
+    """
+    n = len(highs)
+    # pad, so every entry has a full window of max_holding bars after it
+    padded_highs = np.concatenate([highs, np.full(max_holding + 1, np.nan)])
+    padded_lows = np.concatenate([lows, np.full(max_holding + 1, np.nan)])
+    window_highs = sliding_window_view(padded_highs, max_holding)[entry_bars + 1]
+    window_lows = sliding_window_view(padded_lows, max_holding)[entry_bars + 1]
+
+    long = (direction > 0)[:, None]
+    stop_hit = np.where(long, window_lows <= stop_losses[:, None], window_highs >= stop_losses[:, None])
+    target_hit = np.where(long, window_highs >= take_profits[:, None], window_lows <= take_profits[:, None])
+
+    # index of the first hit, max_holding if never hit
+    first_stop = np.where(stop_hit.any(axis=1), stop_hit.argmax(axis=1), max_holding)
+    first_target = np.where(target_hit.any(axis=1), target_hit.argmax(axis=1), max_holding)
+    first_hit = np.minimum(first_stop, first_target)
+
+    exit_bars = entry_bars + 1 + np.minimum(first_hit, max_holding - 1)
+    reasons = np.where(first_stop <= first_target, 'STOP_LOSS', 'TAKE_PROFIT').astype(object)
+    reasons[first_hit == max_holding] = 'TIME'
+
+    beyond = exit_bars >= n
+    exit_bars[beyond] = n - 1
+    reasons[beyond & (first_hit == max_holding)] = 'OPEN'
+    return exit_bars, reasons
+
+
+def performance(returns):
+    """
+    Performance figures of a sequence of trade returns
+
+    Args:
+        returns: Return per trade as fraction of the entry price (after fees), in the order of the trades
+
+    Returns:
+        Dict with trades, win_rate, expectancy (mean return per trade), avg_win, avg_loss, profit_factor,
+        total_return (sum of the returns) and max_drawdown (largest fall of the cumulative return)
+    """
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) == 0:
+        return {'trades': 0, 'win_rate': 0.0, 'expectancy': 0.0, 'avg_win': 0.0, 'avg_loss': 0.0,
+                'profit_factor': 0.0, 'total_return': 0.0, 'max_drawdown': 0.0}
+
+    wins = returns[returns > 0]
+    losses = returns[returns <= 0]
+    equity = np.concatenate([[0.0], np.cumsum(returns)])
+
+    return {
+        'trades': len(returns),
+        'win_rate': len(wins) / len(returns),
+        'expectancy': float(returns.mean()),
+        'avg_win': float(wins.mean()) if len(wins) else 0.0,
+        'avg_loss': float(losses.mean()) if len(losses) else 0.0,
+        'profit_factor': float(wins.sum() / -losses.sum()) if losses.sum() < 0 else float('inf'),
+        'total_return': float(equity[-1]),
+        'max_drawdown': float((np.maximum.accumulate(equity) - equity).max()),
+    }
+
+
+class Backtester:
+    """
+    Replays ElliottWaveTradingSystem signals over cached candles and simulates their SL/TP exits
+    """
+
+    def __init__(self, lookback=500, min_confidence=0.45, min_risk_reward=1.2, fee_rate=0.0004,
+                 max_holding_bars=500, max_skip_value=15, pivot_atr=None):
+        """
+        Initialize the backtester
+
+        Args:
+            lookback: Candles analyzed per bar (as analyze_symbol fetches them)
+            min_confidence: Minimum confidence of a traded signal (see bot config)
+            min_risk_reward: Minimum risk/reward ratio of a traded signal
+            fee_rate: Fee per side as fraction of the traded value (taker fee)
+            max_holding_bars: Trades are closed after this many bars at the close
+            max_skip_value: Max skip value of the WaveOptions of the trading system
+            pivot_atr: Start the wave search at swing lows (see ElliottWaveTradingSystem)
+        """
+        self.lookback = lookback
+        self.min_confidence = min_confidence
+        self.min_risk_reward = min_risk_reward
+        self.fee_rate = fee_rate
+        self.max_holding_bars = max_holding_bars
+        self.max_skip_value = max_skip_value
+        self.pivot_atr = pivot_atr
+
+    def signals(self, df, symbol, interval):
+        """
+        Signals of every bar, as the trading system would have generated them when the bar closed
+
+        Args:
+            df: Candles in the format of BinanceDataFetcher.get_futures_klines
+            symbol: Trading pair (e.g., 'BTCUSDT')
+            interval: Timeframe of df
+
+        Returns:
+            List of (bar index, signal) of the first valid signal of every bar
+        """
+        from elliott_wave_trading_system import ElliottWaveTradingSystem
+
+        signals = []
+        system = ElliottWaveTradingSystem(streaming=True, pivot_atr=self.pivot_atr)
+        system.max_skip_value = self.max_skip_value
+
+        for bar in range(self.lookback - 1, len(df)):
+            window = df.iloc[bar - self.lookback + 1:bar + 1]
+            results = system.analyze_dataframe(window, symbol, interval)
+
+            for signal in results['signals']:
+                if self._is_valid(signal):
+                    signals.append((bar, signal))
+                    break
+        return signals
+
+    def _is_valid(self, signal):
+        """Signal passes the bot filters and its levels are on the right side of the entry"""
+        if signal['confidence'] < self.min_confidence or signal['risk_reward_ratio'] < self.min_risk_reward:
+            return False
+        if signal['type'] == 'BUY':
+            return signal['stop_loss'] < signal['entry_price'] < signal['take_profit_1']
+        return signal['take_profit_1'] < signal['entry_price'] < signal['stop_loss']
+
+    def simulate(self, df, signals):
+        """
+        Simulate the trades of the signals, one position at a time: signals while a trade is open are skipped
+
+        Args:
+            df: Candles the signals were generated on
+            signals: List of (bar index, signal), see signals()
+
+        Returns:
+            List of trade dicts (entry / exit bar, date and price, type, exit reason, return)
+        """
+        if not signals:
+            return []
+
+        entry_bars = np.array([bar for bar, _ in signals])
+        direction = np.array([1 if signal['type'] == 'BUY' else -1 for _, signal in signals])
+        entry_prices = np.array([signal['entry_price'] for _, signal in signals])
+        stop_losses = np.array([signal['stop_loss'] for _, signal in signals])
+        take_profits = np.array([signal['take_profit_1'] for _, signal in signals])
+
+        highs = np.asarray(df['High'], dtype=float)
+        lows = np.asarray(df['Low'], dtype=float)
+        closes = np.asarray(df['Close'], dtype=float)
+        dates = np.asarray(df['Date'])
+
+        # exits of all candidate trades at once, they do not depend on each other
+        exit_bars, reasons = first_exits(direction, entry_bars, stop_losses, take_profits, highs, lows,
+                                         self.max_holding_bars)
+        exit_prices = np.select([reasons == 'STOP_LOSS', reasons == 'TAKE_PROFIT'], [stop_losses, take_profits],
+                                closes[exit_bars])
+        returns = direction * (exit_prices - entry_prices) / entry_prices - 2 * self.fee_rate
+
+        trades = []
+        free_from = 0
+        for i, (bar, signal) in enumerate(signals):
+            if bar < free_from:
+                continue
+            free_from = exit_bars[i] + 1
+            trades.append({
+                'entry_bar': int(bar),
+                'entry_date': dates[bar],
+                'type': signal['type'],
+                'rule': signal['rule'],
+                'confidence': signal['confidence'],
+                'entry_price': float(entry_prices[i]),
+                'stop_loss': float(stop_losses[i]),
+                'take_profit': float(take_profits[i]),
+                'exit_bar': int(exit_bars[i]),
+                'exit_date': dates[exit_bars[i]],
+                'exit_price': float(exit_prices[i]),
+                'exit_reason': reasons[i],
+                'return': float(returns[i]),
+            })
+        return trades
+
+    def run_pair(self, df, symbol, interval):
+        """
+        Backtest one (symbol, interval)
+
+        Returns:
+            Dict with symbol, interval, bars, seconds, trades (list) and the performance figures
+        """
+        started = time.perf_counter()
+        trades = self.simulate(df, self.signals(df, symbol, interval))
+        closed = [trade['return'] for trade in trades if trade['exit_reason'] != 'OPEN']
+
+        result = {'symbol': symbol, 'interval': interval, 'bars': len(df), 'trades_list': trades}
+        result.update(performance(closed))
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+    def run(self, pairs, load, workers=None):
+        """
+        Backtest many (symbol, interval) pairs in parallel processes
+
+        Args:
+            pairs: List of (symbol, interval)
+            load: Picklable callable load(symbol, interval) returning the candles as DataFrame (or None)
+            workers: Number of processes (default: no. of CPUs, 0: in this process)
+
+        Returns:
+            List of the results of run_pair in the order of the pairs, pairs without candles are left out
+        """
+        if workers == 0:
+            results = [_run_pair(self, load, symbol, interval) for symbol, interval in pairs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+                futures = [pool.submit(_run_pair, self, load, symbol, interval) for symbol, interval in pairs]
+                results = [future.result() for future in futures]
+        return [result for result in results if result is not None]
+
+
+def _run_pair(backtester, load, symbol, interval):
+    df = load(symbol, interval)
+    if df is None or len(df) < backtester.lookback:
+        print(f"⚠️ Not enough candles for {symbol} {interval}, skipping")
+        return None
+    result = backtester.run_pair(df, symbol, interval)
+    print(f"✅ {symbol} {interval}: {result['trades']} trades on {result['bars']} bars in {result['seconds']:.1f}s")
+    return result
+
+
+class CachedCandles:
+    """Picklable loader of the candles of the last [days] days from the candle cache"""
+
+    def __init__(self, cache_dir, days=None):
+        self.cache_dir = cache_dir
+        self.days = days
+
+    def __call__(self, symbol, interval):
+        from binance_data_fetcher import BinanceDataFetcher
+
+        candles = CandleCache(self.cache_dir).load(symbol, interval)
+        if self.days is not None and len(candles) > 0:
+            candles = candles[candles['open_time'] >= candles['open_time'][-1] - self.days * 24 * 3600 * 1000]
+        if len(candles) == 0:
+            return None
+        return BinanceDataFetcher.candles_to_dataframe(np.array(candles))
+
+
+def download_history(cache_dir, pairs, days):
+    """Fill the candle cache with the closed candles of the last [days] days of every pair"""
+    from binance_data_fetcher import BinanceDataFetcher
+
+    fetcher = BinanceDataFetcher(testnet=False, cache_dir=cache_dir)
+    for symbol, interval in pairs:
+        start_ms = int(time.time() * 1000) - days * 24 * 3600 * 1000
+        count = fetcher.candle_cache.backfill(symbol, interval, start_ms, fetcher._fetch_klines)
+        print(f"💾 {symbol} {interval}: {count} candles cached")
+
+
+def print_report(results):
+    """Print the performance per (symbol, interval) and over all pairs"""
+    print("\n📊 BACKTEST RESULTS")
+    print("=" * 96)
+    print(f"{'Pair':<18}{'Bars':>7}{'Trades':>8}{'Win rate':>10}{'Expectancy':>12}{'Profit factor':>15}"
+          f"{'Total':>10}{'Max DD':>10}")
+    for result in results:
+        print(f"{result['symbol'] + ' ' + result['interval']:<18}{result['bars']:>7}{result['trades']:>8}"
+              f"{result['win_rate']:>10.1%}{result['expectancy']:>12.2%}{result['profit_factor']:>15.2f}"
+              f"{result['total_return']:>10.1%}{result['max_drawdown']:>10.1%}")
+
+    overall = performance([trade['return'] for result in results for trade in result['trades_list']
+                           if trade['exit_reason'] != 'OPEN'])
+    print("-" * 96)
+    print(f"{'All pairs':<18}{sum(result['bars'] for result in results):>7}{overall['trades']:>8}"
+          f"{overall['win_rate']:>10.1%}{overall['expectancy']:>12.2%}{overall['profit_factor']:>15.2f}"
+          f"{overall['total_return']:>10.1%}{overall['max_drawdown']:>10.1%}")
+    print("=" * 96)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Backtest the Elliott Wave signals over cached candles')
+    parser.add_argument('--symbols', nargs='+', default=['BTCUSDT', 'ETHUSDT'])
+    parser.add_argument('--intervals', nargs='+', default=['1h'])
+    parser.add_argument('--days', type=int, default=365, help='days of candles to replay')
+    parser.add_argument('--cache-dir', default=os.getenv('CANDLE_CACHE_DIR') or 'data/candles')
+    parser.add_argument('--download', action='store_true', help='fill the candle cache from Binance first')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: no. of CPUs)')
+    parser.add_argument('--fee-rate', type=float, default=0.0004, help='fee per side')
+    parser.add_argument('--pivot-atr', type=float, default=None,
+                        help='start the wave search at swing lows of this many average candle ranges')
+    args = parser.parse_args(argv)
+
+    pairs = [(symbol, interval) for symbol in args.symbols for interval in args.intervals]
+    if args.download:
+        download_history(args.cache_dir, pairs, args.days)
+
+    started = time.perf_counter()
+    results = Backtester(fee_rate=args.fee_rate, pivot_atr=args.pivot_atr).run(
+        pairs, CachedCandles(args.cache_dir, args.days), args.workers)
+    print_report(results)
+    print(f"⏱️ {len(pairs)} pairs replayed in {time.perf_counter() - started:.0f}s")
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+"""
+Benchmarks of the Elliott Wave engine
+=====================================
+
+asv style benchmark classes (bench_*.py) with setup() and time_* methods, run by
+
+    python -m benchmarks.run                      # all benchmarks, results appended to the history
+    python -m benchmarks.run -b Kernels --quick   # only matching benchmarks, one repeat
+    python -m benchmarks.run --record BTCUSDT:1h  # store recorded candles for the *_recorded benchmarks
+
+Every run is compared to the previous run of the same machine in benchmarks/results/.
+"""
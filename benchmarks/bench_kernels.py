@@ -0,0 +1,72 @@
+"""
+Benchmarks of the numba kernels in models/functions.py
+"""
+
+import numpy as np
+
+from benchmarks.fixtures import SIZES, synthetic_ohlc
+from models.functions import hi, lo, next_hi, next_lo, up_end, down_end, find_pivots, atr_swing
+from models.MonoWaveIndex import MonoWaveIndex
+
+NO_OF_STARTS = 1000
+
+
+class Kernels:
+    """Every kernel called from NO_OF_STARTS start indices spread over the series"""
+    params = SIZES
+    param_names = ['bars']
+
+    def setup(self, bars):
+        df = synthetic_ohlc(bars)
+        self.lows = np.array(df['Low'])
+        self.highs = np.array(df['High'])
+        self.starts = np.linspace(0, bars - 20, NO_OF_STARTS).astype(np.int64).tolist()
+        self.prev_highs = [self.highs[idx] for idx in self.starts]
+        self.prev_lows = [self.lows[idx] for idx in self.starts]
+
+        # compile before timing
+        hi(self.lows, self.highs, 0)
+        lo(self.lows, self.highs, 0)
+        next_hi(self.lows, self.highs, 0, self.highs[0])
+        next_lo(self.lows, self.highs, 0, self.lows[0])
+        up_end(self.lows, self.highs, 0, 0)
+        down_end(self.lows, self.highs, 0, 0)
+        self.index = MonoWaveIndex(self.lows, self.highs)
+        self.index.build(max_skip=15)
+        self.min_swing = atr_swing(self.lows, self.highs)
+        find_pivots(self.lows, self.highs, self.min_swing)
+
+    def time_hi(self, bars):
+        for idx in self.starts:
+            hi(self.lows, self.highs, idx)
+
+    def time_lo(self, bars):
+        for idx in self.starts:
+            lo(self.lows, self.highs, idx)
+
+    def time_next_hi(self, bars):
+        for idx, prev_high in zip(self.starts, self.prev_highs):
+            next_hi(self.lows, self.highs, idx, prev_high)
+
+    def time_next_lo(self, bars):
+        for idx, prev_low in zip(self.starts, self.prev_lows):
+            next_lo(self.lows, self.highs, idx, prev_low)
+
+    def time_up_end(self, bars):
+        for idx in self.starts:
+            up_end(self.lows, self.highs, idx, 3)
+
+    def time_down_end(self, bars):
+        for idx in self.starts:
+            down_end(self.lows, self.highs, idx, 3)
+
+    def time_index_build(self, bars):
+        MonoWaveIndex(self.lows, self.highs).build(max_skip=15)
+
+    def time_index_lookup(self, bars):
+        for idx in self.starts:
+            self.index.up_end(idx, 3)
+            self.index.down_end(idx, 3)
+
+    def time_pivots(self, bars):
+        find_pivots(self.lows, self.highs, self.min_swing)
@@ -0,0 +1,34 @@
+"""
+Benchmarks of the MonoWave construction
+"""
+
+import numpy as np
+
+from benchmarks.fixtures import SIZES, synthetic_ohlc
+from models.MonoWave import MonoWaveUp, MonoWaveDown
+
+NO_OF_STARTS = 1000
+
+
+class MonoWaves:
+    """MonoWaveUp / MonoWaveDown built from NO_OF_STARTS start indices, without and with skipped extrema"""
+    params = [SIZES, [0, 3]]
+    param_names = ['bars', 'skip']
+
+    def setup(self, bars, skip):
+        df = synthetic_ohlc(bars)
+        self.lows = np.array(df['Low'])
+        self.highs = np.array(df['High'])
+        self.dates = np.array(df['Date'])
+        self.starts = np.linspace(0, bars - 20, NO_OF_STARTS).astype(np.int64).tolist()
+
+        MonoWaveUp(self.lows, self.highs, self.dates, 0, skip)
+        MonoWaveDown(self.lows, self.highs, self.dates, 0, skip)
+
+    def time_monowave_up(self, bars, skip):
+        for idx in self.starts:
+            MonoWaveUp(self.lows, self.highs, self.dates, idx, skip)
+
+    def time_monowave_down(self, bars, skip):
+        for idx in self.starts:
+            MonoWaveDown(self.lows, self.highs, self.dates, idx, skip)
@@ -0,0 +1,30 @@
+"""
+Benchmarks of a full analysis of the trading system
+"""
+
+from benchmarks.fixtures import RECORDED_INTERVAL, RECORDED_SYMBOL, RecordedFetcher, recorded_ohlc, synthetic_ohlc
+from elliott_wave_trading_system import ElliottWaveTradingSystem
+
+LOOKBACK = 500
+
+
+class AnalyzeSymbol:
+    """ElliottWaveTradingSystem.analyze_symbol on the latest LOOKBACK candles"""
+    params = [['synthetic', 'recorded']]
+    param_names = ['candles']
+
+    def setup(self, candles):
+        if candles == 'recorded':
+            df = recorded_ohlc(RECORDED_SYMBOL, RECORDED_INTERVAL)
+            if df is None or len(df) < LOOKBACK:
+                raise NotImplementedError(f"less than {LOOKBACK} {RECORDED_SYMBOL} {RECORDED_INTERVAL} candles "
+                                          f"recorded, see run.py --record")
+        else:
+            df = synthetic_ohlc(LOOKBACK)
+
+        self.system = ElliottWaveTradingSystem()
+        self.system._data_fetcher = RecordedFetcher(df)
+        self.system.analyze_symbol(RECORDED_SYMBOL, RECORDED_INTERVAL, LOOKBACK)
+
+    def time_analyze_symbol(self, candles):
+        self.system.analyze_symbol(RECORDED_SYMBOL, RECORDED_INTERVAL, LOOKBACK)
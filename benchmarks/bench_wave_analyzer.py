@@ -0,0 +1,87 @@
+"""
+Benchmarks of the wave search: WaveAnalyzer and WavePattern rule checks
+"""
+
+import numpy as np
+
+from benchmarks.fixtures import SIZES, synthetic_ohlc
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WaveOptions import WaveOptionsGenerator5, WaveOptionsGenerator3
+from models.WavePattern import WavePattern
+from models.WaveRules import Impulse, LeadingDiagonal, Correction
+
+NO_OF_STARTS = 50
+
+
+class WaveSearch:
+    """Searches from NO_OF_STARTS start indices spread over the series"""
+    params = SIZES
+    param_names = ['bars']
+
+    def setup(self, bars):
+        self.df = synthetic_ohlc(bars)
+        self.wa = WaveAnalyzer(self.df)
+        self.starts = np.linspace(0, bars - 100, NO_OF_STARTS).astype(np.int64).tolist()
+
+        self.impulse_configs = [option.values for option in WaveOptionsGenerator5(2).options_sorted]
+        self.correction_configs = [option.values for option in WaveOptionsGenerator3(3).options_sorted]
+        self.options = list(WaveOptionsGenerator5(10).iter_sorted(limit=100))
+        self.rules = [Impulse('impulse'), LeadingDiagonal('leading_diagonal')]
+
+        self.wa.find_impulsive_wave(0)
+        list(self.wa.find_impulsive_waves(0, self.options, self.rules))
+
+    def time_wave_analyzer(self, bars):
+        WaveAnalyzer(self.df)
+
+    def time_find_impulsive_wave(self, bars):
+        for idx_start in self.starts:
+            for config in self.impulse_configs:
+                self.wa.find_impulsive_wave(idx_start, config)
+
+    def time_find_corrective_wave(self, bars):
+        for idx_start in self.starts:
+            for config in self.correction_configs:
+                self.wa.find_corrective_wave(idx_start, config)
+
+    def time_find_impulsive_waves(self, bars):
+        for idx_start in self.starts:
+            for _ in self.wa.find_impulsive_waves(idx_start, self.options, self.rules):
+                pass
+
+    def time_find_unique_impulsive_waves(self, bars):
+        for idx_start in self.starts:
+            for _ in self.wa.find_impulsive_waves(idx_start, self.options, self.rules, unique=True):
+                pass
+
+    def time_next_cycle(self, bars):
+        for idx_start in self.starts[:10]:
+            for _ in self.wa.next_cycle(idx_start):
+                pass
+
+    def time_best_cycles(self, bars):
+        for idx_start in self.starts[:10]:
+            for _ in self.wa.best_cycles(idx_start, k=3):
+                pass
+
+
+class CheckRule:
+    """WavePattern.check_rule on all impulse / correction candidates of the first bars"""
+    params = [[Impulse, LeadingDiagonal, Correction]]
+    param_names = ['rule']
+
+    def setup(self, rule):
+        wa = WaveAnalyzer(synthetic_ohlc(SIZES[0]))
+        self.rule = rule(rule.__name__)
+
+        if rule is Correction:
+            find, options = wa.find_corrective_wave, WaveOptionsGenerator3(5).options_sorted
+        else:
+            find, options = wa.find_impulsive_wave, WaveOptionsGenerator5(3).options_sorted
+
+        self.patterns = [WavePattern(waves) for idx_start in range(0, 900, 10) for option in options
+                         if (waves := find(idx_start, option.values))]
+
+    def time_check_rule(self, rule):
+        for pattern in self.patterns:
+            pattern.check_rule(self.rule)
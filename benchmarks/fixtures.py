@@ -0,0 +1,102 @@
+"""
+Deterministic OHLC fixtures of the benchmarks: synthetic series of any length and candles recorded
+from Binance Futures into the candle cache.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from candle_cache import CandleCache
+
+SIZES = [1_000, 10_000, 100_000]
+
+RECORDED_SYMBOL = 'BTCUSDT'
+RECORDED_INTERVAL = '1h'
+
+# impulse 12345 followed by a correction ABC, as fractions of a cycle
+CYCLE_MOVES = np.array([1.0, -0.5, 1.6, -0.4, 1.0, -0.8, 0.4, -0.7])
+
+
+def synthetic_ohlc(n, seed=0):
+    """
+    Noisy 12345-ABC zigzags, every cycle randomly up- or downwards so long series stay in range
+
+    Args:
+        n: Number of bars
+        seed: Seed of the random generator, the same (n, seed) always gives the same series
+
+    Returns:
+        DataFrame with Date, Open, High, Low, Close columns
+    """
+    rng = np.random.default_rng(seed)
+    no_of_legs = n // 4 + len(CYCLE_MOVES)
+    no_of_legs -= no_of_legs % len(CYCLE_MOVES)
+
+    direction = np.repeat(rng.choice([-1.0, 1.0], no_of_legs // len(CYCLE_MOVES)), len(CYCLE_MOVES))
+    moves = np.tile(CYCLE_MOVES, no_of_legs // len(CYCLE_MOVES)) * direction * rng.uniform(0.6, 1.2, no_of_legs)
+    leg_ends = 100.0 * np.exp(np.cumsum(moves) / 100)
+    leg_starts = np.concatenate([[100.0], leg_ends[:-1]])
+
+    # every leg is interpolated over 4 - 13 bars
+    lengths = rng.integers(4, 14, no_of_legs)
+    leg = np.repeat(np.arange(no_of_legs), lengths)[:n]
+    step = (np.arange(len(leg)) - np.repeat(np.cumsum(lengths) - lengths, lengths)[:n] + 1) / lengths[leg]
+    close = leg_starts[leg] + (leg_ends[leg] - leg_starts[leg]) * step
+
+    close *= 1 + rng.normal(0, 0.0004, n)
+    spread = close * np.abs(rng.normal(0, 0.0004, n))
+    return pd.DataFrame({'Date': pd.date_range('2020-01-01', periods=n, freq='h'), 'Open': close,
+                         'High': close + spread, 'Low': close - spread, 'Close': close})
+
+
+def candle_cache():
+    """CandleCache the recorded candles are read from (BENCHMARK_CANDLE_DIR, CANDLE_CACHE_DIR or data/candles)"""
+    return CandleCache(os.environ.get('BENCHMARK_CANDLE_DIR') or os.environ.get('CANDLE_CACHE_DIR') or 'data/candles')
+
+
+def recorded_ohlc(symbol=RECORDED_SYMBOL, interval=RECORDED_INTERVAL, limit=None):
+    """
+    Candles recorded into the candle cache (see run.py --record)
+
+    Args:
+        symbol: Trading pair (e.g., 'BTCUSDT')
+        interval: Timeframe ('1m', '5m', '15m', '1h', '4h', '1d')
+        limit: Number of latest candles, all if None
+
+    Returns:
+        DataFrame in the format of BinanceDataFetcher.get_futures_klines, None if nothing is recorded
+    """
+    from binance_data_fetcher import BinanceDataFetcher
+
+    candles = candle_cache().load(symbol, interval)
+    if len(candles) == 0:
+        return None
+    if limit is not None:
+        candles = candles[-limit:]
+    return BinanceDataFetcher.candles_to_dataframe(np.array(candles))
+
+
+def record_candles(symbol, interval, limit=1000):
+    """
+    Fetch the latest closed candles of a pair from Binance Futures into the candle cache
+
+    Returns:
+        Number of stored candles
+    """
+    from binance_data_fetcher import BinanceDataFetcher
+
+    fetcher = BinanceDataFetcher(testnet=False, cache_dir=candle_cache().cache_dir)
+    fetcher.get_klines_array(symbol, interval, limit)
+    return len(fetcher.candle_cache.load(symbol, interval))
+
+
+class RecordedFetcher:
+    """Replays a DataFrame of candles as data fetcher of an ElliottWaveTradingSystem"""
+
+    def __init__(self, df):
+        self.df = df
+
+    def get_futures_klines(self, symbol, interval='1h', limit=500):
+        return self.df.iloc[-limit:].reset_index(drop=True)
@@ -0,0 +1,257 @@
+"""
+Benchmark Runner
+================
+
+Discovers the asv style benchmark classes of the bench_*.py modules, times their time_* methods for
+all parameter combinations and appends the results to a per machine history, so every run shows the
+change against the previous one.
+
+A benchmark class has the (optional) attributes params / param_names and methods setup(*params),
+teardown(*params) and time_*(*params). Raising NotImplementedError in setup skips the combination.
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import itertools
+import json
+import os
+import pkgutil
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+
+# changes within this ratio are reported as noise
+TOLERANCE = 0.1
+
+
+def discover(pattern=None):
+    """
+    Benchmark classes of the bench_*.py modules
+
+    Args:
+        pattern: Regular expression, only classes whose name 'module.Class' matches are returned
+
+    Returns:
+        List of (name, class)
+    """
+    classes = []
+    for module_info in sorted(pkgutil.iter_modules([BENCHMARK_DIR]), key=lambda info: info.name):
+        if not module_info.name.startswith('bench_'):
+            continue
+        module = importlib.import_module(f"benchmarks.{module_info.name}")
+        for attr, cls in vars(module).items():
+            if not isinstance(cls, type) or cls.__module__ != module.__name__ or attr.startswith('_'):
+                continue
+            name = f"{module_info.name[len('bench_'):]}.{attr}"
+            if any(method.startswith('time_') for method in dir(cls)) and (not pattern or re.search(pattern, name)):
+                classes.append((name, cls))
+    return classes
+
+
+def param_combinations(cls):
+    """All parameter combinations of a benchmark class as list of dicts {param_name: value}"""
+    params = getattr(cls, 'params', [])
+    names = getattr(cls, 'param_names', [])
+    if not names:
+        return [{}]
+    if len(names) == 1 and not (params and isinstance(params[0], (list, tuple))):
+        params = [params]
+    return [dict(zip(names, values)) for values in itertools.product(*params)]
+
+
+def param_label(params):
+    """Readable 'name=value' label of a parameter combination"""
+    return ','.join(f"{name}={getattr(value, '__name__', value)}" for name, value in params.items())
+
+
+def measure(func, min_time=0.2, repeat=5):
+    """
+    Time a callable: the no. of calls per measurement grows until it takes at least min_time
+
+    Returns:
+        Dict with the min / median seconds per call, the calls per measurement and the no. of measurements
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    times = [elapsed] + timer.repeat(repeat - 1, number)
+    return {'min': min(times) / number, 'median': statistics.median(times) / number, 'number': number,
+            'repeat': repeat}
+
+
+def run_benchmarks(pattern=None, max_bars=None, min_time=0.2, repeat=5, quiet=True):
+    """
+    Run all benchmarks matching pattern
+
+    Args:
+        pattern: Regular expression selecting the benchmark classes
+        max_bars: Skip parameter combinations with more bars
+        min_time: Minimum seconds per measurement
+        repeat: Number of measurements
+        quiet: Suppress the output of the benchmarked code
+
+    Returns:
+        Dict {'module.Class.time_method[params]': result of measure or {'skipped': reason}}
+    """
+    results = {}
+    for name, cls in discover(pattern):
+        for params in param_combinations(cls):
+            if max_bars is not None and params.get('bars', 0) > max_bars:
+                continue
+
+            label = f"[{param_label(params)}]" if params else ''
+            methods = sorted(method for method in dir(cls) if method.startswith('time_'))
+            benchmark = cls()
+
+            output = io.StringIO() if quiet else sys.stdout
+            with contextlib.redirect_stdout(output):
+                try:
+                    if hasattr(benchmark, 'setup'):
+                        benchmark.setup(**params)
+                except NotImplementedError as e:
+                    for method in methods:
+                        results[f"{name}.{method}{label}"] = {'skipped': str(e)}
+                    continue
+
+                try:
+                    for method in methods:
+                        func = getattr(benchmark, method)
+                        results[f"{name}.{method}{label}"] = measure(lambda: func(**params), min_time, repeat)
+                finally:
+                    if hasattr(benchmark, 'teardown'):
+                        benchmark.teardown(**params)
+
+    return results
+
+
+def machine_name():
+    """Name of the history file of this machine"""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', platform.node() or 'unknown')
+
+
+def commit_hash():
+    """Short hash of the checked out commit, None outside of a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    """All runs stored in a history file, oldest first"""
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_results(history):
+    """Latest result of every benchmark over all runs of a history"""
+    previous = {}
+    for run in history:
+        for key, result in run['results'].items():
+            if 'min' in result:
+                previous[key] = result
+    return previous
+
+
+def save_run(path, results):
+    """Append a run with its environment to a history file"""
+    import numba
+    import numpy as np
+    import pandas as pd
+
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit_hash(),
+        'machine': platform.node(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'numba': numba.__version__,
+        'pandas': pd.__version__,
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+    return run
+
+
+def format_time(seconds):
+    for unit, factor in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= factor:
+            return f"{seconds / factor:.3g}{unit}"
+    return f"{seconds / 1e-9:.3g}ns"
+
+
+def report(results, previous):
+    """Table of the results with the change against the previous results"""
+    lines = []
+    width = max((len(key) for key in results), default=0)
+    for key, result in results.items():
+        if 'skipped' in result:
+            lines.append(f"{key:<{width}}  skipped: {result['skipped']}")
+            continue
+
+        line = f"{key:<{width}}  {format_time(result['min']):>8}  (median {format_time(result['median'])})"
+        if key in previous:
+            ratio = result['min'] / previous[key]['min']
+            status = 'slower' if ratio > 1 + TOLERANCE else 'faster' if ratio < 1 - TOLERANCE else ''
+            line += f"  {ratio:5.2f}x {status}".rstrip()
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the Elliott Wave engine')
+    parser.add_argument('-b', '--bench', help='regular expression selecting the benchmarks (module.Class)')
+    parser.add_argument('--max-bars', type=int, help='skip synthetic series with more bars')
+    parser.add_argument('--min-time', type=float, default=0.2, help='minimum seconds per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='measurements per benchmark')
+    parser.add_argument('--quick', action='store_true', help='one short measurement per benchmark')
+    parser.add_argument('--results-dir', default=RESULTS_DIR, help='directory of the history files')
+    parser.add_argument('--no-save', action='store_true', help='do not append the run to the history')
+    parser.add_argument('--record', metavar='SYMBOL:INTERVAL[:LIMIT]',
+                        help='fetch candles from Binance Futures into the candle cache and exit')
+    args = parser.parse_args(argv)
+
+    if args.record:
+        from benchmarks.fixtures import record_candles
+        symbol, interval, *limit = args.record.split(':')
+        count = record_candles(symbol, interval, int(limit[0]) if limit else 1000)
+        print(f"💾 {count} {symbol} {interval} candles recorded")
+        return None
+
+    if args.quick:
+        args.min_time, args.repeat = 0.05, 1
+
+    path = os.path.join(args.results_dir, f"{machine_name()}.jsonl")
+    previous = previous_results(load_history(path))
+
+    results = run_benchmarks(args.bench, args.max_bars, args.min_time, args.repeat)
+    print(report(results, previous))
+
+    if not args.no_save:
+        save_run(path, results)
+        print(f"\n💾 Results appended to {path}")
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -6,12 +6,20 @@ This module fetches real-time futures data from Binance and formats it
 for use with the Elliott Wave Analyzer.
 """
 
+import os
+import logging
 import pandas as pd
 import numpy as np
 from binance.client import Client
 import ccxt
 from datetime import datetime, timedelta
 import time
+from candle_cache import CandleCache, fetch_latest_klines, is_fixed_interval
+from candle_aggregator import CandleAggregator
+from symbol_rules import SymbolRulesCache
+import log_setup
+
+logger = logging.getLogger(log_setup.FETCH)
 
 
 class BinanceDataFetcher:
@@ -19,7 +27,7 @@ class BinanceDataFetcher:
     Fetches real-time and historical data from Binance Futures
     """
     
-    def __init__(self, api_key=None, api_secret=None, testnet=True):
+    def __init__(self, api_key=None, api_secret=None, testnet=True, cache_dir=None, symbol_rules_ttl=3600):
         """
         Initialize Binance client
         
@@ -27,16 +35,32 @@ class BinanceDataFetcher:
             api_key: Binance API key (optional for public data)
             api_secret: Binance API secret (optional for public data)
             testnet: Use testnet for paper trading (default: True)
+            cache_dir: Directory of the on-disk candle cache (default: CANDLE_CACHE_DIR env variable,
+                       no cache if neither is set)
+            symbol_rules_ttl: Seconds after which the cached exchange info (symbol rules) is reloaded
         """
         self.api_key = api_key
         self.api_secret = api_secret
         self.testnet = testnet
         
+        # Closed candles are kept on disk, only the delta is fetched per scan
+        cache_dir = cache_dir or os.getenv('CANDLE_CACHE_DIR')
+        self.candle_cache = CandleCache(cache_dir) if cache_dir else None
+        
+        # Optional CandleAggregator, higher intervals are rolled up from one base interval (see enable_candle_aggregation)
+        self.candle_aggregator = None
+        
+        # Optional RateLimiter (see scan_pipeline) shared by all threads using this fetcher
+        self.rate_limiter = None
+        
         # Initialize Binance client
         if api_key and api_secret:
             self.client = Client(api_key, api_secret, testnet=testnet)
         else:
             self.client = Client()  # Public client for market data
+        
+        # Trading rules of all contracts, loaded once and shared by the scans and the order path
+        self.symbol_rules = SymbolRulesCache(self._fetch_exchange_info, ttl=symbol_rules_ttl)
             
         # Initialize CCXT for additional functionality
         self.exchange = ccxt.binance({
@@ -46,7 +70,9 @@ class BinanceDataFetcher:
             'enableRateLimit': True,
         })
         
-        print(f"✅ Binance client initialized (Testnet: {testnet})")
+        logger.info("✅ Binance client initialized (Testnet: %s)", testnet)
+        if self.candle_cache is not None:
+            logger.info("💾 Candle cache: %s", self.candle_cache.cache_dir)
     
     def get_futures_klines(self, symbol, interval='1h', limit=500):
         """
@@ -61,64 +87,147 @@ class BinanceDataFetcher:
             DataFrame with OHLCV data formatted for Elliott Wave Analyzer
         """
         try:
-            print(f"📡 Fetching {symbol} {interval} data from Binance Futures...")
-            
-            # Fetch klines from Binance
-            klines = self.client.futures_klines(
-                symbol=symbol,
-                interval=interval,
-                limit=limit
-            )
+            logger.debug("📡 Fetching %s %s data from Binance Futures...", symbol, interval)
             
-            # Convert to DataFrame
-            df = pd.DataFrame(klines, columns=[
-                'timestamp', 'Open', 'High', 'Low', 'Close', 'Volume',
-                'close_time', 'quote_asset_volume', 'number_of_trades',
-                'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-            ])
+            # Fetch klines from Binance (only the new ones if cached)
+            candles = self.get_klines_array(symbol, interval, limit)
             
-            # Format for Elliott Wave Analyzer
-            df['Date'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df['Open'] = df['Open'].astype(float)
-            df['High'] = df['High'].astype(float)
-            df['Low'] = df['Low'].astype(float)
-            df['Close'] = df['Close'].astype(float)
-            df['Volume'] = df['Volume'].astype(float)
+            result_df = self.candles_to_dataframe(candles)
             
-            # Select and reorder columns to match Elliott Wave Analyzer format
-            result_df = df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']].copy()
-            result_df['Date'] = result_df['Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
-            
-            print(f"✅ Successfully fetched {len(result_df)} candles")
-            print(f"📊 Price range: ${result_df['Low'].min():.2f} - ${result_df['High'].max():.2f}")
-            print(f"⏰ Time range: {result_df['Date'].iloc[0]} to {result_df['Date'].iloc[-1]}")
+            # The ranges scan the whole frame, only computed if they are logged
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("✅ Fetched %d %s %s candles, price range: $%.2f - $%.2f, time range: %s to %s",
+                             len(result_df), symbol, interval, result_df['Low'].min(), result_df['High'].max(),
+                             result_df['Date'].iloc[0], result_df['Date'].iloc[-1])
             
             return result_df
             
         except Exception as e:
-            print(f"❌ Error fetching data: {e}")
+            logger.error("❌ Error fetching %s %s data: %s", symbol, interval, e)
             return None
     
+    def get_klines_array(self, symbol, interval, limit):
+        """
+        Latest futures klines as numpy array, served from the candle cache and rolled up from the base
+        interval if enabled
+        
+        Args:
+            symbol: Trading pair (e.g., 'BTCUSDT')
+            interval: Timeframe ('1m', '5m', '15m', '1h', '4h', '1d')
+            limit: Number of candles to fetch
+            
+        Returns:
+            numpy structured array with KLINE_DTYPE, the last candle may still be open
+        """
+        if self.candle_aggregator is not None and self.candle_aggregator.can_derive(interval):
+            return self.candle_aggregator.get_klines(symbol, interval, limit)
+        return self._get_klines_array(symbol, interval, limit)
+    
+    def _get_klines_array(self, symbol, interval, limit):
+        """Latest klines of exactly this interval, limits above 1500 are fetched in pages"""
+        if self.candle_cache is not None and is_fixed_interval(interval):
+            return self.candle_cache.get_klines(symbol, interval, limit, self._fetch_klines)
+        return fetch_latest_klines(self._fetch_klines, symbol, interval, limit)
+    
+    def enable_candle_aggregation(self, intervals, lookback=500, base_interval=None):
+        """
+        Fetch only one base interval per symbol and roll up the other intervals from it
+        
+        Args:
+            intervals: Timeframes which will be requested (e.g., ['15m', '30m', '1h', '4h'])
+            lookback: Candles needed per interval
+            base_interval: Interval fetched (default: the finest one, or 1m if the others are no multiples of it)
+            
+        Returns:
+            The CandleAggregator
+        """
+        self.candle_aggregator = CandleAggregator(intervals, self._get_klines_array, lookback, base_interval,
+                                                  fetch_direct=self._get_klines_array)
+        logger.info("🧮 Candle aggregation: %s rolled up from %s",
+                    ', '.join(self.candle_aggregator.intervals), self.candle_aggregator.base_interval)
+        return self.candle_aggregator
+    
+    def _fetch_klines(self, symbol, interval, limit, start_time=None):
+        """Raw futures klines from the REST API, starting at start_time (ms) if given"""
+        params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+        if start_time is not None:
+            params['startTime'] = start_time
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self.kline_request_weight(limit))
+        return self.client.futures_klines(**params)
+    
+    def _fetch_exchange_info(self):
+        """Exchange info of all futures contracts from the REST API"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(1)
+        return self.client.futures_exchange_info()
+    
+    def get_all_tickers(self):
+        """24h tickers of all futures symbols in one request"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(40)
+        return self.client.futures_ticker()
+    
+    def get_all_book_tickers(self):
+        """Best bid / ask of all futures symbols in one request"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(5)
+        return self.client.futures_orderbook_ticker()
+    
+    @staticmethod
+    def kline_request_weight(limit):
+        """Request weight of a futures klines call, it grows with the limit"""
+        if limit < 100:
+            return 1
+        if limit < 500:
+            return 2
+        if limit <= 1000:
+            return 5
+        return 10
+    
+    @staticmethod
+    def candles_to_dataframe(candles):
+        """
+        Convert a KLINE_DTYPE array to the DataFrame format of the Elliott Wave Analyzer
+        
+        Args:
+            candles: numpy structured array with KLINE_DTYPE
+            
+        Returns:
+            DataFrame with Date (datetime64, UTC open time), Open, High, Low, Close, Volume columns
+        """
+        return pd.DataFrame({
+            'Date': candles['open_time'].astype('datetime64[ms]'),
+            'Open': candles['open'],
+            'High': candles['high'],
+            'Low': candles['low'],
+            'Close': candles['close'],
+            'Volume': candles['volume'],
+        })
+    
     def get_current_price(self, symbol):
         """Get current futures price for a symbol"""
         try:
             ticker = self.client.futures_symbol_ticker(symbol=symbol)
             return float(ticker['price'])
         except Exception as e:
-            print(f"❌ Error getting current price: {e}")
+            logger.error("❌ Error getting current price of %s: %s", symbol, e)
             return None
     
+    def get_current_prices(self):
+        """Current futures prices of all symbols in one request, {symbol: price}"""
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(2)
+            return {ticker['symbol']: float(ticker['price']) for ticker in self.client.futures_symbol_ticker()}
+        except Exception as e:
+            logger.error("❌ Error getting current prices: %s", e)
+            return {}
+    
     def get_popular_futures_pairs(self):
         """Get list of popular futures trading pairs"""
         try:
-            exchange_info = self.client.futures_exchange_info()
-            symbols = []
-            
-            for symbol_info in exchange_info['symbols']:
-                if (symbol_info['status'] == 'TRADING' and 
-                    symbol_info['contractType'] == 'PERPETUAL' and
-                    symbol_info['quoteAsset'] == 'USDT'):
-                    symbols.append(symbol_info['symbol'])
+            symbols = set(self.symbol_rules.symbols())
             
             # Return top liquid pairs
             popular_pairs = [
@@ -129,7 +238,7 @@ class BinanceDataFetcher:
             return [pair for pair in popular_pairs if pair in symbols]
             
         except Exception as e:
-            print(f"❌ Error getting futures pairs: {e}")
+            logger.error("❌ Error getting futures pairs: %s", e)
             return ['BTCUSDT', 'ETHUSDT']  # Fallback
     
     def save_data_to_csv(self, df, symbol, interval):
@@ -137,13 +246,14 @@ class BinanceDataFetcher:
         if df is not None:
             filename = f"data/{symbol}_{interval}_futures.csv"
             df.to_csv(filename, index=False)
-            print(f"💾 Data saved to {filename}")
+            logger.info("💾 Data saved to %s", filename)
             return filename
         return None
 
 
 # Demo usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG, format='%(message)s')
     print("=== BINANCE FUTURES DATA FETCHER DEMO ===\n")
     
     # Initialize data fetcher (no API keys needed for market data)
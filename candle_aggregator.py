@@ -0,0 +1,200 @@
+"""
+Multi-Timeframe Candle Aggregation from one Base Interval
+=========================================================
+
+Only the finest interval (the base) is fetched per symbol, all higher timeframes are rolled up from it:
+one request per symbol and scan instead of one per (symbol, interval), and the candles of all
+timeframes are made of the same trades.
+
+Buckets are aligned like the klines of Binance: to the epoch for minutes, hours and days, to Monday
+00:00 UTC for weeks. The roll-up is vectorized and incremental, after the first scan only the buckets
+reached by new base candles are aggregated again.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from candle_cache import INTERVAL_UNITS_MS, KLINE_DTYPE, interval_to_ms
+
+
+# 1970-01-01 was a Thursday, Binance weeks start on Monday
+WEEK_OFFSET_MS = 4 * 24 * 60 * 60 * 1000
+
+
+def bucket_open_times(open_times, interval):
+    """
+    Open time of the bucket of a higher interval every open time falls into
+
+    Args:
+        open_times: Open times in ms (numpy array)
+        interval: Timeframe of the buckets ('15m', '4h', '1d', '1w')
+
+    Returns:
+        numpy int64 array of the bucket open times
+    """
+    interval_ms = interval_to_ms(interval)
+    offset = WEEK_OFFSET_MS if interval.endswith('w') else 0
+    return (np.asarray(open_times, dtype=np.int64) - offset) // interval_ms * interval_ms + offset
+
+
+def aggregate_candles(candles, interval, drop_partial_first=True):
+    """
+    Roll up candles of a finer interval into candles of [interval]
+
+    Args:
+        candles: numpy structured array with KLINE_DTYPE, sorted by open time
+        interval: Target timeframe, a multiple of the interval of candles
+        drop_partial_first: Drop the first bucket if candles start after its open time (its open / high /
+                            low would not be the ones of Binance)
+
+    Returns:
+        numpy structured array with KLINE_DTYPE, the last candle is still open if its bucket is incomplete
+    """
+    if len(candles) == 0:
+        return np.empty(0, dtype=KLINE_DTYPE)
+
+    buckets = bucket_open_times(candles['open_time'], interval)
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[0] - 1))
+    ends = np.append(starts[1:], len(candles)) - 1
+
+    result = np.empty(len(starts), dtype=KLINE_DTYPE)
+    result['open_time'] = buckets[starts]
+    result['open'] = candles['open'][starts]
+    result['high'] = np.maximum.reduceat(candles['high'], starts)
+    result['low'] = np.minimum.reduceat(candles['low'], starts)
+    result['close'] = candles['close'][ends]
+    result['volume'] = np.add.reduceat(candles['volume'], starts)
+    result['close_time'] = buckets[starts] + interval_to_ms(interval) - 1
+
+    if drop_partial_first and candles['open_time'][0] != buckets[0]:
+        result = result[1:]
+    return result
+
+
+def base_interval_for(intervals):
+    """
+    The interval all others can be rolled up from: the finest one if the others are multiples of it,
+    else 1m
+
+    Args:
+        intervals: Timeframes ('5m', '15m', '1h', ...), months ('1M') are left out
+    """
+    intervals = [interval for interval in intervals if interval[-1] in INTERVAL_UNITS_MS]
+    finest = min(intervals, key=interval_to_ms)
+    if all(interval_to_ms(interval) % interval_to_ms(finest) == 0 for interval in intervals):
+        return finest
+    return '1m'
+
+
+class CandleAggregator:
+    """
+    Serves the candles of all intervals of a symbol from one fetch of its base interval
+    """
+
+    def __init__(self, intervals, fetch, lookback=500, base_interval=None, max_age=5.0, clock=time.monotonic,
+                 fetch_direct=None):
+        """
+        Initialize the aggregator
+
+        Args:
+            intervals: Timeframes served (e.g., ['15m', '30m', '1h', '4h'])
+            fetch: Callable fetch(symbol, interval, limit) returning the latest candles of the base interval as
+                   KLINE_DTYPE array (e.g. BinanceDataFetcher.get_klines_array with the candle cache)
+            lookback: Candles needed per interval, the base lookback covers it for the highest interval
+            base_interval: Interval fetched (default: see base_interval_for)
+            max_age: Seconds base candles are reused, so the intervals of a symbol in one scan share one fetch
+            clock: Monotonic time function in seconds
+            fetch_direct: Callable fetch_direct(symbol, interval, limit) returning the candles of any interval, used
+                          if the base candles are too few for the limit (e.g. a short history in the candle cache).
+                          None: serve the shorter roll-up
+        """
+        self.base_interval = base_interval or base_interval_for(intervals)
+        self.fetch = fetch
+        self.lookback = lookback
+        self.max_age = max_age
+        self.clock = clock
+        self.fetch_direct = fetch_direct
+
+        base_ms = interval_to_ms(self.base_interval)
+        self.intervals = [interval for interval in intervals if self.can_derive(interval)]
+        max_ratio = max([interval_to_ms(interval) // base_ms for interval in self.intervals] + [1])
+        # one more bucket, the first one is partial in general
+        self.base_lookback = (lookback + 1) * max_ratio
+
+        self._base = {}  # symbol: (fetch time, base candles)
+        self._derived = {}  # (symbol, interval): candles
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def can_derive(self, interval):
+        """Candles of the interval can be rolled up from the base interval"""
+        try:
+            return interval_to_ms(interval) % interval_to_ms(self.base_interval) == 0
+        except ValueError:
+            return False  # e.g. '1M', months have no fixed length
+
+    def _lock(self, symbol):
+        with self._locks_lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def base_candles(self, symbol):
+        """Base candles of a symbol, fetched if the last ones are older than max_age"""
+        with self._lock(symbol):
+            fetched = self._base.get(symbol)
+            if fetched is None or self.clock() - fetched[0] > self.max_age:
+                fetched = self._base[symbol] = (self.clock(), self.fetch(symbol, self.base_interval,
+                                                                         self.base_lookback))
+            return fetched[1]
+
+    def get_klines(self, symbol, interval, limit):
+        """
+        Latest candles of a (symbol, interval), rolled up from the base interval
+
+        Args:
+            symbol: Trading pair (e.g., 'BTCUSDT')
+            interval: Timeframe, see can_derive
+            limit: Number of candles to return (at most lookback for the highest interval)
+
+        Returns:
+            numpy structured array with KLINE_DTYPE, the last candle may still be open
+        """
+        base = self.base_candles(symbol)
+        if interval == self.base_interval:
+            return base[-limit:]
+
+        with self._lock(symbol):
+            candles = self._derived.get((symbol, interval))
+            if candles is not None and len(candles) > 0 and len(base) > 0 and \
+                    base['open_time'][0] <= candles['open_time'][-1]:
+                # re-aggregate from the last (possibly open) bucket on
+                last_open_time = candles['open_time'][-1]
+                tail = aggregate_candles(base[base['open_time'] >= last_open_time], interval,
+                                         drop_partial_first=False)
+                candles = np.concatenate([candles[candles['open_time'] < last_open_time], tail])
+            else:
+                candles = aggregate_candles(base, interval)
+
+            candles = candles[-max(limit, self.lookback):]
+            self._derived[(symbol, interval)] = candles
+
+        if len(candles) < limit and len(base) < self.base_lookback and self.fetch_direct is not None:
+            # the base series does not reach back far enough, fetch the interval itself
+            direct = self.fetch_direct(symbol, interval, limit)
+            if len(direct) > len(candles):
+                return direct[-limit:]
+        return candles[-limit:]
+
+    def closed_intervals(self, close_time):
+        """
+        Intervals whose candle closes together with the base candle closing at close_time
+
+        Args:
+            close_time: Close time in ms of a base candle
+
+        Returns:
+            List of intervals, e.g. ['15m', '30m', '1h'] for the 15m candle closing at a full hour
+        """
+        next_open = int(close_time) + 1
+        return [interval for interval in self.intervals if bucket_open_times([next_open], interval)[0] == next_open]
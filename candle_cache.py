@@ -0,0 +1,284 @@
+"""
+Persistent Candle Cache for Binance Futures Klines
+==================================================
+
+Stores closed klines on disk, one append-only file per (symbol, interval), so every
+scan only has to fetch the candles which closed since the last one.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+
+# One stored kline, same fields as the REST / websocket klines of Binance
+KLINE_DTYPE = np.dtype([
+    ('open_time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('close_time', '<i8'),
+])
+
+INTERVAL_UNITS_MS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+MAX_KLINES_PER_REQUEST = 1500
+
+
+def is_fixed_interval(interval):
+    """True if the interval has a fixed length, i.e. can be cached (months ('1M') have not)"""
+    return interval[-1] in INTERVAL_UNITS_MS
+
+
+def interval_to_ms(interval):
+    """Length of a Binance kline interval ('1m', '15m', '4h', '1d', '1w') in milliseconds"""
+    if not is_fixed_interval(interval):
+        raise ValueError(f"Unsupported interval: {interval}")
+    unit = interval[-1]
+    return int(interval[:-1]) * INTERVAL_UNITS_MS[unit]
+
+
+def klines_to_array(klines):
+    """
+    Convert raw Binance klines (lists of strings / numbers) to a KLINE_DTYPE array
+
+    Args:
+        klines: Klines as returned by client.futures_klines
+
+    Returns:
+        numpy structured array with KLINE_DTYPE
+    """
+    candles = np.empty(len(klines), dtype=KLINE_DTYPE)
+    if len(klines) == 0:
+        return candles
+
+    columns = list(zip(*klines))
+    candles['open_time'] = np.asarray(columns[0], dtype=np.int64)
+    candles['open'] = np.asarray(columns[1], dtype=float)
+    candles['high'] = np.asarray(columns[2], dtype=float)
+    candles['low'] = np.asarray(columns[3], dtype=float)
+    candles['close'] = np.asarray(columns[4], dtype=float)
+    candles['volume'] = np.asarray(columns[5], dtype=float)
+    candles['close_time'] = np.asarray(columns[6], dtype=np.int64)
+    return candles
+
+
+def fetch_klines_since(fetch, symbol, interval, start_time, now_ms):
+    """
+    All klines from start_time (ms) on, fetched page by page
+
+    Args:
+        fetch: Callable fetch(symbol, interval, limit, start_time) returning raw Binance klines
+        symbol: Trading pair (e.g., 'BTCUSDT')
+        interval: Timeframe ('1m', '5m', '15m', '1h', '4h', '1d')
+        start_time: Time in ms the first kline opens at or after
+        now_ms: Current time in ms
+
+    Returns:
+        numpy structured array with KLINE_DTYPE, the last candle may still be open
+    """
+    interval_ms = interval_to_ms(interval)
+    pages = []
+    while True:
+        # the request weight grows with its limit, so ask for the missing candles only
+        page_limit = min((now_ms - start_time) // interval_ms + 2, MAX_KLINES_PER_REQUEST)
+        page = klines_to_array(fetch(symbol, interval, page_limit, start_time))
+        pages.append(page)
+        if len(page) < page_limit:
+            break
+        start_time = int(page['close_time'][-1]) + 1
+    return np.concatenate(pages)
+
+
+def fetch_latest_klines(fetch, symbol, interval, limit, now_ms=None):
+    """
+    The latest [limit] klines, paged if more than one request can return
+
+    Returns:
+        numpy structured array with KLINE_DTYPE, the last candle may still be open
+    """
+    if limit <= MAX_KLINES_PER_REQUEST:
+        return klines_to_array(fetch(symbol, interval, limit, None))
+
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    interval_ms = interval_to_ms(interval)
+    start_time = (now_ms // interval_ms - limit + 1) * interval_ms
+    return fetch_klines_since(fetch, symbol, interval, start_time, now_ms)[-limit:]
+
+
+class CandleCache:
+    """
+    Append-only on-disk store of closed klines, one memory-mapped file per (symbol, interval)
+    """
+
+    def __init__(self, cache_dir='data/candles'):
+        """
+        Initialize the candle cache
+
+        Args:
+            cache_dir: Directory for the kline files (created if missing)
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def path(self, symbol, interval):
+        """File of a (symbol, interval), months ('1M') are not cached (see is_fixed_interval)"""
+        if not is_fixed_interval(interval):
+            raise ValueError(f"Unsupported interval: {interval}")
+        return os.path.join(self.cache_dir, f"{symbol}_{interval}.klines")
+
+    def _lock(self, symbol, interval):
+        with self._locks_lock:
+            return self._locks.setdefault((symbol, interval), threading.Lock())
+
+    def load(self, symbol, interval):
+        """
+        All stored closed candles of a (symbol, interval), memory-mapped read only
+
+        Returns:
+            numpy structured array with KLINE_DTYPE (empty if nothing is stored)
+        """
+        path = self.path(symbol, interval)
+        if not os.path.exists(path) or os.path.getsize(path) < KLINE_DTYPE.itemsize:
+            return np.empty(0, dtype=KLINE_DTYPE)
+
+        # ignore a partially written last record
+        count = os.path.getsize(path) // KLINE_DTYPE.itemsize
+        return np.memmap(path, dtype=KLINE_DTYPE, mode='r', shape=(count,))
+
+    def count(self, symbol, interval):
+        """Number of stored candles of a (symbol, interval), counted without mapping the file"""
+        path = self.path(symbol, interval)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // KLINE_DTYPE.itemsize
+
+    def last_candle(self, symbol, interval):
+        """
+        The last stored candle of a (symbol, interval), read without mapping the file
+
+        Returns:
+            numpy record with KLINE_DTYPE or None if nothing is stored
+        """
+        count = self.count(symbol, interval)
+        if count == 0:
+            return None
+
+        return np.fromfile(self.path(symbol, interval), dtype=KLINE_DTYPE, count=1, offset=(count - 1) * KLINE_DTYPE.itemsize)[0]
+
+    def append(self, symbol, interval, candles):
+        """
+        Append closed candles, only candles newer than the last stored one are written
+
+        Returns:
+            Number of candles written
+        """
+        last = self.last_candle(symbol, interval)
+        if last is not None:
+            candles = candles[candles['open_time'] > last['open_time']]
+        if len(candles) == 0:
+            return 0
+
+        with open(self.path(symbol, interval), 'ab') as f:
+            f.write(np.ascontiguousarray(candles, dtype=KLINE_DTYPE).tobytes())
+        return len(candles)
+
+    def clear(self, symbol, interval):
+        """Remove all stored candles of a (symbol, interval)"""
+        path = self.path(symbol, interval)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def backfill(self, symbol, interval, start_ms, fetch, now_ms=None):
+        """
+        Store all closed candles from start_ms on, e.g. the history of a backtest
+
+        Args:
+            symbol: Trading pair (e.g., 'BTCUSDT')
+            interval: Timeframe ('1m', '5m', '15m', '1h', '4h', '1d')
+            start_ms: Open time in ms of the first candle needed
+            fetch: Callable fetch(symbol, interval, limit, start_time) returning raw Binance klines
+            now_ms: Current time in ms (default: system time), candles closing later are not stored
+
+        Returns:
+            Number of stored candles from start_ms on
+        """
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+
+        with self._lock(symbol, interval):
+            stored = self.load(symbol, interval)
+            first_open_time = int(stored['open_time'][0]) if len(stored) > 0 else None
+            del stored
+            if first_open_time is not None and first_open_time > start_ms + interval_to_ms(interval):
+                # the file is append-only, older history means starting over
+                self.clear(symbol, interval)
+
+            last = self.last_candle(symbol, interval)
+            start_time = int(last['close_time']) + 1 if last is not None else start_ms
+            while start_time < now_ms:
+                page = klines_to_array(fetch(symbol, interval, MAX_KLINES_PER_REQUEST, start_time))
+                closed = page[page['close_time'] < now_ms]
+                self.append(symbol, interval, closed)
+                if len(page) < MAX_KLINES_PER_REQUEST or len(closed) < len(page):
+                    break
+                start_time = int(page['close_time'][-1]) + 1
+
+            stored = self.load(symbol, interval)
+            count = int(np.count_nonzero(stored['open_time'] >= start_ms))
+            del stored
+        return count
+
+    def get_klines(self, symbol, interval, limit, fetch, now_ms=None):
+        """
+        Latest candles of a (symbol, interval), fetching only the delta since the last stored candle
+
+        Args:
+            symbol: Trading pair (e.g., 'BTCUSDT')
+            interval: Timeframe ('1m', '5m', '15m', '1h', '4h', '1d')
+            limit: Number of candles to return
+            fetch: Callable fetch(symbol, interval, limit, start_time) returning raw Binance klines,
+                   start_time is None for the latest candles
+            now_ms: Current time in ms (default: system time), candles closing later are not stored
+
+        Returns:
+            numpy structured array with KLINE_DTYPE, the last candle may still be open
+        """
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        interval_ms = interval_to_ms(interval)
+
+        with self._lock(symbol, interval):
+            last = self.last_candle(symbol, interval)
+            missing = (now_ms - last['close_time']) // interval_ms + 1 if last is not None else limit
+
+            if last is not None and missing < limit and self.count(symbol, interval) + missing >= limit:
+                # fetch the delta only
+                fetched = fetch_klines_since(fetch, symbol, interval, int(last['close_time']) + 1, now_ms)
+            else:
+                # nothing stored, the stored candles are too old to be continued or too few for the limit
+                # (the file is append-only, older history means starting over)
+                self.clear(symbol, interval)
+                fetched = fetch_latest_klines(fetch, symbol, interval, limit, now_ms)
+
+            self.append(symbol, interval, fetched[fetched['close_time'] < now_ms])
+            still_open = fetched[fetched['close_time'] >= now_ms]
+
+            stored = self.load(symbol, interval)
+            candles = np.concatenate([stored[max(0, len(stored) - limit):], still_open])
+            del stored
+
+        return candles[-limit:]
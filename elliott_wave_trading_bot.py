@@ -19,6 +19,7 @@ from datetime import datetime, timedelta
 import logging
 from binance_data_fetcher import BinanceDataFetcher
 from elliott_wave_trading_system import ElliottWaveTradingSystem
+from scan_pipeline import ScanPipeline, RateLimiter, analyze_klines
 
 
 class ElliottWaveTradingBot:
@@ -50,12 +51,24 @@ class ElliottWaveTradingBot:
             'min_confidence': 0.45,  # minimum pattern confidence (reduced from 0.6)
             'min_risk_reward': 1.2, # minimum risk/reward ratio (reduced from 1.5)
             'account_balance': 10000, # USDT balance for position sizing
+            'fetch_workers': 8,       # threads fetching market data
+            'analysis_workers': None, # processes for wave analysis (None: no. of CPUs, 0: in threads)
+            'max_request_weight_per_minute': 1200,  # Binance Futures allows 2400
         }
         
         # Update with custom config
         if config:
             self.config.update(config)
         
+        # Concurrent scanning: fetch threads share the request weight limit, wave analysis runs in processes
+        self.data_fetcher.rate_limiter = RateLimiter(self.config['max_request_weight_per_minute'])
+        self.scan_pipeline = ScanPipeline(
+            self.fetch_pair,
+            analyze=analyze_klines if self.config['analysis_workers'] != 0 else self.trading_system.analyze_dataframe,
+            fetch_workers=self.config['fetch_workers'],
+            analysis_workers=self.config['analysis_workers']
+        )
+        
         # Trading state
         self.active_positions = {}
         self.trade_history = []
@@ -135,6 +148,7 @@ class ElliottWaveTradingBot:
     def stop_trading(self):
         """Stop the trading bot and cleanup"""
         self.bot_running = False
+        self.scan_pipeline.shutdown()
         self.safe_log("info", "Elliott Wave Trading Bot stopped", "🛑")
         
         # Close all positions if needed
@@ -146,31 +160,22 @@ class ElliottWaveTradingBot:
         
         all_signals = []
         
-        # Scan each symbol and interval
-        for symbol in self.config['symbols']:
-            for interval in self.config['intervals']:
-                try:
-                    # Skip if we already have a position on this symbol
-                    if symbol in self.active_positions:
-                        continue
-                    
-                    # Get current analysis
-                    analysis = self.trading_system.analyze_symbol(symbol, interval, 200)
-                    
-                    if analysis and analysis['signals']:
-                        # Filter signals by confidence and risk/reward
-                        valid_signals = [
-                            s for s in analysis['signals']
-                            if s['confidence'] >= self.config['min_confidence']
-                            and s['risk_reward_ratio'] >= self.config['min_risk_reward']
-                        ]
-                        
-                        all_signals.extend(valid_signals)
-                    
-                    time.sleep(1)  # Rate limiting
-                    
-                except Exception as e:
-                    self.logger.error(f"❌ Error scanning {symbol} {interval}: {e}")
+        def collect_signals(symbol, interval, analysis, error):
+            if error is not None:
+                self.logger.error(f"❌ Error scanning {symbol} {interval}: {error}")
+            elif analysis and analysis['signals']:
+                # Filter signals by confidence and risk/reward
+                valid_signals = [
+                    s for s in analysis['signals']
+                    if s['confidence'] >= self.config['min_confidence']
+                    and s['risk_reward_ratio'] >= self.config['min_risk_reward']
+                ]
+                
+                all_signals.extend(valid_signals)
+        
+        # Scan each symbol and interval concurrently (rate limited by the data fetcher)
+        pairs = [(symbol, interval) for symbol in self.config['symbols'] for interval in self.config['intervals']]
+        self.scan_pipeline.run(pairs, collect_signals)
         
         # Execute best signals
         if all_signals:
@@ -186,6 +191,23 @@ class ElliottWaveTradingBot:
             for signal in all_signals[:available_slots]:
                 self.execute_trade(signal)
     
+    def fetch_pair(self, symbol, interval):
+        """
+        Fetch stage of the scan pipeline (runs in a fetch thread)
+        
+        Args:
+            symbol: Trading pair
+            interval: Timeframe
+            
+        Returns:
+            DataFrame with the latest 200 candles, None to skip the pair
+        """
+        # Skip if we already have a position on this symbol
+        if symbol in self.active_positions:
+            return None
+        
+        return self.data_fetcher.get_futures_klines(symbol, interval, 200)
+    
     def execute_trade(self, signal):
         """
         Execute a trade based on Elliott Wave signal
@@ -283,10 +305,13 @@ class ElliottWaveTradingBot:
         
         positions_to_close = []
         
+        # Prices of all symbols with one request instead of one per position
+        prices = self.data_fetcher.get_current_prices()
+        
         for symbol, position in self.active_positions.items():
             try:
                 # Get current price
-                current_price = self.data_fetcher.get_current_price(symbol)
+                current_price = prices.get(symbol)
                 
                 if current_price is None:
                     continue
@@ -10,19 +10,28 @@ import pandas as pd
 import numpy as np
 from binance_data_fetcher import BinanceDataFetcher
 from models.WaveAnalyzer import WaveAnalyzer
+from models.StreamingWaveAnalyzer import StreamingWaveAnalyzer
+from models.ParallelWaveAnalyzer import ParallelWaveAnalyzer
 from models.WaveOptions import WaveOptionsGenerator5
 from models.WaveRules import Impulse, LeadingDiagonal
 from models.WavePattern import WavePattern
+from models.functions import atr_swing
 from datetime import datetime
+import logging
 import time
 
+import log_setup
+
+logger = logging.getLogger(log_setup.ANALYSIS)
+
 
 class ElliottWaveTradingSystem:
     """
     Complete trading system using Elliott Wave analysis for Binance Futures
     """
     
-    def __init__(self, api_key=None, api_secret=None, testnet=True):
+    def __init__(self, api_key=None, api_secret=None, testnet=True, streaming=False, analysis_workers=0,
+                 pivot_atr=None):
         """
         Initialize the trading system
         
@@ -30,8 +39,12 @@ class ElliottWaveTradingSystem:
             api_key: Binance API key (required for trading)
             api_secret: Binance API secret (required for trading)
             testnet: Use testnet for paper trading
+            streaming: Keep the wave search of each symbol between scans and only update it with the new candles
+            analysis_workers: Number of processes the start indices of an analysis are shared across (0: no processes)
+            pivot_atr: Start the wave search at the swing lows of a zigzag of this many average candle ranges instead
+                of every 5th candle (None: every 5th candle)
         """
-        self.data_fetcher = BinanceDataFetcher(api_key, api_secret, testnet)
+        self._data_fetcher = None  # created on first use, analysis only does not need a Binance client
         self.api_key = api_key
         self.api_secret = api_secret
         self.testnet = testnet
@@ -45,11 +58,28 @@ class ElliottWaveTradingSystem:
         self.active_signals = {}
         self.trade_history = []
         
-        print("🤖 Elliott Wave Trading System initialized")
-        print(f"📊 Risk per trade: {self.risk_per_trade*100}%")
-        print(f"🌊 Max skip value: {self.max_skip_value}")
+        # Streaming mode: one StreamingWaveAnalyzer per (symbol, interval)
+        self.streaming = streaming
+        self.wave_streams = {}
+        
+        # Parallel mode: start indices are searched in worker processes
+        self.parallel = ParallelWaveAnalyzer(analysis_workers) if analysis_workers > 0 else None
+        
+        # Pivot mode: only swing lows are searched, the candles inside a move are skipped
+        self.pivot_atr = pivot_atr
+        
+        logger.info("🤖 Elliott Wave Trading System initialized")
+        logger.info("📊 Risk per trade: %s%%", self.risk_per_trade * 100)
+        logger.info("🌊 Max skip value: %s", self.max_skip_value)
+    
+    @property
+    def data_fetcher(self):
+        """BinanceDataFetcher of the trading system"""
+        if self._data_fetcher is None:
+            self._data_fetcher = BinanceDataFetcher(self.api_key, self.api_secret, self.testnet)
+        return self._data_fetcher
     
-    def analyze_symbol(self, symbol, interval='1h', lookback=500):
+    def analyze_symbol(self, symbol, interval='1h', lookback=500, time_budget_ms=None):
         """
         Perform Elliott Wave analysis on a trading pair
         
@@ -57,21 +87,39 @@ class ElliottWaveTradingSystem:
             symbol: Trading pair (e.g., 'BTCUSDT')
             interval: Timeframe for analysis
             lookback: Number of candles to analyze (increased to 500 for better pattern detection)
+            time_budget_ms: Time for the wave search (see analyze_dataframe)
             
         Returns:
             Dictionary with analysis results and trading signals
         """
-        print(f"\n🔍 Analyzing {symbol} on {interval} timeframe...")
+        logger.info("🔍 Analyzing %s on %s timeframe...", symbol, interval)
         
         # Fetch data
         df = self.data_fetcher.get_futures_klines(symbol, interval, lookback)
         if df is None:
             return None
         
-        # Initialize wave analyzer
-        wa = WaveAnalyzer(df=df, verbose=False)
+        return self.analyze_dataframe(df, symbol, interval, time_budget_ms)
+    
+    def analyze_dataframe(self, df, symbol, interval='1h', time_budget_ms=None):
+        """
+        Perform Elliott Wave analysis on already fetched candles
+        
+        Args:
+            df: Klines of the trading pair (see BinanceDataFetcher.get_futures_klines)
+            symbol: Trading pair (e.g., 'BTCUSDT')
+            interval: Timeframe of df
+            time_budget_ms: Anytime mode: search the most promising start indices first until the time is up
+                (instead of stopping after 25 patterns) and return the best signals first. None: no budget
+            
+        Returns:
+            Dictionary with analysis results and trading signals. 'coverage' is the fraction of the start
+            indices searched, 'stats' the work done (see metrics.record_analysis).
+        """
+        started = time.perf_counter()
+        deadline = started + time_budget_ms / 1000 if time_budget_ms is not None else None
         
-        # Generate wave options
+        # Generate wave options (precomputed table, shared process-wide)
         wave_options = WaveOptionsGenerator5(up_to=self.max_skip_value)
         
         # Set up Elliott Wave rules
@@ -92,7 +140,8 @@ class ElliottWaveTradingSystem:
         start_range = max(0, total_candles - lookback_candles)
         end_range = int(total_candles * 0.95)  # Search up to 95% (allow patterns to extend to end)
         
-        print(f"🔍 Fresh Pattern Mode: Analyzing last {lookback_candles} candles (from {start_range} to {end_range})")
+        logger.debug("🔍 Fresh Pattern Mode: Analyzing last %d candles (from %d to %d)",
+                     lookback_candles, start_range, end_range)
         
         analysis_results = {
             'symbol': symbol,
@@ -101,62 +150,180 @@ class ElliottWaveTradingSystem:
             'timestamp': datetime.now(),
             'bullish_patterns': [],
             'bearish_patterns': [],
-            'signals': []
+            'signals': [],
+            'coverage': 1.0
         }
         
-        print(f"🔍 Searching for Elliott Wave patterns...")
+        logger.debug("🔍 Searching for Elliott Wave patterns...")
         patterns_found = 0
-        
-        # Search for patterns from multiple starting points
-        for start_idx in range(start_range, end_range, 5):  # More frequent checks (every 5 candles)
+        patterns_passed = {rule.name: 0 for rule in rules}
+        starts_searched = 0
+        
+        # Search for patterns from multiple starting points (options are sorted from small to large skips, the most
+        # likely ones first)
+        options = list(wave_options.iter_sorted(limit=100))  # Increased from 50 to 100 for more patterns
+        if self.streaming:
+            # Only the waves reaching the new candles are searched again, wave indices are stream positions
+            previous = self.wave_streams.get((symbol, interval))
+            work_before = (previous.no_options_searched, previous.no_monowaves_built) if previous else (0, 0)
+            stream, offset = self._wave_stream(symbol, interval, df, options, rules, lookback_candles)
+            analyzer = stream
+            if stream is not previous:
+                work_before = (0, 0)  # rebuilt
+            start_indices = [idx_start for idx_start in sorted(stream.states) if idx_start - offset < end_range]
+            if deadline is not None:
+                start_indices = self._lowest_first(stream.lows, start_indices)
+            starts = ((idx_start - offset, stream.patterns_from(idx_start)) for idx_start in start_indices)
+        elif self.parallel is not None:
+            # Start indices are searched in worker processes and merged in order
+            wa = WaveAnalyzer(df=df, verbose=False)
+            offset = 0
+            analyzer, work_before = wa, (0, 0)
+            start_indices = self._start_indices(wa, start_range, end_range)
+            if deadline is not None:
+                start_indices = self._lowest_first(wa.lows, start_indices)
+            starts = self.parallel.find_impulsive_waves(wa, start_indices, options, rules)
+        else:
+            wa = WaveAnalyzer(df=df, verbose=False)
+            offset = 0
+            analyzer, work_before = wa, (0, 0)
+            start_indices = self._start_indices(wa, start_range, end_range)
+            if deadline is not None:
+                start_indices = self._lowest_first(wa.lows, start_indices)
+            starts = ((start_idx, wa.find_impulsive_waves(start_idx, options, rules)) for start_idx in start_indices)
+        
+        for start_idx, found_waves in starts:
+            starts_searched += 1
             
-            # Look for bullish impulse waves (starting from lows)
-            for option in list(wave_options.options_sorted)[:100]:  # Increased from 50 to 100 for more patterns
-                
-                waves = wa.find_impulsive_wave(idx_start=start_idx, wave_config=option.values)
+            # Look for bullish impulse waves (starting from lows), options sharing a prefix share their waves
+            for option, waves, passed_rules in found_waves:
+                pattern = WavePattern(waves, verbose=False)
                 
-                if waves and len(waves) == 5:
-                    pattern = WavePattern(waves, verbose=False)
+                # Pattern satisfies these Elliott Wave rules
+                for rule in passed_rules:
+                    patterns_found += 1
+                    patterns_passed[rule.name] += 1
                     
-                    # Check if pattern satisfies Elliott Wave rules
-                    for rule in rules:
-                        if pattern.check_rule(rule):
-                            patterns_found += 1
-                            
-                            # Analyze pattern for trading signals
-                            signal = self._analyze_pattern_for_signals(pattern, df, symbol, rule.name)
-                            
-                            # Debug logging
-                            if signal:
-                                print(f"   ✅ Signal generated: {signal['type']} at {signal['entry_price']:.2f} (confidence: {signal['confidence']:.2%})")
-                            
-                            if signal:
-                                analysis_results['bullish_patterns'].append({
-                                    'start_idx': start_idx,
-                                    'wave_config': option.values,
-                                    'rule': rule.name,
-                                    'pattern': pattern,
-                                    'confidence': self._calculate_pattern_confidence(pattern)
-                                })
-                                analysis_results['signals'].append(signal)
+                    # Analyze pattern for trading signals
+                    signal = self._analyze_pattern_for_signals(pattern, df, symbol, rule.name, offset)
+                    
+                    if signal:
+                        logger.debug("   ✅ Signal generated: %s at %.2f (confidence: %.2f%%)",
+                                     signal['type'], signal['entry_price'], signal['confidence'] * 100)
+                        
+                        analysis_results['bullish_patterns'].append({
+                            'start_idx': start_idx,
+                            'wave_config': option.values,
+                            'rule': rule.name,
+                            'pattern': pattern,
+                            'confidence': self._calculate_pattern_confidence(pattern)
+                        })
+                        analysis_results['signals'].append(signal)
             
             # Limit computation time (increased limit for more signals)
-            if patterns_found > 25:
+            if deadline is None and patterns_found > 25:
                 break
+            
+            # Anytime mode: keep what was found when the time is up
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        
+        # Stop the search of the remaining start indices (e.g. in worker processes)
+        starts.close()
         
-        print(f"✅ Analysis complete: {patterns_found} patterns found")
-        print(f"📈 Bullish patterns: {len(analysis_results['bullish_patterns'])}")
-        print(f"🎯 Trading signals: {len(analysis_results['signals'])}")
+        if len(start_indices) > 0:
+            analysis_results['coverage'] = starts_searched / len(start_indices)
+        
+        # Work done, recorded as metrics by the process of the bot (the analysis may run in a worker process)
+        analysis_results['stats'] = {
+            'analysis_seconds': time.perf_counter() - started,
+            'options_evaluated': analyzer.no_options_searched - work_before[0],
+            'monowaves_built': analyzer.no_monowaves_built - work_before[1],
+            'patterns_passed': patterns_passed,
+        }
+        
+        if deadline is not None:
+            # Best signals first, the caller may only take the first ones
+            analysis_results['signals'].sort(key=lambda signal: signal['confidence'], reverse=True)
+            analysis_results['bullish_patterns'].sort(key=lambda pattern: pattern['confidence'], reverse=True)
+            logger.info("⏱️ %s %s: searched %.0f%% of %d start points in %.0fms (budget %sms)",
+                        symbol, interval, analysis_results['coverage'] * 100, len(start_indices),
+                        (time.perf_counter() - started) * 1000, time_budget_ms)
+        
+        logger.info("✅ %s %s: %d patterns found, %d bullish patterns, %d trading signals", symbol, interval,
+                    patterns_found, len(analysis_results['bullish_patterns']), len(analysis_results['signals']))
         
         # Debug: Log pattern detection details
         if patterns_found > 0 and len(analysis_results['signals']) == 0:
-            print(f"⚠️  DEBUG: Found {patterns_found} patterns but 0 signals - patterns may not meet signal criteria")
+            logger.debug("⚠️  %s %s: found %d patterns but 0 signals - patterns may not meet signal criteria",
+                         symbol, interval, patterns_found)
         
         return analysis_results
     
-    def _analyze_pattern_for_signals(self, pattern, df, symbol, rule_name):
+    def _start_indices(self, wa, start_range, end_range):
+        """
+        Start indices of the wave search between start_range and end_range
+        
+        Args:
+            wa: WaveAnalyzer with the candles
+            start_range: First candle to start from
+            end_range: End of the start candles (exclusive)
+            
+        Returns:
+            Every 5th candle, or the swing lows of the candles in pivot mode
+        """
+        if self.pivot_atr is None:
+            return range(start_range, end_range, 5)  # More frequent checks (every 5 candles)
+        return wa.pivot_starts(start_range, end_range, min_swing=atr_swing(wa.lows, wa.highs, multiple=self.pivot_atr))
+    
+    @staticmethod
+    def _lowest_first(lows, start_indices):
+        """
+        Order start indices by how promising they are: an impulse from a lower low is less likely to be broken by
+        the lows of the waves 2 and 4, so lower starts come first
+        
+        Args:
+            lows: Lows the start indices refer to
+            start_indices: Start indices of the wave search
+            
+        Returns:
+            List of the start indices, lowest first (ties in the original order)
+        """
+        return sorted(start_indices, key=lambda idx: lows[idx])
+    
+    def _wave_stream(self, symbol, interval, df, options, rules, lookback_candles):
+        """
+        Get the StreamingWaveAnalyzer of a symbol, updated with the candles of df
+        
+        Args:
+            symbol: Trading pair (e.g., 'BTCUSDT')
+            interval: Timeframe of df
+            df: Latest candles of the symbol
+            options: WaveOptions to search
+            rules: Elliott Wave rules to check
+            lookback_candles: Number of recent candles to start patterns from
+            
+        Returns:
+            Tuple of the analyzer and the offset of its indices to the indices of df
+        """
+        key = (symbol, interval)
+        stream = self.wave_streams.get(key)
+        
+        # Rebuild if there is a gap between the stream and the new candles
+        if (stream is None or stream.lookback != lookback_candles or stream.pivot_atr != self.pivot_atr
+                or stream.extend(df) is None):
+            stream = StreamingWaveAnalyzer(df, options, rules, lookback=lookback_candles, step=5,
+                                           pivot_atr=self.pivot_atr)
+            self.wave_streams[key] = stream
+        
+        return stream, stream.n - len(df)
+    
+    def _analyze_pattern_for_signals(self, pattern, df, symbol, rule_name, index_offset=0):
         """
         Analyze an Elliott Wave pattern to generate trading signals
+        
+        Args:
+            index_offset: Offset of the wave indices to the indices of df (streaming mode)
         """
         waves = pattern.waves
         current_price = float(df['Close'].iloc[-1])
@@ -174,7 +341,7 @@ class ElliottWaveTradingSystem:
         
         # Determine pattern completion status
         wave5_end_idx = wave5.idx_end
-        total_candles = len(df)
+        total_candles = len(df) + index_offset
         
         # Signal generation logic
         signal = None
@@ -239,25 +406,31 @@ class ElliottWaveTradingSystem:
                     'risk_reward_ratio': self._calculate_risk_reward(current_price, current_price * 1.02, wave4_low)
                 }
         
-        # DEBUG: Log why pattern didn't generate a signal
-        if signal is None:
+        # DEBUG: Log why pattern didn't generate a signal (most patterns are rejected, the level is checked first)
+        if signal is None and logger.isEnabledFor(logging.DEBUG):
             candles_since_completion = total_candles - wave5_end_idx
-            wave4_end_to_current = total_candles - 1 - wave4.idx_end
-            wave5_start_to_current = total_candles - 1 - wave5.idx_start
-            
-            print(f"   🔍 DEBUG: Pattern rejected for {symbol}:")
-            print(f"      • Wave 5 ended {candles_since_completion} candles ago (need ≤75)")
-            print(f"      • Current position: candle {total_candles-1}, Wave 4 ended at {wave4.idx_end}, Wave 5: {wave5.idx_start}-{wave5_end_idx}")
-            print(f"      • Wave 5 high: ${wave5.high:.2f}, Wave 3 high: ${wave3.high:.2f}, Current: ${current_price:.2f}")
-            print(f"      • In Wave 4 zone? {wave4_low <= current_price <= wave3.high * 0.8} (range: ${wave4_low:.2f} - ${wave3.high * 0.8:.2f})")
             
             # Check which condition was closest
             if candles_since_completion <= 90:
-                print(f"      ⚠️  Close! Only {candles_since_completion - 75} candles over limit")
+                closest = f"⚠️  Close! Only {candles_since_completion - 75} candles over limit"
+            else:
+                closest = ""
             if wave5.high > wave3.high:
-                print(f"      ✅ Wave 5 extended past Wave 3 (good structure)")
+                structure = "✅ Wave 5 extended past Wave 3 (good structure)"
             else:
-                print(f"      ❌ Wave 5 did NOT extend past Wave 3 (weak pattern)")
+                structure = "❌ Wave 5 did NOT extend past Wave 3 (weak pattern)"
+            
+            logger.debug("   🔍 Pattern rejected for %s:\n"
+                         "      • Wave 5 ended %d candles ago (need ≤75)\n"
+                         "      • Current position: candle %d, Wave 4 ended at %d, Wave 5: %d-%d\n"
+                         "      • Wave 5 high: $%.2f, Wave 3 high: $%.2f, Current: $%.2f\n"
+                         "      • In Wave 4 zone? %s (range: $%.2f - $%.2f)\n"
+                         "      %s%s",
+                         symbol, candles_since_completion,
+                         total_candles - 1, wave4.idx_end, wave5.idx_start, wave5_end_idx,
+                         wave5.high, wave3.high, current_price,
+                         wave4_low <= current_price <= wave3.high * 0.8, wave4_low, wave3.high * 0.8,
+                         closest + "\n      " if closest else "", structure)
         
         return signal
     
@@ -383,6 +556,7 @@ class ElliottWaveTradingSystem:
 
 # Demo Usage
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     print("=== ELLIOTT WAVE TRADING SYSTEM DEMO ===\n")
     
     # Initialize trading system (paper trading mode)
@@ -27,6 +27,29 @@ class BotConfig:
             'scan_frequency': 300,  # seconds (5 minutes)
             'max_positions': 3,     # maximum concurrent positions
             
+            # Concurrent scanning
+            'fetch_workers': 8,                     # threads fetching market data
+            'analysis_workers': None,               # processes for wave analysis (None: no. of CPUs, 0: in threads)
+            'analysis_budget_ms': None,             # wave search time per pair, best signals first (None: no limit)
+            'max_request_weight_per_minute': 1200,  # Binance Futures allows 2400
+            'symbol_rules_ttl': 3600,               # seconds the cached exchange info (lot / tick sizes) is kept
+            'use_batch_orders': False,              # SL / TP in one batch request instead of two concurrent ones
+            'use_user_data_stream': True,           # positions / fills pushed by Binance instead of polled
+            'position_reconcile_interval': 300,     # seconds between REST reconciliations of the positions
+            
+            # WebSocket ingestion: analyze on candle close instead of every scan_frequency seconds
+            'use_websocket': False,
+            'websocket_buffer_size': 1000,  # candles kept per (symbol, interval)
+            
+            # Candle aggregation: fetch / stream one base interval per symbol, roll up the others from it
+            'aggregate_intervals': True,
+            'base_interval': None,  # None: finest configured interval (1m if the others are no multiples of it)
+            
+            # Metrics of the hot paths (fetch latency, analysis time, options / MonoWaves / rules, order round trips)
+            'metrics_port': None,           # local Prometheus endpoint, e.g. 9108 (None: off)
+            'metrics_json_path': None,      # JSON dump of the metrics, e.g. 'metrics.json' (None: off)
+            'metrics_json_interval': 60,    # seconds between the JSON dumps
+            
             # Risk management
             'risk_per_trade': 0.02,     # 2% risk per trade
             'account_balance': 100000,  # USDT balance for position sizing
@@ -48,6 +71,7 @@ class BotConfig:
             
             # Logging and notifications
             'log_level': 'INFO',
+            'log_levels': {},           # levels per subsystem, e.g. {'elliott.analysis': 'DEBUG', 'elliott.fetch': 'WARNING'}
             'log_to_file': True,
             'console_output': True,
             'enable_alerts': False,
@@ -109,6 +133,7 @@ class BotConfig:
         print(f"\n⏰ TIMEFRAMES: {', '.join(self.config['intervals'])}")
         print(f"🔄 SCAN FREQUENCY: {self.config['scan_frequency']} seconds")
         print(f"📈 MAX POSITIONS: {self.config['max_positions']}")
+        print(f"⚡ WORKERS: {self.config['fetch_workers']} fetch, {self.config['analysis_workers'] or 'auto'} analysis")
         
         print(f"\n💰 RISK MANAGEMENT:")
         print(f"   • Risk per trade: {self.config['risk_per_trade']*100}%")
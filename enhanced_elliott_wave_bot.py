@@ -4,14 +4,25 @@ Uses external configuration file for easy parameter adjustment
 """
 
 import os
+import sys
 import time
+import queue
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional
 import json
+import functools
 
 from elliott_wave_trading_system import ElliottWaveTradingSystem
 from enhanced_bot_config import BotConfig
+from scan_pipeline import ScanPipeline, RateLimiter, analyze_klines
+from kline_stream import KlineStream
+from candle_aggregator import CandleAggregator
+from market_snapshot import MarketSnapshot
+from order_execution import OrderExecutionEngine
+from position_tracker import PositionTracker, UserDataStream
+import metrics
+import log_setup
 
 
 class EnhancedElliottWaveTradingBot:
@@ -24,10 +35,96 @@ class EnhancedElliottWaveTradingBot:
         self.config_manager = BotConfig(config_file)
         self.config = self.config_manager.config
         
+        # Setup logging (first, the components below log through it)
+        self.setup_logging()
+        
         # Initialize trading system
         self.trading_system = ElliottWaveTradingSystem(api_key, api_secret, testnet)
         self.data_fetcher = self.trading_system.data_fetcher
         
+        # Concurrent scanning: fetch threads share the request weight limit, wave analysis runs in processes
+        self.data_fetcher.rate_limiter = RateLimiter(self.config['max_request_weight_per_minute'])
+        self.data_fetcher.symbol_rules.ttl = self.config['symbol_rules_ttl']
+        
+        # Volume / spread of all symbols, fetched with two requests per scan instead of one per pair
+        self.market_snapshot = MarketSnapshot(self.data_fetcher.get_all_tickers, self.data_fetcher.get_all_book_tickers)
+        
+        # Entry and SL / TP bracket without polling, latency of every stage is reported
+        self.order_engine = OrderExecutionEngine(self.data_fetcher.client, use_batch_orders=self.config['use_batch_orders'])
+        
+        # Positions, fills and PnL pushed by the user data stream, REST only reconciles on a slow timer
+        self.closed_positions = queue.Queue()
+        self.position_tracker = PositionTracker(
+            on_position_closed=lambda symbol, position: self.closed_positions.put((symbol, position)),
+            on_order_update=self.order_engine.on_order_update
+        )
+        self.user_data_stream = None
+        if self.config['use_user_data_stream']:
+            self.user_data_stream = UserDataStream(
+                self.data_fetcher.client,
+                self.position_tracker,
+                testnet=testnet,
+                reconcile_interval=self.config['position_reconcile_interval']
+            )
+        self.realized_pnl_seen = 0.0
+        analysis_workers = self.config['analysis_workers']
+        analyze = analyze_klines if analysis_workers != 0 else self.trading_system.analyze_dataframe
+        self.scan_pipeline = ScanPipeline(
+            self.fetch_pair,
+            analyze=functools.partial(analyze, time_budget_ms=self.config['analysis_budget_ms']),
+            fetch_workers=self.config['fetch_workers'],
+            analysis_workers=analysis_workers,
+            worker_init=self.log_pipeline.worker_initializer() if self.log_pipeline and analysis_workers != 0 else None
+        )
+        
+        # Higher timeframes rolled up from one base interval per symbol. The base history is long (500 candles
+        # of the highest timeframe), so it needs the candle cache or the kline stream to be fetched only once.
+        self.candle_aggregator = None
+        if self.config['aggregate_intervals']:
+            if self.config['use_websocket']:
+                self.candle_aggregator = CandleAggregator(
+                    self.config['intervals'],
+                    fetch=lambda symbol, interval, limit: self.kline_stream.candles(symbol, interval)[-limit:],
+                    base_interval=self.config['base_interval'],
+                    max_age=0,  # the stream buffer is always current
+                    fetch_direct=self.data_fetcher.get_klines_array  # REST, if the buffered history is short
+                )
+            elif self.data_fetcher.candle_cache is not None:
+                self.candle_aggregator = self.data_fetcher.enable_candle_aggregation(
+                    self.config['intervals'], base_interval=self.config['base_interval'])
+            else:
+                self.safe_log("warning", "Candle aggregation needs the candle cache (CANDLE_CACHE_DIR) or WebSocket "
+                              "mode, fetching every interval", "⚠️")
+        
+        # Optional WebSocket ingestion, pairs are analyzed as soon as their candle closes
+        self.kline_stream = None
+        self.closed_pairs = queue.Queue()
+        if self.config['use_websocket']:
+            stream_intervals = self.config['intervals']
+            capacity = self.config['websocket_buffer_size']
+            if self.candle_aggregator is not None:
+                # only the base interval is streamed, the others close together with one of its candles
+                stream_intervals = [self.candle_aggregator.base_interval] + [
+                    interval for interval in self.config['intervals'] if not self.candle_aggregator.can_derive(interval)]
+                capacity = max(capacity, self.candle_aggregator.base_lookback)
+            self.kline_stream = KlineStream(
+                self.config['symbols'],
+                stream_intervals,
+                on_candle_close=self.on_candle_close,
+                history=lambda symbol, interval: self.data_fetcher.get_klines_array(symbol, interval, capacity),
+                capacity=capacity,
+                testnet=testnet
+            )
+        
+        # Metrics of fetching, analysis and orders: Prometheus endpoint and / or periodic JSON dump
+        self.metrics_server = None
+        if self.config['metrics_port'] is not None:
+            self.metrics_server = metrics.MetricsServer(self.config['metrics_port'])
+        self.metrics_dumper = None
+        if self.config['metrics_json_path']:
+            self.metrics_dumper = metrics.JsonDumper(self.config['metrics_json_path'],
+                                                     self.config['metrics_json_interval'])
+        
         # Trading state
         self.active_positions = {}
         self.bot_running = False
@@ -35,32 +132,38 @@ class EnhancedElliottWaveTradingBot:
         self.trade_count = 0
         self.start_time = datetime.now()
         
-        # Setup logging
-        self.setup_logging()
-        
         self.safe_log("info", "Enhanced Elliott Wave Trading Bot initialized", "🤖")
-        self.safe_log("info", f"Loaded configuration from {config_file}", "📊")
+        self.safe_log("info", "Loaded configuration from %s", "📊", config_file)
         self.config_manager.print_config()
     
     def setup_logging(self):
-        """Setup enhanced logging system"""
+        """Setup enhanced logging system, records are queued and written by a listener thread"""
+        self.log_pipeline = None
         try:
             # Setup file logging with UTF-8 encoding
             log_filename = f"enhanced_elliott_wave_bot_{datetime.now().strftime('%Y%m%d')}.log"
             
-            logging.basicConfig(
-                level=getattr(logging, self.config['log_level']),
-                format='%(asctime)s - %(levelname)s - %(message)s',
-                handlers=[
-                    logging.FileHandler(log_filename, encoding='utf-8'),
-                    logging.StreamHandler() if self.config['console_output'] else logging.NullHandler()
-                ]
-            )
+            handlers = []
+            if self.config['log_to_file']:
+                handlers.append(logging.FileHandler(log_filename, encoding='utf-8'))
+            if self.config['console_output']:
+                # the listener thread writes the records, emoji a console cannot encode are replaced there
+                if hasattr(sys.stderr, 'reconfigure'):
+                    sys.stderr.reconfigure(errors='replace')
+                handlers.append(logging.StreamHandler())
+            for handler in handlers:
+                handler.setFormatter(logging.Formatter(log_setup.FORMAT))
+            
+            # Levels per subsystem, e.g. {'elliott.analysis': 'DEBUG'} to log the rejected patterns
+            self.log_pipeline = log_setup.LogPipeline(handlers, self.config['log_level'], self.config['log_levels'])
+            self.log_pipeline.start()
             self.logger = logging.getLogger(__name__)
-            self.safe_log("info", f"Logging setup complete: {log_filename}", "📝")
+            self.safe_log("info", "Logging setup complete: %s", "📝",
+                          log_filename if self.config['log_to_file'] else "console")
             
         except Exception as e:
             # Fallback logging setup
+            self.log_pipeline = None
             logging.basicConfig(
                 level=logging.INFO,
                 format='%(asctime)s - %(levelname)s - %(message)s'
@@ -68,25 +171,43 @@ class EnhancedElliottWaveTradingBot:
             self.logger = logging.getLogger(__name__)
             self.logger.warning(f"UTF-8 logging setup failed: {e}. Using fallback logging.")
     
-    def safe_log(self, level: str, message: str, emoji: str = ""):
-        """Safe logging method that handles Unicode encoding issues"""
-        try:
-            # Try logging with emoji
-            full_message = f"{emoji} {message}" if emoji else message
-            getattr(self.logger, level)(full_message)
-        except UnicodeEncodeError:
-            # Fall back to message without emoji
-            getattr(self.logger, level)(message)
+    def safe_log(self, level: str, message: str, emoji: str = "", *args):
+        """
+        Log a message with an emoji. Nothing is formatted if the level is disabled, args are merged into the
+        message (like logger.info) only when the record is written. Emoji the console cannot encode are replaced
+        by its stream (see setup_logging).
+        """
+        log_level = logging.getLevelName(level.upper())
+        if not self.logger.isEnabledFor(log_level):
+            return
+        self.logger.log(log_level, f"{emoji} {message}" if emoji else message, *args)
     
     def start_trading(self):
         """Start the enhanced automated trading loop"""
         self.bot_running = True
         self.safe_log("info", "Starting Enhanced Elliott Wave Trading Bot...", "🚀")
-        self.safe_log("info", f"Monitoring {len(self.config['symbols'])} symbols across {len(self.config['intervals'])} timeframes", "📊")
+        self.safe_log("info", "Monitoring %s symbols across %s timeframes", "📊",
+                      len(self.config['symbols']), len(self.config['intervals']))
         
         # Check account balance
         self.check_account_balance()
         
+        # Load the symbol rules once, orders are rounded without fetching the exchange info
+        self.load_symbol_rules()
+        
+        if self.user_data_stream is not None:
+            self.user_data_stream.start()
+        
+        if self.kline_stream is not None:
+            self.kline_stream.start()
+        
+        if self.metrics_server is not None:
+            self.metrics_server.start()
+            self.safe_log("info", "Metrics on http://%s:%s/metrics", "📊",
+                          self.metrics_server.host, self.metrics_server.port)
+        if self.metrics_dumper is not None:
+            self.metrics_dumper.start()
+        
         try:
             while self.bot_running:
                 # Check daily loss limit
@@ -95,7 +216,10 @@ class EnhancedElliottWaveTradingBot:
                     break
                 
                 # Scan markets for opportunities
-                self.scan_and_trade()
+                if self.kline_stream is not None:
+                    self.scan_closed_candles(timeout=self.config['scan_frequency'])
+                else:
+                    self.scan_and_trade()
                 
                 # Check and manage existing positions
                 self.manage_positions()
@@ -104,12 +228,13 @@ class EnhancedElliottWaveTradingBot:
                 self.log_enhanced_status()
                 
                 # Wait for next scan
-                time.sleep(self.config['scan_frequency'])
+                if self.kline_stream is None:
+                    time.sleep(self.config['scan_frequency'])
                 
         except KeyboardInterrupt:
             self.safe_log("info", "Bot stopped by user", "⏹️")
         except Exception as e:
-            self.safe_log("error", f"Bot error: {str(e)}", "❌")
+            self.safe_log("error", "Bot error: %s", "❌", e)
         finally:
             self.shutdown()
     
@@ -120,17 +245,28 @@ class EnhancedElliottWaveTradingBot:
             total_balance = float(account['totalWalletBalance'])
             available_balance = float(account['availableBalance'])
             
-            self.safe_log("info", 
-                f"💰 Account Balance: ${total_balance:.2f} USDT "
-                f"(Available: ${available_balance:.2f})", "💰")
+            self.safe_log("info", "Account Balance: $%.2f USDT (Available: $%.2f)", "💰",
+                          total_balance, available_balance)
             
             if available_balance < 10:
-                self.safe_log("warning", 
-                    f"⚠️ Low balance! Available: ${available_balance:.2f} USDT. "
-                    f"Minimum recommended: $10 USDT", "⚠️")
+                self.safe_log("warning", "Low balance! Available: $%.2f USDT. Minimum recommended: $10 USDT", "⚠️",
+                              available_balance)
                 
         except Exception as e:
-            self.safe_log("error", f"Error checking account balance: {str(e)}", "❌")
+            self.safe_log("error", "Error checking account balance: %s", "❌", e)
+    
+    def load_symbol_rules(self):
+        """Load the trading rules of all contracts and check the configured symbols against them"""
+        try:
+            count = self.data_fetcher.symbol_rules.refresh()
+            self.safe_log("info", "Loaded trading rules of %s futures contracts", "📏", count)
+            
+            unknown = [symbol for symbol in self.config['symbols'] if symbol not in self.data_fetcher.symbol_rules]
+            if unknown:
+                self.safe_log("warning", "Symbols not listed on Binance Futures: %s", "⚠️", ', '.join(unknown))
+            
+        except Exception as e:
+            self.safe_log("error", "Error loading symbol rules (retried on first trade): %s", "❌", e)
     
     def check_daily_loss_limit(self) -> bool:
         """Check if daily loss limit has been reached"""
@@ -140,210 +276,203 @@ class EnhancedElliottWaveTradingBot:
         return False
     
     def scan_and_trade(self):
-        """Enhanced market scanning with better filtering"""
-        self.safe_log("info", f"Scanning {len(self.config['symbols'])} symbols...", "🔍")
-        
-        for symbol in self.config['symbols']:
-            for interval in self.config['intervals']:
-                try:
-                    # Skip if we already have max positions
-                    if len(self.active_positions) >= self.config['max_positions']:
-                        continue
-                    
-                    # Check if symbol exists and get market data with volume filtering
-                    if not self.check_market_conditions(symbol):
-                        continue
-                    
-                    # Analyze Elliott Wave patterns
-                    analysis_results = self.trading_system.analyze_symbol(symbol, interval)
-                    
-                    if analysis_results and analysis_results.get('signals'):
-                        signals = analysis_results['signals']
-                        
-                        # Apply enhanced signal filtering
-                        valid_signals = [
-                            s for s in signals 
-                            if isinstance(s, dict) and 
-                            s.get('confidence', 0) >= self.config['min_confidence'] and
-                            s.get('risk_reward_ratio', 0) >= self.config['min_risk_reward']
-                        ]
-                        
-                        if valid_signals:
-                            self.safe_log("info", f"✅ Valid signals found for {symbol} {interval}: {len(valid_signals)}", "✅")
-                            
-                            for signal in valid_signals:
-                                self.safe_log("info", f"🎯 Attempting to execute trade for {symbol} {interval}", "")
-                                self.safe_log("info", f"   Signal details: {signal.get('direction')} @ {signal.get('entry_price')} (confidence: {signal.get('confidence'):.1%})", "")
-                                self.execute_trade(signal, symbol, interval)
-                    
-                except Exception as e:
-                    # Handle specific error types
-                    if "Invalid symbol" in str(e) or "does not exist" in str(e):
-                        self.safe_log("warning", f"Symbol {symbol} not available on futures, skipping", "⚠️")
-                        continue
-                    else:
-                        self.safe_log("error", f"Error analyzing {symbol} {interval}: {str(e)}", "❌")
+        """Enhanced market scanning with better filtering, all pairs are fetched and analyzed concurrently"""
+        self.safe_log("info", "Scanning %d symbols...", "🔍", len(self.config['symbols']))
+        
+        pairs = [(symbol, interval) for symbol in self.config['symbols'] for interval in self.config['intervals']]
+        self.refresh_market_snapshot()
+        scan_time = self.scan_pipeline.run(pairs, self.handle_analysis)
+        
+        self.safe_log("info", "Scan of %d pairs completed in %.1fs", "⏱️", len(pairs), scan_time)
     
-    def check_market_conditions(self, symbol: str) -> bool:
-        """Check if market conditions are suitable for trading"""
+    def scan_closed_candles(self, timeout: float):
+        """Wait up to timeout seconds for closed candles (WebSocket mode) and analyze their pairs"""
         try:
-            # Get 24h ticker data using correct futures API method
-            ticker = self.data_fetcher.client.futures_ticker(symbol=symbol)
-            
-            # Check volume requirement
-            volume_24h = float(ticker['quoteVolume'])
-            if volume_24h < self.config['min_volume_24h']:
-                return False
-            
-            # Check spread (if data available)
-            bid_price = float(ticker.get('bidPrice', 0))
-            ask_price = float(ticker.get('askPrice', 0))
-            
-            if bid_price > 0 and ask_price > 0:
-                spread = (ask_price - bid_price) / bid_price
-                if spread > self.config['max_spread_percentage']:
-                    return False
-            
-            return True
+            closed = {self.closed_pairs.get(timeout=timeout)}
+        except queue.Empty:
+            return
+        
+        # Candles of all symbols close at the same time, analyze them in one pipeline run
+        deadline = time.monotonic() + 0.25
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                closed.add(self.closed_pairs.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        pairs = [(symbol, interval) for symbol in self.config['symbols'] for interval in self.config['intervals']
+                 if (symbol, interval) in closed]
+        self.safe_log("info", "Candle closed for %d pairs, analyzing...", "🔔", len(pairs))
+        self.refresh_market_snapshot()
+        self.scan_pipeline.run(pairs, self.handle_analysis)
+    
+    def on_candle_close(self, symbol: str, interval: str, candles):
+        """Kline stream callback (stream thread): queue the pairs whose candle closed for analysis"""
+        if self.candle_aggregator is not None and interval == self.candle_aggregator.base_interval:
+            for closed_interval in self.candle_aggregator.closed_intervals(candles['close_time'][-1]):
+                self.closed_pairs.put((symbol, closed_interval))
+        else:
+            self.closed_pairs.put((symbol, interval))
+    
+    def refresh_market_snapshot(self):
+        """Fetch the tickers of all symbols once for the market condition checks of a scan"""
+        try:
+            self.market_snapshot.refresh()
+        except Exception as e:
+            self.safe_log("warning", "Could not refresh market snapshot: %s", "⚠️", e)
+    
+    def fetch_pair(self, symbol: str, interval: str):
+        """Fetch stage of the scan pipeline (runs in a fetch thread)"""
+        # Skip if we already have max positions
+        if len(self.active_positions) >= self.config['max_positions']:
+            return None
+        
+        # Check if symbol exists and get market data with volume filtering
+        if not self.check_market_conditions(symbol):
+            return None
+        
+        with metrics.FETCH_SECONDS.time(symbol=symbol, interval=interval):
+            if self.kline_stream is not None:
+                # Streamed candles, no REST call needed
+                if self.candle_aggregator is not None and self.candle_aggregator.can_derive(interval):
+                    candles = self.candle_aggregator.get_klines(symbol, interval, 500)
+                else:
+                    candles = self.kline_stream.candles(symbol, interval)[-500:]
+                return self.data_fetcher.candles_to_dataframe(candles) if len(candles) > 0 else None
+            
+            return self.data_fetcher.get_futures_klines(symbol, interval, 500)  # default lookback of analyze_symbol
+    
+    def handle_analysis(self, symbol: str, interval: str, analysis_results: Optional[Dict], error: Optional[Exception]):
+        """Signal sink of the scan pipeline, called in the order of the scanned pairs"""
+        if error is not None:
+            # Handle specific error types
+            if "Invalid symbol" in str(error) or "does not exist" in str(error):
+                self.safe_log("warning", "Symbol %s not available on futures, skipping", "⚠️", symbol)
+            else:
+                self.safe_log("error", "Error analyzing %s %s: %s", "❌", symbol, interval, error)
+            return
+        
+        metrics.record_analysis(symbol, interval, analysis_results)
+        
+        try:
+            # Positions may have been opened by the pairs before
+            if len(self.active_positions) >= self.config['max_positions']:
+                return
             
+            if analysis_results and analysis_results.get('signals'):
+                signals = analysis_results['signals']
+                
+                # Apply enhanced signal filtering
+                valid_signals = [
+                    s for s in signals 
+                    if isinstance(s, dict) and 
+                    s.get('confidence', 0) >= self.config['min_confidence'] and
+                    s.get('risk_reward_ratio', 0) >= self.config['min_risk_reward']
+                ]
+                
+                if valid_signals:
+                    self.safe_log("info", "Valid signals found for %s %s: %d", "✅",
+                                  symbol, interval, len(valid_signals))
+                    
+                    for signal in valid_signals:
+                        self.safe_log("info", "🎯 Attempting to execute trade for %s %s", "", symbol, interval)
+                        self.safe_log("info", "   Signal details: %s @ %s (confidence: %.1f%%)", "",
+                                      signal.get('direction'), signal.get('entry_price'), signal.get('confidence') * 100)
+                        self.execute_trade(signal, symbol, interval)
+        
         except Exception as e:
-            self.safe_log("warning", f"Could not check market conditions for {symbol}: {str(e)}", "⚠️")
+            self.safe_log("error", "Error analyzing %s %s: %s", "❌", symbol, interval, e)
+    
+    def check_market_conditions(self, symbol: str) -> bool:
+        """Check if market conditions are suitable for trading"""
+        # 24h volume and spread from the snapshot of the current scan, no request per pair
+        passed = self.market_snapshot.passes_filters(
+            symbol, self.config['min_volume_24h'], self.config['max_spread_percentage'])
+        
+        if passed is None:
+            self.safe_log("warning", "Could not check market conditions for %s: no ticker in snapshot", "⚠️", symbol)
             return True  # Default to allow trading if check fails
+        
+        return passed
     
     def execute_trade(self, signal: Dict, symbol: str, interval: str):
         """Execute trade with enhanced risk management and REAL order placement"""
-        self.safe_log("info", f"🔵 EXECUTE_TRADE called for {symbol} {interval}", "")
+        self.safe_log("info", "🔵 EXECUTE_TRADE called for %s %s", "", symbol, interval)
         
         try:
-            self.safe_log("info", f"   Step 1: Calculating position size...", "")
+            self.safe_log("info", "   Step 1: Calculating position size...", "")
             # Calculate position size based on risk
             position_size = self.calculate_position_size(signal)
-            self.safe_log("info", f"   Position size calculated: ${position_size:.2f} USDT", "")
+            self.safe_log("info", "   Position size calculated: $%.2f USDT", "", position_size)
             
             if position_size <= 0:
-                self.safe_log("warning", f"⚠️ Invalid position size for {symbol}: ${position_size}", "⚠️")
+                self.safe_log("warning", "Invalid position size for %s: $%s", "⚠️", symbol, position_size)
                 return
             
-            self.safe_log("info", f"   Step 2: Getting current price from Binance...", "")
+            self.safe_log("info", "   Step 2: Getting current price from Binance...", "")
             # Get current price
             current_price = float(self.data_fetcher.client.futures_symbol_ticker(symbol=symbol)['price'])
-            self.safe_log("info", f"   Current price: ${current_price:.4f}", "")
+            self.safe_log("info", "   Current price: $%.4f", "", current_price)
             
-            self.safe_log("info", f"   Step 3: Calculating quantity...", "")
+            self.safe_log("info", "   Step 3: Calculating quantity...", "")
             # Calculate quantity based on position size in USDT
             quantity = position_size / current_price
-            self.safe_log("info", f"   Raw quantity: {quantity}", "")
-            
-            self.safe_log("info", f"   Step 4: Getting symbol precision from Binance...", "")
-            # Get symbol info to round quantity properly
-            symbol_info = self.data_fetcher.client.futures_exchange_info()
-            quantity_precision = 0
-            for s in symbol_info['symbols']:
-                if s['symbol'] == symbol:
-                    for f in s['filters']:
-                        if f['filterType'] == 'LOT_SIZE':
-                            step_size = float(f['stepSize'])
-                            quantity_precision = len(str(step_size).rstrip('0').split('.')[-1])
-                            self.safe_log("info", f"   Found precision: {quantity_precision} decimals (step_size: {step_size})", "")
-                            break
-                    break
-            
-            # Round quantity to proper precision
-            quantity = round(quantity, quantity_precision)
-            self.safe_log("info", f"   Rounded quantity: {quantity}", "")
+            self.safe_log("info", "   Raw quantity: %s", "", quantity)
             
-            if quantity <= 0:
-                self.safe_log("warning", f"⚠️ Quantity too small for {symbol}: {quantity}", "⚠️")
+            self.safe_log("info", "   Step 4: Getting symbol rules (cached exchange info)...", "")
+            # Symbol rules to round quantity properly
+            rules = self.data_fetcher.symbol_rules.get(symbol)
+            if rules is None:
+                self.safe_log("warning", "No trading rules for %s, symbol not listed", "⚠️", symbol)
                 return
+            self.safe_log("info", "   Found precision: %s decimals (step_size: %s)", "",
+                          rules.quantity_precision, rules.step_size)
             
-            # Determine order side
-            side = 'BUY' if signal['direction'] == 'LONG' else 'SELL'
-            
-            # Place MARKET order on Binance Futures
-            self.safe_log("info", f"📤 Step 5: Placing {side} MARKET order on Binance Futures...", "🔵")
-            self.safe_log("info", f"   Symbol: {symbol}, Side: {side}, Quantity: {quantity}, Price: ${current_price:.4f}", "")
+            # Round quantity down to the step size
+            quantity = rules.round_quantity(quantity)
+            self.safe_log("info", "   Rounded quantity: %s", "", quantity)
             
-            order = self.data_fetcher.client.futures_create_order(
-                symbol=symbol,
-                side=side,
-                type='MARKET',
-                quantity=quantity
-            )
-            
-            self.safe_log("info", f"✅ MARKET order placed successfully!", "")
-            self.safe_log("info", f"   Order ID: {order.get('orderId')}", "")
-            
-            # Get actual fill price by querying the order
-            self.safe_log("info", f"   Fetching actual fill price...", "")
-            import time
-            time.sleep(0.5)  # Brief delay to ensure order is filled
+            if quantity <= 0 or quantity < rules.min_qty:
+                self.safe_log("warning", "Quantity too small for %s: %s", "⚠️", symbol, quantity)
+                return
             
-            filled_order = self.data_fetcher.client.futures_get_order(
-                symbol=symbol, 
-                orderId=order['orderId']
-            )
+            if quantity * current_price < rules.min_notional:
+                self.safe_log("warning", "Order value $%.2f of %s below minimum notional $%.2f", "⚠️",
+                              quantity * current_price, symbol, rules.min_notional)
+                return
             
-            # Calculate entry price from filled order
-            if float(filled_order['executedQty']) > 0:
-                entry_price = float(filled_order['cumQuote']) / float(filled_order['executedQty'])
-            else:
-                entry_price = current_price
-                
-            self.safe_log("info", f"   ✅ Actual fill price: ${entry_price:.4f}", "")
-            
-            # Get price precision for stop orders
-            self.safe_log("info", f"   Getting price precision for {symbol}...", "")
-            price_precision = 2  # Default
-            for s in symbol_info['symbols']:
-                if s['symbol'] == symbol:
-                    for f in s['filters']:
-                        if f['filterType'] == 'PRICE_FILTER':
-                            tick_size = float(f['tickSize'])
-                            price_precision = len(str(tick_size).rstrip('0').split('.')[-1])
-                            self.safe_log("info", f"   Price precision: {price_precision} decimals", "")
-                            break
-                    break
+            # Determine order side
+            side = 'BUY' if signal['direction'] == 'LONG' else 'SELL'
             
             stop_loss_pct = signal.get('stop_loss_distance', self.config['stop_loss_percentage'])
             take_profit_pct = stop_loss_pct * signal['risk_reward_ratio']
             
-            if side == 'BUY':
-                stop_loss_price = round(entry_price * (1 - stop_loss_pct), price_precision)
-                take_profit_price = round(entry_price * (1 + take_profit_pct), price_precision)
-            else:
-                stop_loss_price = round(entry_price * (1 + stop_loss_pct), price_precision)
-                take_profit_price = round(entry_price * (1 - take_profit_pct), price_precision)
-            
-            self.safe_log("info", f"   Step 6: Placing STOP LOSS order...", "")
-            self.safe_log("info", f"   SL Price: ${stop_loss_price:.4f} ({stop_loss_pct*100:.1f}% from entry)", "")
-            
-            # Place STOP LOSS order
-            sl_side = 'SELL' if side == 'BUY' else 'BUY'
-            sl_order = self.data_fetcher.client.futures_create_order(
-                symbol=symbol,
-                side=sl_side,
-                type='STOP_MARKET',
-                stopPrice=stop_loss_price,
-                quantity=quantity,
-                closePosition=True
-            )
+            # Place MARKET order, the fill comes with the response, then SL and TP at once
+            self.safe_log("info", "📤 Step 5: Placing %s MARKET order with SL / TP bracket on Binance Futures...", "🔵",
+                          side)
+            self.safe_log("info", "   Symbol: %s, Side: %s, Quantity: %s, Price: $%.4f", "",
+                          symbol, side, quantity, current_price)
             
-            self.safe_log("info", f"✅ STOP LOSS order placed! Order ID: {sl_order.get('orderId')}", "")
+            execution = self.order_engine.open_position(
+                symbol, side, quantity, rules, stop_loss_pct, take_profit_pct, reference_price=current_price
+            )
             
-            self.safe_log("info", f"   Step 7: Placing TAKE PROFIT order...", "")
-            self.safe_log("info", f"   TP Price: ${take_profit_price:.4f} ({take_profit_pct*100:.1f}% from entry)", "")
+            entry_price = execution['entry_price']
+            stop_loss_price = execution['stop_loss']
+            take_profit_price = execution['take_profit']
+            latency = execution['latency_ms']
             
-            # Place TAKE PROFIT order
-            tp_order = self.data_fetcher.client.futures_create_order(
-                symbol=symbol,
-                side=sl_side,
-                type='TAKE_PROFIT_MARKET',
-                stopPrice=take_profit_price,
-                quantity=quantity,
-                closePosition=True
-            )
+            self.safe_log("info", "✅ MARKET order placed successfully! Order ID: %s", "", execution['order_id'])
+            self.safe_log("info", "   ✅ Actual fill price: $%.4f (from %s)", "", entry_price, execution['fill_source'])
+            self.safe_log("info", "   SL Price: $%.4f (%.1f%% from entry)", "", stop_loss_price, stop_loss_pct * 100)
+            self.safe_log("info", "   TP Price: $%.4f (%.1f%% from entry)", "",
+                          take_profit_price, take_profit_pct * 100)
+            self.safe_log("info", "   Latency: entry %.0fms, fill %.0fms, bracket %.0fms, total %.0fms", "⏱️",
+                          latency['entry'], latency['fill'], latency['bracket'], latency['total'])
             
-            self.safe_log("info", f"✅ TAKE PROFIT order placed! Order ID: {tp_order.get('orderId')}", "")
+            for error in execution['errors']:
+                self.safe_log("error", "Bracket order failed for %s, position may be unprotected: %s", "❌",
+                              symbol, error)
             
             # Store position data
             trade_data = {
@@ -357,40 +486,33 @@ class EnhancedElliottWaveTradingBot:
                 'take_profit': take_profit_price,
                 'entry_time': datetime.now(),
                 'status': 'active',
-                'order_id': order['orderId'],
-                'sl_order_id': sl_order['orderId'],
-                'tp_order_id': tp_order['orderId']
+                'order_id': execution['order_id'],
+                'sl_order_id': execution['sl_order_id'],
+                'tp_order_id': execution['tp_order_id']
             }
             
             self.active_positions[f"{symbol}_{interval}"] = trade_data
             self.trade_count += 1
             
             self.safe_log("info", "=" * 80, "")
-            self.safe_log("info", 
-                f"🎉 TRADE SUCCESSFULLY EXECUTED! 🎉", "💰")
-            self.safe_log("info", 
-                f"   {side} {symbol} {interval}", "")
-            self.safe_log("info", 
-                f"   Quantity: {quantity} @ ${entry_price:.4f}", "")
-            self.safe_log("info", 
-                f"   Stop Loss: ${stop_loss_price:.4f} | Take Profit: ${take_profit_price:.4f}", "")
-            self.safe_log("info", 
-                f"   Confidence: {signal['confidence']:.1%} | R/R: {signal['risk_reward_ratio']:.2f}", "")
-            self.safe_log("info", 
-                f"   Market Order ID: {order.get('orderId')}", "")
-            self.safe_log("info", 
-                f"   SL Order ID: {sl_order.get('orderId')}", "")
-            self.safe_log("info", 
-                f"   TP Order ID: {tp_order.get('orderId')}", "")
+            self.safe_log("info", "🎉 TRADE SUCCESSFULLY EXECUTED! 🎉", "💰")
+            self.safe_log("info", "   %s %s %s", "", side, symbol, interval)
+            self.safe_log("info", "   Quantity: %s @ $%.4f", "", quantity, entry_price)
+            self.safe_log("info", "   Stop Loss: $%.4f | Take Profit: $%.4f", "", stop_loss_price, take_profit_price)
+            self.safe_log("info", "   Confidence: %.1f%% | R/R: %.2f", "",
+                          signal['confidence'] * 100, signal['risk_reward_ratio'])
+            self.safe_log("info", "   Market Order ID: %s", "", execution['order_id'])
+            self.safe_log("info", "   SL Order ID: %s", "", execution['sl_order_id'])
+            self.safe_log("info", "   TP Order ID: %s", "", execution['tp_order_id'])
             self.safe_log("info", "=" * 80, "")
             
         except Exception as e:
             self.safe_log("error", "=" * 80, "")
-            self.safe_log("error", f"❌ ERROR EXECUTING TRADE for {symbol}!", "❌")
-            self.safe_log("error", f"   Error type: {type(e).__name__}", "")
-            self.safe_log("error", f"   Error message: {str(e)}", "")
+            self.safe_log("error", "ERROR EXECUTING TRADE for %s!", "❌", symbol)
+            self.safe_log("error", "   Error type: %s", "", type(e).__name__)
+            self.safe_log("error", "   Error message: %s", "", e)
             import traceback
-            self.safe_log("error", f"   Traceback: {traceback.format_exc()}", "")
+            self.safe_log("error", "   Traceback: %s", "", traceback.format_exc())
             self.safe_log("error", "=" * 80, "")
     
     def calculate_position_size(self, signal: Dict) -> float:
@@ -403,7 +525,7 @@ class EnhancedElliottWaveTradingBot:
             
             # Prevent division by zero
             if stop_loss_distance <= 0:
-                self.safe_log("warning", f"⚠️ Invalid stop loss distance: {stop_loss_distance}, using default 5%", "⚠️")
+                self.safe_log("warning", "Invalid stop loss distance: %s, using default 5%%", "⚠️", stop_loss_distance)
                 stop_loss_distance = 0.05  # Default 5%
             
             # Calculate position size
@@ -416,38 +538,60 @@ class EnhancedElliottWaveTradingBot:
             return position_size
             
         except Exception as e:
-            self.safe_log("error", f"❌ Error calculating position size: {str(e)}", "❌")
+            self.safe_log("error", "Error calculating position size: %s", "❌", e)
             return 0
     
     def manage_positions(self):
-        """Enhanced position management - check if positions are still open"""
-        for position_id, position in list(self.active_positions.items()):
+        """Enhanced position management - positions are kept current by the user data stream"""
+        # Without a connected stream, one REST snapshot of all positions per loop
+        if self.user_data_stream is None or not self.user_data_stream.connected.is_set():
+            self.reconcile_positions()
+        
+        # PnL realized by fills (SL / TP, fees) since the last loop
+        realized_pnl = self.position_tracker.realized_pnl
+        self.daily_pnl += realized_pnl - self.realized_pnl_seen
+        self.realized_pnl_seen = realized_pnl
+        
+        # Positions closed by SL/TP, remove from tracking
+        while True:
             try:
-                symbol = position['symbol']
-                
-                # Check if position is still open on Binance
-                positions = self.data_fetcher.client.futures_position_information(symbol=symbol)
-                
-                position_open = False
-                for pos in positions:
-                    if pos['symbol'] == symbol:
-                        position_amt = float(pos['positionAmt'])
-                        if abs(position_amt) > 0:
-                            position_open = True
-                            # Update unrealized PnL
-                            unrealized_pnl = float(pos['unRealizedProfit'])
-                            position['unrealized_pnl'] = unrealized_pnl
-                        break
-                
-                # If position is closed, remove from tracking
-                if not position_open:
-                    self.safe_log("info", 
-                        f"✅ Position closed by SL/TP: {symbol} "
-                        f"P&L: ${position.get('unrealized_pnl', 0):.2f}", "💹")
-                    del self.active_positions[position_id]
-                    
-            except Exception as e:
-                self.safe_log("error", f"Error managing position {position_id}: {str(e)}", "❌")
+                symbol, closed = self.closed_positions.get_nowait()
+            except queue.Empty:
+                break
+            
+            for position_id in [pid for pid, position in self.active_positions.items() if position['symbol'] == symbol]:
+                del self.active_positions[position_id]
+                self.safe_log("info", "✅ Position closed by SL/TP: %s P&L: $%.2f", "💹", symbol, closed['realized_pnl'])
+        
+        # Update unrealized PnL with the latest prices
+        for position in self.active_positions.values():
+            symbol = position['symbol']
+            price = self.latest_price(symbol)
+            if price is not None:
+                self.position_tracker.update_mark_price(symbol, price)
+            
+            tracked = self.position_tracker.position(symbol)
+            if tracked is not None:
+                position['unrealized_pnl'] = tracked['unrealized_pnl']
+    
+    def reconcile_positions(self):
+        """Apply a REST snapshot of all positions to the position tracker"""
+        try:
+            requested = int(time.time() * 1000)
+            self.data_fetcher.rate_limiter.acquire(5)
+            self.position_tracker.reconcile(self.data_fetcher.client.futures_position_information(), requested)
+        except Exception as e:
+            self.safe_log("error", "Error reconciling positions: %s", "❌", e)
+    
+    def latest_price(self, symbol: str) -> Optional[float]:
+        """Latest price of a symbol from the streamed book ticker or the market snapshot, no REST call"""
+        if self.kline_stream is not None:
+            book = self.kline_stream.book_ticker(symbol)
+            if book is not None:
+                return (book['bid'] + book['ask']) / 2
+        
+        market = self.market_snapshot.get(symbol)
+        return market['last_price'] if market is not None else None
     
     def close_position(self, position_id: str, reason: str):
         """Close a trading position"""
@@ -463,23 +607,23 @@ class EnhancedElliottWaveTradingBot:
             # Remove from active positions
             del self.active_positions[position_id]
             
-            self.safe_log("info", 
-                f"POSITION CLOSED: {position['symbol']} {position['interval']} "
-                f"P&L: ${simulated_pnl:.2f} "
-                f"Reason: {reason}", "💹")
+            self.safe_log("info", "POSITION CLOSED: %s %s P&L: $%.2f Reason: %s", "💹",
+                          position['symbol'], position['interval'], simulated_pnl, reason)
             
         except Exception as e:
-            self.safe_log("error", f"Error closing position: {str(e)}", "❌")
+            self.safe_log("error", "Error closing position: %s", "❌", e)
     
     def log_enhanced_status(self):
         """Log enhanced bot status"""
         runtime = datetime.now() - self.start_time
         
-        self.safe_log("info", 
-            f"STATUS: {len(self.active_positions)} positions, "
-            f"{self.trade_count} trades, "
-            f"${self.daily_pnl:.2f} P&L, "
-            f"Runtime: {str(runtime).split('.')[0]}", "📊")
+        self.safe_log("info", "STATUS: %s positions, %s trades, $%.2f P&L, Runtime: %s", "📊",
+                      len(self.active_positions), self.trade_count, self.daily_pnl, str(runtime).split('.')[0])
+        
+        latency = self.order_engine.average_latency_ms()
+        if latency:
+            self.safe_log("info", "ORDER LATENCY (avg): entry %.0fms, fill %.0fms, bracket %.0fms, total %.0fms", "⏱️",
+                          latency['entry'], latency['fill'], latency['bracket'], latency['total'])
     
     def shutdown(self):
         """Shutdown bot gracefully"""
@@ -489,12 +633,26 @@ class EnhancedElliottWaveTradingBot:
         for position_id in list(self.active_positions.keys()):
             self.close_position(position_id, "Bot shutdown")
         
+        # Stop streaming, fetch threads and analysis processes
+        if self.kline_stream is not None:
+            self.kline_stream.stop()
+        if self.user_data_stream is not None:
+            self.user_data_stream.stop()
+        self.scan_pipeline.shutdown()
+        self.order_engine.shutdown()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.metrics_dumper is not None:
+            self.metrics_dumper.stop()
+        
         # Log final statistics
         runtime = datetime.now() - self.start_time
-        self.safe_log("info", 
-            f"FINAL STATS: {self.trade_count} trades, "
-            f"${self.daily_pnl:.2f} total P&L, "
-            f"Runtime: {str(runtime).split('.')[0]}", "📈")
+        self.safe_log("info", "FINAL STATS: %s trades, $%.2f total P&L, Runtime: %s", "📈",
+                      self.trade_count, self.daily_pnl, str(runtime).split('.')[0])
+        
+        # Write the queued log records
+        if self.log_pipeline is not None:
+            self.log_pipeline.stop()
 
 
 def main():
@@ -1,5 +1,6 @@
 from __future__ import annotations
 from models.WavePattern import WavePattern
+from models.PatternIndex import PatternIndex
 from models.WaveRules import Impulse, LeadingDiagonal
 from models.WaveAnalyzer import WaveAnalyzer
 from models.WaveOptions import WaveOptionsGenerator5
@@ -26,14 +27,14 @@ rules_to_check = [impulse, leading_diagonal]
 print(f'Start at idx: {idx_start}')
 print(f"will run up to {wave_options_impulse.number / 1e6}M combinations.")
 
-# set up a set to store already found wave counts
+# set up an index to store already found wave counts
 # it can be the case, that 2 WaveOptions lead to the same WavePattern.
 # This can be seen in a chart, where for example we try to skip more maxima as there are. In such a case
 # e.g. [1,2,3,4,5] and [1,2,3,4,10] will lead to the same WavePattern (has same sub-wave structure, same begin / end,
 # same high / low etc.
-# If we find the same WavePattern, we skip and do not plot it
+# If we find the same WavePattern (same start / end of all waves, see WavePattern.key), we skip and do not plot it
 
-wavepatterns_up = set()
+wavepatterns_up = PatternIndex()
 
 # loop over all combinations of wave options [i,j,k,l,m] for impulsive waves sorted from small, e.g.  [0,1,...] to
 # large e.g. [3,2, ...]
@@ -47,9 +48,6 @@ for new_option_impulse in wave_options_impulse.options_sorted:
         for rule in rules_to_check:
 
             if wavepattern_up.check_rule(rule):
-                if wavepattern_up in wavepatterns_up:
-                    continue
-                else:
-                    wavepatterns_up.add(wavepattern_up)
+                if wavepatterns_up.add(wavepattern_up):
                     print(f'{rule.name} found: {new_option_impulse.values}')
                     plot_pattern(df=df, wave_pattern=wavepattern_up, title=str(new_option_impulse))
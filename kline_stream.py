@@ -0,0 +1,265 @@
+"""
+WebSocket Kline Stream for Binance Futures
+==========================================
+
+Subscribes to the combined kline and bookTicker streams of all configured symbols / intervals, keeps the
+latest candles of every pair in a ring buffer and calls back as soon as a candle closes. Replaces polling
+the REST API every scan_frequency seconds.
+
+The transport is pluggable: any callable transport(url) returning a connection context manager with
+recv(timeout) (like websockets.sync.client.connect) can drive the stream, e.g. a local fake server in tests.
+"""
+
+import json
+import logging
+import threading
+import time
+
+import numpy as np
+
+from candle_cache import KLINE_DTYPE
+
+logger = logging.getLogger(__name__)
+
+
+FUTURES_STREAM_URL = 'wss://fstream.binance.com/stream?streams='
+TESTNET_STREAM_URL = 'wss://stream.binancefuture.com/stream?streams='
+
+MAX_STREAMS_PER_CONNECTION = 200
+
+
+class KlineRingBuffer:
+    """
+    Fixed size, thread-safe buffer of the latest candles of one (symbol, interval)
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        Initialize the ring buffer
+
+        Args:
+            capacity: Number of candles kept, older ones are overwritten
+        """
+        self.capacity = capacity
+        self._candles = np.zeros(capacity, dtype=KLINE_DTYPE)
+        self._start = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def _last_open_time(self):
+        return self._candles['open_time'][(self._start + self._count - 1) % self.capacity]
+
+    def update(self, candle):
+        """
+        Add a candle or update the last one if it has the same open time
+
+        Args:
+            candle: Tuple / record with the fields of KLINE_DTYPE
+
+        Returns:
+            True if the candle was added, False if it updated the last one or is older
+        """
+        with self._lock:
+            if self._count > 0:
+                last_open_time = self._last_open_time()
+                if candle[0] < last_open_time:
+                    return False
+                if candle[0] == last_open_time:
+                    self._candles[(self._start + self._count - 1) % self.capacity] = candle
+                    return False
+
+            if self._count < self.capacity:
+                self._candles[(self._start + self._count) % self.capacity] = candle
+                self._count += 1
+            else:
+                self._candles[self._start] = candle
+                self._start = (self._start + 1) % self.capacity
+            return True
+
+    def seed(self, candles):
+        """
+        Replace the content with historic candles (e.g. fetched by REST), candles streamed afterwards are
+        added by update
+
+        Args:
+            candles: numpy structured array with KLINE_DTYPE, sorted by open time
+        """
+        candles = candles[-self.capacity:]
+        with self._lock:
+            self._candles[:len(candles)] = candles
+            self._start = 0
+            self._count = len(candles)
+
+    def to_array(self):
+        """
+        Copy of the buffered candles, oldest first
+
+        Returns:
+            numpy structured array with KLINE_DTYPE
+        """
+        with self._lock:
+            idx = (self._start + np.arange(self._count)) % self.capacity
+            return self._candles[idx]
+
+
+class KlineStream:
+    """
+    Streams klines and best bid / ask of Binance Futures pairs into ring buffers
+    """
+
+    def __init__(self, symbols, intervals, on_candle_close=None, history=None, capacity=1000,
+                 testnet=False, transport=None, base_url=None, reconnect_delay=1.0):
+        """
+        Initialize the kline stream
+
+        Args:
+            symbols: Trading pairs (e.g., ['BTCUSDT', 'ETHUSDT'])
+            intervals: Timeframes ('1m', '5m', '15m', '1h', '4h', '1d')
+            on_candle_close: Callback on_candle_close(symbol, interval, candles) when a candle closed,
+                             candles is the buffer content (numpy array with KLINE_DTYPE). Called from the
+                             stream thread, so it should return quickly.
+            history: Callable history(symbol, interval) returning the latest candles as KLINE_DTYPE array,
+                     used to fill the buffers on (re)connect so there are no gaps
+            capacity: Number of candles buffered per pair
+            testnet: Use the testnet stream
+            transport: Callable transport(url) returning a connection context manager with recv(timeout)
+                       (default: websockets.sync.client.connect)
+            base_url: Combined stream URL the stream names are appended to (default: Binance Futures)
+            reconnect_delay: Seconds to wait before reconnecting, doubled on every failed attempt up to a minute
+        """
+        self.symbols = list(symbols)
+        self.intervals = list(intervals)
+        self.on_candle_close = on_candle_close
+        self.history = history
+        self.transport = transport
+        self.base_url = base_url or (TESTNET_STREAM_URL if testnet else FUTURES_STREAM_URL)
+        self.reconnect_delay = reconnect_delay
+
+        self.buffers = {(symbol, interval): KlineRingBuffer(capacity)
+                        for symbol in self.symbols for interval in self.intervals}
+        self.book_tickers = {}  # symbol: {'bid', 'ask', 'bid_qty', 'ask_qty', 'time'}
+        self.last_message_time = None
+
+        self._running = threading.Event()
+        self._threads = []
+
+    def stream_names(self):
+        """Names of all subscribed streams, e.g. 'btcusdt@kline_1h' and 'btcusdt@bookTicker'"""
+        names = []
+        for symbol in self.symbols:
+            names.extend(f"{symbol.lower()}@kline_{interval}" for interval in self.intervals)
+            names.append(f"{symbol.lower()}@bookTicker")
+        return names
+
+    def urls(self):
+        """Combined stream URLs, split to respect the stream limit of a connection"""
+        names = self.stream_names()
+        return [self.base_url + '/'.join(names[i:i + MAX_STREAMS_PER_CONNECTION])
+                for i in range(0, len(names), MAX_STREAMS_PER_CONNECTION)]
+
+    def start(self):
+        """Connect and stream in background threads, one per connection"""
+        self._running.set()
+        for url in self.urls():
+            thread = threading.Thread(target=self.run, args=(url,), name='kline-stream', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("📡 Streaming %d kline pairs over %d connection(s)", len(self.buffers), len(self._threads))
+
+    def stop(self, timeout=5):
+        """Stop streaming and wait for the threads to finish"""
+        self._running.clear()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run(self, url):
+        """
+        Receive messages from one connection until stopped, reconnecting on errors
+
+        Args:
+            url: Combined stream URL
+        """
+        transport = self.transport
+        if transport is None:
+            from websockets.sync.client import connect
+            transport = connect
+
+        delay = self.reconnect_delay
+        while self._running.is_set():
+            try:
+                with transport(url) as connection:
+                    # Fill the buffers after connecting, messages received meanwhile are queued in the connection
+                    self._seed(url)
+                    delay = self.reconnect_delay
+
+                    while self._running.is_set():
+                        try:
+                            message = connection.recv(timeout=1)
+                        except TimeoutError:
+                            continue
+                        self.handle_message(message)
+
+            except Exception as e:
+                if self._running.is_set():
+                    logger.warning("⚠️ Stream disconnected: %s, reconnecting in %.0fs", e, delay)
+                    time.sleep(delay)
+                    delay = min(delay * 2, 60)
+
+    def _seed(self, url):
+        if self.history is None:
+            return
+        streams = url[len(self.base_url):].split('/')
+        for (symbol, interval), buffer in self.buffers.items():
+            if f"{symbol.lower()}@kline_{interval}" in streams:
+                buffer.seed(self.history(symbol, interval))
+
+    def handle_message(self, message):
+        """
+        Process one message of the combined stream
+
+        Args:
+            message: Raw JSON text, {"stream": ..., "data": {...}}
+        """
+        data = json.loads(message)
+        data = data.get('data', data)
+        self.last_message_time = time.time()
+
+        event = data.get('e')
+        if event == 'kline':
+            self._handle_kline(data['s'], data['k'])
+        elif event == 'bookTicker':
+            self.book_tickers[data['s']] = {
+                'bid': float(data['b']),
+                'ask': float(data['a']),
+                'bid_qty': float(data['B']),
+                'ask_qty': float(data['A']),
+                'time': data.get('T', data.get('E')),
+            }
+
+    def _handle_kline(self, symbol, kline):
+        buffer = self.buffers.get((symbol, kline['i']))
+        if buffer is None:
+            return
+
+        buffer.update((kline['t'], float(kline['o']), float(kline['h']), float(kline['l']),
+                       float(kline['c']), float(kline['v']), kline['T']))
+
+        if kline['x'] and self.on_candle_close is not None:
+            self.on_candle_close(symbol, kline['i'], buffer.to_array())
+
+    def candles(self, symbol, interval):
+        """
+        Buffered candles of a pair, the last one may still be open
+
+        Returns:
+            numpy structured array with KLINE_DTYPE, oldest first
+        """
+        return self.buffers[(symbol, interval)].to_array()
+
+    def book_ticker(self, symbol):
+        """Latest best bid / ask of a symbol, None if nothing was received yet"""
+        return self.book_tickers.get(symbol)
@@ -0,0 +1,141 @@
+"""
+Non-Blocking Logging Pipeline
+=============================
+
+The threads of the bot only put their log records into a queue, a QueueListener thread formats them and
+writes them to the console and the log file. A slow stdout (e.g. the Docker log driver) or disk therefore
+does not slow down scanning and trading. Records of the analysis processes of the scan pipeline go to the
+same handlers through a multiprocessing queue.
+
+Subsystems log to their own logger, so their level can be set on its own (config 'log_levels'):
+- elliott.analysis: wave search and trading signals (elliott_wave_trading_system), DEBUG: rejected patterns
+- elliott.fetch: klines and prices fetched (binance_data_fetcher), DEBUG: price and time range of every fetch
+
+Log calls pass their values as arguments (logger.info("%s found", symbol)), the message is only formatted
+if the record is written.
+"""
+
+import functools
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+
+ANALYSIS = 'elliott.analysis'
+FETCH = 'elliott.fetch'
+
+FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for a listener in the same process: the record is queued as it is and its message is
+    formatted by the listener thread instead of the logging thread
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def configure(handler, level='INFO', levels=None):
+    """
+    Make handler the only handler of the root logger
+
+    Args:
+        handler: Handler of all records, e.g. a QueueHandler
+        level: Level of the root logger (e.g. 'INFO')
+        levels: Levels of single loggers by their name, e.g. {'elliott.analysis': 'DEBUG'}
+    """
+    root = logging.getLogger()
+    for old_handler in root.handlers[:]:
+        root.removeHandler(old_handler)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    for name, name_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(name_level)
+
+
+def init_worker(log_queue, level='INFO', levels=None):
+    """
+    Initializer of a worker process: its records are sent to the listener of the parent process
+
+    Args:
+        log_queue: multiprocessing.Queue of LogPipeline.worker_queue
+        level: Level of the root logger
+        levels: Levels of single loggers by their name
+    """
+    configure(logging.handlers.QueueHandler(log_queue), level, levels)
+
+
+class LogPipeline:
+    """
+    Routes all log records through a queue to handlers written by a listener thread
+    """
+
+    def __init__(self, handlers, level='INFO', levels=None):
+        """
+        Initialize the logging pipeline
+
+        Args:
+            handlers: Handlers writing the records (e.g. StreamHandler, FileHandler), called by the listener only
+            level: Level of the root logger (e.g. 'INFO')
+            levels: Levels of single loggers by their name, e.g. {'elliott.analysis': 'DEBUG'}
+        """
+        self.handlers = list(handlers)
+        self.level = level
+        self.levels = dict(levels or {})
+
+        self._queue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(self._queue, *self.handlers, respect_handler_level=True)
+        self._worker_queue = None
+        self._worker_listener = None
+        self._running = False
+
+    def start(self):
+        """Route the records of the root logger through the queue and start the listener thread"""
+        if self._running:
+            return
+        configure(LazyQueueHandler(self._queue), self.level, self.levels)
+        self._listener.start()
+        self._running = True
+
+    def worker_queue(self):
+        """
+        Queue for the records of worker processes, its listener is started on first use
+
+        Returns:
+            multiprocessing.Queue to pass to init_worker
+        """
+        if self._worker_queue is None:
+            self._worker_queue = multiprocessing.Queue()
+            self._worker_listener = logging.handlers.QueueListener(self._worker_queue, *self.handlers,
+                                                                   respect_handler_level=True)
+            self._worker_listener.start()
+        return self._worker_queue
+
+    def worker_initializer(self):
+        """
+        Initializer for a process pool (ProcessPoolExecutor(initializer=...)) logging through this pipeline
+
+        Returns:
+            Picklable callable without arguments
+        """
+        return functools.partial(init_worker, self.worker_queue(), self.level, self.levels)
+
+    def stop(self):
+        """Write the queued records and stop the listener threads, later records are written directly"""
+        if self._worker_listener is not None:
+            self._worker_listener.stop()
+            self._worker_listener = None
+            self._worker_queue = None
+        if not self._running:
+            return
+        self._listener.stop()
+        self._running = False
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in self.handlers:
+            root.addHandler(handler)
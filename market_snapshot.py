@@ -0,0 +1,102 @@
+"""
+Market Snapshot of all Binance Futures Symbols
+==============================================
+
+Fetches the 24h tickers and the best bid / ask of every futures symbol with one request each per
+scan, so the volume and spread filters of all (symbol, interval) pairs are answered from memory
+instead of one ticker request per pair.
+"""
+
+import threading
+import time
+
+
+class MarketSnapshot:
+    """
+    24h volume, last price and best bid / ask of all symbols, refreshed once per scan
+    """
+
+    def __init__(self, tickers, book_tickers, clock=time.monotonic):
+        """
+        Initialize the snapshot, it is empty until the first refresh()
+
+        Args:
+            tickers: Callable returning the 24h tickers of all symbols (e.g. client.futures_ticker)
+            book_tickers: Callable returning the book tickers of all symbols (e.g. client.futures_orderbook_ticker)
+            clock: Monotonic time function in seconds
+        """
+        self.tickers = tickers
+        self.book_tickers = book_tickers
+        self.clock = clock
+
+        self._markets = {}
+        self._updated = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Fetch the tickers of all symbols
+
+        Returns:
+            Number of symbols in the snapshot
+        """
+        markets = {}
+        for ticker in self.tickers():
+            markets[ticker['symbol']] = {
+                'last_price': float(ticker['lastPrice']),
+                'quote_volume': float(ticker['quoteVolume']),
+                'price_change_percent': float(ticker['priceChangePercent']),
+                'bid': None,
+                'ask': None,
+                'spread': None,
+            }
+
+        for book in self.book_tickers():
+            market = markets.get(book['symbol'])
+            if market is None:
+                continue
+            bid, ask = float(book['bidPrice']), float(book['askPrice'])
+            market['bid'], market['ask'] = bid, ask
+            if bid > 0 and ask > 0:
+                market['spread'] = (ask - bid) / bid
+
+        with self._lock:
+            self._markets = markets
+            self._updated = self.clock()
+        return len(markets)
+
+    @property
+    def age(self):
+        """Seconds since the last refresh, None if never refreshed"""
+        return None if self._updated is None else self.clock() - self._updated
+
+    def get(self, symbol):
+        """
+        Market data of a symbol
+
+        Returns:
+            Dict with last_price, quote_volume, price_change_percent, bid, ask and spread (relative to the bid,
+            None without bid / ask) or None if the symbol is not in the snapshot
+        """
+        return self._markets.get(symbol)
+
+    def passes_filters(self, symbol, min_volume_24h, max_spread):
+        """
+        Check the volume and spread filters of a symbol
+
+        Args:
+            symbol: Trading pair (e.g., 'BTCUSDT')
+            min_volume_24h: Minimum 24h quote volume (USDT)
+            max_spread: Maximum relative spread between best bid and ask
+
+        Returns:
+            True / False, None if the symbol is not in the snapshot
+        """
+        market = self.get(symbol)
+        if market is None:
+            return None
+        if market['quote_volume'] < min_volume_24h:
+            return False
+        if market['spread'] is not None and market['spread'] > max_spread:
+            return False
+        return True
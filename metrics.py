@@ -0,0 +1,404 @@
+"""
+Hot Path Metrics
+================
+
+Counters and histograms of the stages a scan spends its time in:
+1. Fetching: latency of the klines of every (symbol, interval)
+2. Analysis: time per pair, WaveOptions evaluated, MonoWaves built and patterns passing each rule
+3. Execution: round trip of every stage of an order
+
+The metrics are served as Prometheus text on a local HTTP endpoint (MetricsServer) and written to a JSON file
+periodically (JsonDumper), so it can be seen which pair or timeframe eats the scan budget.
+
+The analysis runs in worker processes, so it does not update the metrics itself: it reports its numbers in the
+'stats' of its results and the process of the bot records them (record_analysis).
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# seconds, from a cached fetch to a slow REST call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Values of a metric per combination of label values"""
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # tuple of label values: value
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} has the labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key):
+        return dict(zip(self.labelnames, key))
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count, e.g. the WaveOptions evaluated
+    """
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        Add to the count of the label values
+
+        Args:
+            amount: Non-negative increment
+            **labels: Value of every label name of the counter
+        """
+        if amount < 0:
+            raise ValueError(f"{self.name} can only increase, got {amount}")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Count of the label values, 0 if never increased"""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        """List of (sample name, labels, value) in the Prometheus exposition"""
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+    def snapshot(self):
+        """List of {'labels', 'value'} for the JSON dump"""
+        with self._lock:
+            return [{'labels': self._labels(key), 'value': value} for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (e.g. seconds) in cumulative buckets, with their count and sum
+    """
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """
+        Record one value
+
+        Args:
+            value: Observed value, e.g. a latency in seconds
+            **labels: Value of every label name of the histogram
+        """
+        key = self._key(labels)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per bucket (not cumulative, the last one is +Inf), sum, max
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, value]
+            state[0][bucket] += 1
+            state[1] += value
+            state[2] = max(state[2], value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds the with block takes, also if it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        """No. of values observed for the label values"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state is not None else 0
+
+    def samples(self):
+        """List of (sample name, labels, value) in the Prometheus exposition"""
+        samples = []
+        with self._lock:
+            for key, (counts, total, _) in self._values.items():
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    samples.append((f'{self.name}_bucket', dict(labels, le=_format_value(float(bound))), cumulative))
+                samples.append((f'{self.name}_sum', labels, total))
+                samples.append((f'{self.name}_count', labels, cumulative))
+        return samples
+
+    def snapshot(self):
+        """List of {'labels', 'count', 'sum', 'mean', 'max', 'buckets'} for the JSON dump"""
+        with self._lock:
+            snapshot = []
+            for key, (counts, total, maximum) in self._values.items():
+                count = sum(counts)
+                snapshot.append({
+                    'labels': self._labels(key),
+                    'count': count,
+                    'sum': total,
+                    'mean': total / count,
+                    'max': maximum,
+                    'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], counts)),
+                })
+            return snapshot
+
+
+class MetricsRegistry:
+    """
+    The metrics of a process, rendered together
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"{name} is already registered as {metric.type} with the labels {metric.labelnames}")
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        """Counter of the registry, created on first use"""
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Histogram of the registry, created on first use"""
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format (version 0.0.4)
+
+        Returns:
+            The text served on /metrics
+        """
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """
+        All metrics as JSON serializable dict
+
+        Returns:
+            Dict {name: {'type', 'help', 'values'}} plus the 'timestamp' of the snapshot
+        """
+        snapshot = {'timestamp': time.time()}
+        for metric in self.metrics():
+            snapshot[metric.name] = {'type': metric.type, 'help': metric.help, 'values': metric.snapshot()}
+        return snapshot
+
+    def dump_json(self, path):
+        """
+        Write the snapshot to path, replacing the file at once (readers never see a partial file)
+
+        Args:
+            path: JSON file
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        """Reset the values of all metrics (e.g. between tests)"""
+        for metric in self.metrics():
+            metric.clear()
+
+
+# Registry of the process and the metrics of the hot paths
+REGISTRY = MetricsRegistry()
+
+FETCH_SECONDS = REGISTRY.histogram(
+    'elliott_fetch_seconds', 'Latency of fetching the klines of a pair', ('symbol', 'interval'))
+ANALYSIS_SECONDS = REGISTRY.histogram(
+    'elliott_analysis_seconds', 'Wave analysis time of a pair', ('symbol', 'interval'))
+OPTIONS_EVALUATED = REGISTRY.counter(
+    'elliott_options_evaluated_total', 'WaveOptions searched from a start index', ('symbol', 'interval'))
+MONOWAVES_BUILT = REGISTRY.counter(
+    'elliott_monowaves_built_total', 'MonoWaves built for the found patterns', ('symbol', 'interval'))
+PATTERNS_PASSED = REGISTRY.counter(
+    'elliott_patterns_passed_total', 'Patterns passing a wave rule', ('symbol', 'interval', 'rule'))
+SIGNALS = REGISTRY.counter(
+    'elliott_signals_total', 'Trading signals generated', ('symbol', 'interval'))
+ORDER_SECONDS = REGISTRY.histogram(
+    'elliott_order_seconds', 'Round trip of a stage of an order execution (entry, fill, bracket, total)',
+    ('stage',))
+
+
+def record_analysis(symbol, interval, analysis_results):
+    """
+    Record the stats of an analysis (see ElliottWaveTradingSystem.analyze_dataframe), in the process of the bot
+
+    Args:
+        symbol: Trading pair (e.g., 'BTCUSDT')
+        interval: Timeframe of the analysis
+        analysis_results: Results with 'stats', nothing is recorded without
+    """
+    stats = (analysis_results or {}).get('stats')
+    if not stats:
+        return
+
+    labels = {'symbol': symbol, 'interval': interval}
+    ANALYSIS_SECONDS.observe(stats['analysis_seconds'], **labels)
+    OPTIONS_EVALUATED.inc(stats['options_evaluated'], **labels)
+    MONOWAVES_BUILT.inc(stats['monowaves_built'], **labels)
+    for rule, passed in stats['patterns_passed'].items():
+        PATTERNS_PASSED.inc(passed, rule=rule, **labels)
+    SIGNALS.inc(len(analysis_results.get('signals', [])), **labels)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            body = self.registry.render().encode()
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif path == '/metrics.json':
+            body = json.dumps(self.registry.snapshot()).encode()
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scraped every few seconds, not worth a log line
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint for Prometheus: /metrics (text format) and /metrics.json
+    """
+
+    def __init__(self, port=9108, host='127.0.0.1', registry=REGISTRY):
+        """
+        Initialize the metrics server
+
+        Args:
+            port: TCP port, 0 for any free port (see the port attribute after start)
+            host: Interface to listen on, only local by default
+            registry: Registry to serve
+        """
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Serve in a background thread"""
+        handler = type('MetricsHandler', (_MetricsHandler,), {'registry': self.registry})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+
+class JsonDumper:
+    """
+    Writes the snapshot of a registry to a JSON file every few seconds
+    """
+
+    def __init__(self, path, interval=60.0, registry=REGISTRY):
+        """
+        Initialize the dumper
+
+        Args:
+            path: JSON file, replaced on every dump
+            interval: Seconds between the dumps
+            registry: Registry to dump
+        """
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Dump in a background thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-dump', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        try:
+            self.registry.dump_json(self.path)
+        except OSError as e:
+            logger.warning("⚠️ Could not write metrics to %s: %s", self.path, e)
+
+    def stop(self):
+        """Stop the thread and write a last dump"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.dump()
@@ -1,8 +1,12 @@
 from __future__ import annotations
 import numpy as np
-from models.functions import hi, lo, next_hi, next_lo
+from models.functions import up_end, down_end
 
 class MonoWave:
+    # a scan builds millions of MonoWaves, slots keep them small and cheap to create / collect
+    __slots__ = ('lows_arr', 'highs_arr', 'dates_arr', 'skip_n', 'idx_start', 'idx_end', 'count', 'degree',
+                 '_date_start', '_date_end', 'low', 'high', 'low_idx', 'high_idx', 'label')
+
     def __init__(self,
                  lows: np.array,
                  highs: np.array,
@@ -18,16 +22,37 @@ class MonoWave:
         self.idx_end = int
 
         self.count = int  # the count of the monowave, e.g. 1, 2, A, B, etc
+        self.label = str  # label in plots, set by the WaveAnalyzer e.g. 1, 2, A, B, etc
         self.degree = 1  # 1 = lowest timeframe level, 2 as soon as a e.g. 12345 is found etc.
 
-        self.date_start = str
-        self.date_end = str
+        self._date_start = None  # looked up in dates_arr on access, unless set explicitly
+        self._date_end = None
 
         self.low = float
         self.high = float
         self.low_idx = int
         self.high_idx = int
 
+    @property
+    def date_start(self):
+        if self._date_start is None:
+            return self.dates_arr[self.idx_start]
+        return self._date_start
+
+    @date_start.setter
+    def date_start(self, value):
+        self._date_start = value
+
+    @property
+    def date_end(self):
+        if self._date_end is None:
+            return self.dates_arr[self.idx_end] if self.idx_end is not None else None
+        return self._date_end
+
+    @date_end.setter
+    def date_end(self, value):
+        self._date_end = value
+
     @property
     def labels(self) -> str:
         return str(self.count)
@@ -84,16 +109,18 @@ class MonoWaveUp(MonoWave):
     """
     Describes a upwards movement, which can have [skip_n] smaller downtrends
     """
+    __slots__ = ()
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, end: tuple = None, **kwargs):
+        """
+        :param end: (high, high_idx) if the end was already found, e.g. by functions.find_wave_chains
+        """
         super().__init__(*args, **kwargs)
 
-        self.high, self.high_idx = self.find_end()
+        self.high, self.high_idx = self.find_end() if end is None else end
         self.low = self.lows_arr[self.idx_start]
         self.low_idx = self.idx_start
         self.idx_end = self.high_idx
-        self.date_start = self.dates_arr[self.idx_start]
-        self.date_end = self.dates_arr[self.high_idx]
 
     def find_end(self):
         """
@@ -102,24 +129,10 @@ class MonoWaveUp(MonoWave):
         :param idx_start:
         :return:
         """
-        high, high_idx = hi(self.lows_arr, self.highs_arr, self.idx_start)
-        low_at_start = self.lows_arr[self.idx_start]
-
-        if high is None:
+        high, high_idx = up_end(self.lows_arr, self.highs_arr, self.idx_start, self.skip_n)
+        if high_idx < 0:
             return None, None
 
-        for _ in range(self.skip_n):
-
-            act_high, act_high_idx = next_hi(self.lows_arr, self.highs_arr, high_idx, high)
-            if act_high is None:
-                return None, None
-
-            if act_high > high:
-                high = act_high
-                high_idx = act_high_idx
-                if np.min(self.lows_arr[self.idx_start:act_high_idx] < low_at_start):
-                    return None, None
-
         return high, high_idx
 
     @property
@@ -132,19 +145,21 @@ class MonoWaveUp(MonoWave):
 
 
 class MonoWaveDown(MonoWave):
-    def __init__(self, *args, **kwargs):
+    __slots__ = ()
+
+    def __init__(self, *args, end: tuple = None, **kwargs):
+        """
+        :param end: (low, low_idx) if the end was already found, e.g. by functions.find_wave_chains
+        """
         super().__init__(*args, **kwargs)
 
-        self.low, self.low_idx = self.find_end()
+        self.low, self.low_idx = self.find_end() if end is None else end
         self.high = self.highs_arr[self.idx_start]
         self.high_idx = self.idx_start
 
-        self.date_start = self.dates_arr[self.idx_start]
         if self.low is not None:
-            self.date_end = self.dates_arr[self.low_idx]
             self.idx_end = self.low_idx
         else:
-            self.date_end = None
             self.idx_end = None
 
     @property
@@ -162,26 +177,8 @@ class MonoWaveDown(MonoWave):
         :return:
         """
 
-        low, low_idx = lo(self.lows_arr, self.highs_arr, self.idx_start)
-        high_at_start = self.highs_arr[self.idx_start]
-        if low is None:
+        low, low_idx = down_end(self.lows_arr, self.highs_arr, self.idx_start, self.skip_n)
+        if low_idx < 0:
             return None, None
 
-        for _ in range(self.skip_n):
-            act_low, act_low_idx = next_lo(self.lows_arr, self.highs_arr, low_idx, low)
-            if act_low is None:
-                return None, None
-
-            if act_low < low:
-                low = act_low
-                low_idx = act_low_idx
-                if np.max(self.highs_arr[self.idx_start:act_low_idx]) > high_at_start:
-                    return None, None
-
-            # TODO what to do if no more minima can be found?
-            # if act_low > low:
-            #    return None, None
-        #if low > np.min(self.lows_arr[low_idx:]):
-        #    return None, None
-        #else:
         return low, low_idx
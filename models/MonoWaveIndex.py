@@ -0,0 +1,119 @@
+import numpy as np
+from models.functions import UNKNOWN, new_memo, up_scan_memo, down_scan_memo, fill_memo
+
+
+class MonoWaveIndex:
+    """
+    The ends of the MonoWaves of one series per (start index, skip), shared by all searches on the series. Waves of
+    different options and start indices end in the same extrema, so the same (start index, skip) is asked for over and
+    over. The first request scans the data (for all skips up to the requested one at once), every later one is a
+    lookup.
+    """
+    def __init__(self, lows: np.ndarray, highs: np.ndarray, max_skip: int = 0):
+        """
+
+        :param lows:
+        :param highs:
+        :param max_skip: largest skip memoized, grows with reserve()
+        """
+        self.lows = lows
+        self.highs = highs
+        self.up = new_memo(len(lows), max_skip)
+        self.down = new_memo(len(lows), max_skip)
+
+    @property
+    def max_skip(self) -> int:
+        return self.up.shape[1] - 1
+
+    def reserve(self, max_skip: int):
+        """
+        Makes room for skips up to max_skip, known entries are kept
+
+        :param max_skip:
+        :return:
+        """
+        if max_skip <= self.max_skip:
+            return
+        for name in ('up', 'down'):
+            old = getattr(self, name)
+            memo = new_memo(old.shape[0], max_skip)
+            memo[:, :old.shape[1]] = old
+            setattr(self, name, memo)
+
+    def build(self, max_skip: int = None):
+        """
+        Computes all entries at once, O(n * max_skip)
+
+        :param max_skip: default: the current max_skip
+        :return:
+        """
+        if max_skip is not None:
+            self.reserve(max_skip)
+        fill_memo(self.lows, self.highs, self.up, True)
+        fill_memo(self.lows, self.highs, self.down, False)
+
+    def up_end(self, idx_start: int, skip: int):
+        """
+        Same as MonoWaveUp.find_end
+
+        :return: high, high_idx or None, None if the wave has no end in the data
+        """
+        self.reserve(skip)
+        high, high_idx, _ = up_scan_memo(self.lows, self.highs, idx_start, skip, self.up)
+        if high_idx < 0:
+            return None, None
+        return high, high_idx
+
+    def down_end(self, idx_start: int, skip: int):
+        """
+        Same as MonoWaveDown.find_end
+
+        :return: low, low_idx or None, None if the wave has no end in the data
+        """
+        self.reserve(skip)
+        low, low_idx, _ = down_scan_memo(self.lows, self.highs, idx_start, skip, self.down)
+        if low_idx < 0:
+            return None, None
+        return low, low_idx
+
+    def update(self, lows: np.ndarray, highs: np.ndarray, first_changed: int):
+        """
+        Follows a series which changed from first_changed on (e.g. a candle was appended to a stream). Entries which
+        read the changed data are computed again on their next request.
+
+        :param lows: the series, may be longer than before
+        :param highs:
+        :param first_changed: first index with changed data
+        :return:
+        """
+        self.lows = lows
+        self.highs = highs
+
+        for name in ('up', 'down'):
+            memo = getattr(self, name)
+            if len(lows) > memo.shape[0]:
+                grown = new_memo(max(2 * memo.shape[0], len(lows)), self.max_skip)
+                grown[:memo.shape[0]] = memo
+                memo = grown
+                setattr(self, name, memo)
+            memo[memo[:, :, 1] >= first_changed] = UNKNOWN
+
+    def drop_first(self, count: int, lows: np.ndarray, highs: np.ndarray):
+        """
+        Follows a series whose first [count] values were dropped (e.g. the oldest candles of a stream). The entries of
+        the kept start indices move down together with the end indices and horizons they hold.
+
+        :param count: no. of values dropped
+        :param lows: the series without the dropped values
+        :param highs:
+        :return:
+        """
+        self.lows = lows
+        self.highs = highs
+
+        for name in ('up', 'down'):
+            memo = getattr(self, name)
+            kept = memo[count:].copy()
+            kept[kept >= 0] -= count  # UNKNOWN and the missing ends (-1) stay
+            memo[:len(kept)] = kept
+            memo[len(kept):] = UNKNOWN
@@ -0,0 +1,125 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from models.WaveAnalyzer import WaveAnalyzer
+import numpy as np
+import os
+
+
+def _search_starts(shm_name: str, n: int, starts: list, table: np.ndarray, rule_specs: list, impulse: bool):
+    """
+    Worker of ParallelWaveAnalyzer: searches the options of table from each start index on the lows / highs in the
+    shared memory block.
+
+    :return: list of (start index, rows, ends, lows, highs, passed) with the arrays reduced to the found rows
+    """
+    # the workers share the resource tracker of the parent, which unlinks the block
+    shm = SharedMemory(name=shm_name)
+    try:
+        data = np.ndarray((2, n), dtype=np.float64, buffer=shm.buf)
+        wa = WaveAnalyzer.from_arrays(data[0], data[1])
+        rules = [rule_cls(name) for rule_cls, name in rule_specs]
+
+        results = list()
+        for idx_start in starts:
+            rows, ends, lows, highs, passed = wa.search_chains(idx_start, table, rules, impulse)
+            results.append((idx_start, rows, ends[rows], lows[rows], highs[rows], passed))
+
+        # the views have to be gone before the block can be closed
+        del data, wa
+        return results
+    finally:
+        shm.close()
+
+
+class ParallelWaveAnalyzer:
+    """
+    Searches many start indices at once by sharding them across worker processes. The lows and highs are shared with
+    the workers through shared memory, the workers return the found rows only and the MonoWaves are built in the
+    calling process.
+    """
+    def __init__(self, workers: int = None, chunks_per_worker: int = 2):
+        """
+
+        :param workers: no. of processes, default: no. of CPUs
+        :param chunks_per_worker: the start indices are split into workers * chunks_per_worker chunks, so the search
+                                  can stop early after the first chunks
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunks_per_worker = chunks_per_worker
+        self.__pool = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self.__pool is None:
+            self.__pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.__pool
+
+    def find_impulsive_waves(self, wa: WaveAnalyzer, starts, wave_options, rules: list):
+        """
+        Same as WaveAnalyzer.find_impulsive_waves for many start indices
+
+        :param wa: analyzer with the data
+        :param starts: start indices
+        :param wave_options: list of WaveOptions or a WaveOptionsGenerator.table, sorted from small to large
+        :param rules: WaveRules to check
+        :return: yields (start index, iterator of (WaveOptions, list of 5 MonoWaves, list of the passed rules)) in the
+                 order of starts. Closing the generator cancels the searches not started yet.
+        """
+        return self._walk_starts(wa, starts, wave_options, rules, impulse=True)
+
+    def find_corrective_waves(self, wa: WaveAnalyzer, starts, wave_options, rules: list):
+        """
+        Same as WaveAnalyzer.find_corrective_waves for many start indices (see find_impulsive_waves)
+        """
+        return self._walk_starts(wa, starts, wave_options, rules, impulse=False)
+
+    def _walk_starts(self, wa: WaveAnalyzer, starts, wave_options, rules: list, impulse: bool):
+        starts = list(starts)
+        table, wave_options = wa._options_table(wave_options, impulse)
+        rules = list(rules)
+        rule_specs = [(type(rule), rule.name) for rule in rules]
+
+        n = len(wa.lows)
+        shm = SharedMemory(create=True, size=max(2 * n * 8, 1))
+        futures = list()
+        try:
+            data = np.ndarray((2, n), dtype=np.float64, buffer=shm.buf)
+            data[0] = wa.lows
+            data[1] = wa.highs
+            del data
+
+            no_of_chunks = min(len(starts), self.workers * self.chunks_per_worker)
+            for chunk in np.array_split(np.array(starts, dtype=np.int64), max(no_of_chunks, 1)):
+                if len(chunk) > 0:
+                    futures.append(self.pool.submit(_search_starts, shm.name, n, chunk.tolist(), table, rule_specs,
+                                                    impulse))
+
+            # merge in the order of the start indices, whatever chunk finishes first
+            for future in futures:
+                for idx_start, rows, ends, lows, highs, passed in future.result():
+                    wa.no_options_searched += len(table)
+                    yield idx_start, wa._build_waves(idx_start, table[rows], self.__subset(wave_options, rows),
+                                                     np.arange(len(rows)), ends, lows, highs, passed, rules, impulse)
+        finally:
+            for future in futures:
+                future.cancel()
+            for future in futures:
+                if not future.cancelled():
+                    future.exception()  # wait until no worker uses the block anymore
+            shm.close()
+            shm.unlink()
+
+    @staticmethod
+    def __subset(wave_options: list, rows: np.ndarray):
+        if wave_options is None:
+            return None
+        return [wave_options[row] for row in rows.tolist()]
+
+    def shutdown(self):
+        """
+        Stops the worker processes
+        """
+        if self.__pool is not None:
+            self.__pool.shutdown(wait=True, cancel_futures=True)
+            self.__pool = None
@@ -0,0 +1,37 @@
+class PatternIndex:
+    """
+    The patterns found so far by their key (WavePattern.key, WaveCycle.key), to drop a pattern found again in O(1).
+    Different WaveOptions lead to the same pattern, e.g. [1, 2, 3, 4, 5] and [1, 2, 3, 4, 10] if there are less than
+    10 maxima to skip for wave 5.
+    """
+    def __init__(self):
+        self.__patterns = dict()  # key: first pattern with this key
+
+    def add(self, pattern) -> bool:
+        """
+        Adds the pattern if no pattern with the same key is known
+
+        :param pattern: WavePattern or WaveCycle
+        :return: True if the pattern is new, False if it is a duplicate
+        """
+        key = pattern.key
+        if key in self.__patterns:
+            return False
+        self.__patterns[key] = pattern
+        return True
+
+    def get(self, key: tuple):
+        """
+        :param key: see WavePattern.key
+        :return: the pattern added first with this key, None if unknown
+        """
+        return self.__patterns.get(key)
+
+    def __contains__(self, pattern) -> bool:
+        return pattern.key in self.__patterns
+
+    def __len__(self) -> int:
+        return len(self.__patterns)
+
+    def __iter__(self):
+        return iter(self.__patterns.values())
@@ -0,0 +1,282 @@
+from __future__ import annotations
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WaveRuleEngine import WaveFeatures
+from models.functions import find_wave_chains, atr_swing
+import numpy as np
+import pandas as pd
+
+
+class ChainState:
+    """
+    The find_wave_chains result of one start index, together with the rules passed by each row
+    """
+    __slots__ = ('ends', 'lows', 'highs', 'horizons', 'passed', 'found')
+
+    def __init__(self, ends: np.ndarray, lows: np.ndarray, highs: np.ndarray, valid: np.ndarray,
+                 horizons: np.ndarray, passed: np.ndarray):
+        self.ends = ends
+        self.lows = lows
+        self.highs = highs
+        self.horizons = horizons
+        self.passed = passed
+        self.found = valid & passed.any(axis=1)  # all waves found and at least one rule passed
+
+
+class StreamingWaveAnalyzer(WaveAnalyzer):
+    """
+    Keeps the waves found from the start indices of the last [lookback] candles and updates them when candles are
+    appended.
+
+    Every option of a start index remembers how far its waves read the data (its horizon, see functions.up_scan).
+    A new candle can only change the options which read up to the end of the data, all others are kept, so the cost
+    of an update depends on the no. of these options and not on the lookback.
+
+    Start indices are positions in the kept candles (multiples of [step], or the pivots, see pivot_atr), they do not
+    move when candles are appended. Only the candles of the lookback and [history] candles before are kept: once
+    twice as many are stored, the older ones are dropped and all indices move down (see dropped), so memory stays
+    bounded on an endless stream.
+    """
+    def __init__(self,
+                 df: pd.DataFrame,
+                 wave_options,
+                 rules: list,
+                 impulse: bool = True,
+                 lookback: int = 150,
+                 step: int = 5,
+                 pivot_atr: float = None,
+                 history: int = None,
+                 verbose: bool = False):
+        """
+
+        :param df: the candles to start with (Date, Low, High)
+        :param wave_options: list of WaveOptions or a WaveOptionsGenerator.table, sorted from small to large
+        :param rules: WaveRules the patterns have to pass (at least one of them)
+        :param impulse: search impulsive (12345) or corrective (ABC) waves
+        :param lookback: start indices are taken from the last [lookback] candles
+        :param step: distance of the start indices
+        :param pivot_atr: start at the swing lows (highs for corrective waves) of a zigzag of [pivot_atr] average
+                          candle ranges instead of every [step] candles (see WaveAnalyzer.pivot_starts). Only the
+                          last pivot can move with a new candle, its old start is dropped then.
+        :param history: candles kept before the first start index, for the pivots and average ranges (default:
+                        lookback). The waves are only read from their start index on.
+        :param verbose:
+        """
+        super().__init__(df, verbose=verbose)
+
+        self.table, self.wave_options = self._options_table(wave_options, impulse)
+        self.rules = list(rules)
+        self.impulse = impulse
+        self.lookback = lookback
+        self.step = step
+        self.pivot_atr = pivot_atr
+        self.history = lookback if history is None else history
+        self.dropped = 0  # candles dropped from the start, index i is the candle no. dropped + i of the stream
+
+        # growable buffers, self.lows / highs / dates are views of the filled part
+        self.__lows = self.lows.copy()
+        self.__highs = self.highs.copy()
+        self.__dates = self.dates.copy()
+        self.n = len(self.__lows)
+        self.__set_views()
+        self.index.update(self.lows, self.highs, 0)
+        self.index.reserve(int(self.table.max(initial=0)))
+
+        self.states = dict()  # start index: ChainState
+        self.__update_starts()
+
+    def __set_views(self):
+        self.lows = self.__lows[:self.n]
+        self.highs = self.__highs[:self.n]
+        self.dates = self.__dates[:self.n]
+
+    def __grow(self):
+        capacity = max(2 * len(self.__lows), 16)
+        self.__lows = self.__resized(self.__lows, capacity)
+        self.__highs = self.__resized(self.__highs, capacity)
+        self.__dates = self.__resized(self.__dates, capacity)
+
+    def __resized(self, buffer: np.ndarray, capacity: int) -> np.ndarray:
+        resized = np.empty(capacity, dtype=buffer.dtype)
+        resized[:self.n] = buffer[:self.n]
+        return resized
+
+    def append(self, candle) -> list:
+        """
+        Adds a candle to the stream. A candle with the same Date as the last one replaces it (update of a candle
+        which is still open).
+
+        :param candle: dict / pd.Series with Date, Low, High
+        :return: the new or changed patterns as list of (start index, WaveOptions, list of MonoWaves, passed rules)
+        """
+        if self.n > 0 and candle['Date'] == self.__dates[self.n - 1]:
+            if candle['Low'] == self.__lows[self.n - 1] and candle['High'] == self.__highs[self.n - 1]:
+                return list()  # nothing changed, e.g. the overlapping candle of extend()
+            first_changed = self.n - 1
+        else:
+            if self.n >= 2 * (self.lookback + self.history):
+                self.__drop_old()
+            if self.n == len(self.__lows):
+                self.__grow()
+            first_changed = self.n
+            self.n += 1
+
+        self.__lows[first_changed] = candle['Low']
+        self.__highs[first_changed] = candle['High']
+        self.__dates[first_changed] = candle['Date']
+        self.__set_views()
+        self.index.update(self.lows, self.highs, first_changed)
+
+        return self.__update_starts(first_changed)
+
+    def __drop_old(self):
+        """
+        Drops the candles older than lookback + history, a multiple of step so the start indices stay on their grid
+        """
+        count = self.n - self.lookback - self.history
+        if self.pivot_atr is None:
+            count = count // self.step * self.step
+        if count <= 0:
+            return
+
+        self.n -= count
+        for buffer in (self.__lows, self.__highs, self.__dates):
+            buffer[:self.n] = buffer[count:count + self.n]
+        self.dropped += count
+        self.__set_views()
+        self.index.drop_first(count, self.lows, self.highs)
+
+        states = dict()
+        for idx_start, state in self.states.items():
+            if idx_start < count:
+                continue
+            state.ends[state.ends >= 0] -= count  # waves not found stay -1
+            state.horizons -= count
+            states[idx_start - count] = state
+        self.states = states
+
+    def extend(self, df: pd.DataFrame):
+        """
+        Appends the candles of df which are newer than the last candle of the stream, e.g. the latest klines fetched
+        for the symbol. The last candle of the stream is updated as well.
+
+        :param df: candles (Date, Low, High) overlapping with the stream
+        :return: the new or changed patterns (see append), None if df does not continue the stream
+        """
+        if self.n == 0:
+            return None
+
+        dates = np.asarray(df['Date'])
+        overlap = np.flatnonzero(dates == self.__dates[self.n - 1])
+        if len(overlap) == 0:
+            return None
+
+        lows = np.asarray(df['Low'])
+        highs = np.asarray(df['High'])
+        updates = list()
+        for idx in range(overlap[0], len(dates)):
+            updates.extend(self.append({'Date': dates[idx], 'Low': lows[idx], 'High': highs[idx]}))
+        return updates
+
+    def __update_starts(self, first_changed: int = None) -> list:
+        """
+        Drops the start indices which left the lookback, searches the new ones and updates the options of the others
+        which read the data from first_changed on.
+        """
+        if self.pivot_atr is None:
+            first_start = -(-max(0, self.n - self.lookback) // self.step) * self.step
+            starts = range(first_start, self.n, self.step)
+        else:
+            starts = self.pivot_starts(max(0, self.n - self.lookback), self.n, self.impulse,
+                                       atr_swing(self.lows, self.highs, multiple=self.pivot_atr))
+
+        for idx_start in [idx_start for idx_start in self.states if idx_start not in starts]:
+            del self.states[idx_start]
+
+        # the rows to search per start index: all for new ones, those which read the changed candles for the others
+        searches = list()
+        for idx_start in starts:
+            state = self.states.get(idx_start)
+            if state is None:
+                rows = np.arange(len(self.table))
+            else:
+                rows = np.flatnonzero(state.horizons >= first_changed)
+                if len(rows) == 0:
+                    continue
+            searches.append((idx_start, state, rows, *find_wave_chains(self.lows, self.highs, idx_start,
+                                                                      self.table[rows], self.impulse,
+                                                                      self.index.up, self.index.down)))
+            self.no_options_searched += len(rows)
+
+        passed = self.__check_rules(searches)
+
+        updates = list()
+        for (idx_start, state, rows, ends, lows, highs, valid, horizons), rules_passed in zip(searches, passed):
+            new = ChainState(ends, lows, highs, valid, horizons, rules_passed)
+            found = np.flatnonzero(new.found)
+
+            if state is None:
+                self.states[idx_start] = state = new
+                changed = found
+            else:
+                changed = rows[found]
+                if len(changed) > 0:
+                    changed = changed[~state.found[changed]
+                                      | (ends[found] != state.ends[changed]).any(axis=1)
+                                      | (lows[found] != state.lows[changed]).any(axis=1)
+                                      | (highs[found] != state.highs[changed]).any(axis=1)
+                                      | (rules_passed[found] != state.passed[changed]).any(axis=1)]
+
+                for name in ChainState.__slots__:
+                    getattr(state, name)[rows] = getattr(new, name)
+
+            if len(changed) > 0:
+                updates.extend((idx_start, *pattern) for pattern in self.__build(idx_start, state, changed))
+
+        return updates
+
+    def __check_rules(self, searches: list) -> list:
+        """
+        Checks the rules on the valid rows of all searches at once
+
+        :return: boolean matrix (rows, rules) per search
+        """
+        passed = [np.zeros((len(search[2]), len(self.rules)), dtype=bool) for search in searches]
+        checked = [np.flatnonzero(search[6]) for search in searches]
+        if sum(len(rows) for rows in checked) == 0:
+            return passed
+
+        features = WaveFeatures.from_chains(
+            np.concatenate([np.full(len(rows), search[0]) for search, rows in zip(searches, checked)]),
+            np.concatenate([search[3][rows] for search, rows in zip(searches, checked)]),
+            np.concatenate([search[4][rows] for search, rows in zip(searches, checked)]),
+            np.concatenate([search[5][rows] for search, rows in zip(searches, checked)]))
+        result = self.rule_engine(self.rules).check(features)
+
+        offset = 0
+        for rules_passed, rows in zip(passed, checked):
+            rules_passed[rows] = result[offset:offset + len(rows)]
+            offset += len(rows)
+        return passed
+
+    def __build(self, idx_start: int, state: ChainState, rows: np.ndarray):
+        return self._build_waves(idx_start, self.table, self.wave_options, rows, state.ends, state.lows, state.highs,
+                                 state.passed[rows], self.rules, self.impulse)
+
+    def patterns_from(self, idx_start: int):
+        """
+        The patterns found from a tracked start index (see states), in the order of the options
+
+        :return: yields (WaveOptions, list of MonoWaves, list of the passed rules)
+        """
+        state = self.states[idx_start]
+        return self.__build(idx_start, state, np.flatnonzero(state.found))
+
+    def patterns(self):
+        """
+        All patterns found in the current data, ordered by start index and option
+
+        :return: yields (start index, WaveOptions, list of MonoWaves, list of the passed rules)
+        """
+        for idx_start in sorted(self.states):
+            for pattern in self.patterns_from(idx_start):
+                yield (idx_start, *pattern)
@@ -1,10 +1,16 @@
 from models.MonoWave import MonoWaveUp, MonoWaveDown
-from models.WaveOptions import WaveOptionsGenerator5, WaveOptionsGenerator3
+from models.MonoWaveIndex import MonoWaveIndex
+from models.WaveOptions import WaveOptions, WaveOptionsGenerator5, WaveOptionsGenerator3
 from models.WaveCycle import WaveCycle
+from models.PatternIndex import PatternIndex
 from models.WavePattern import WavePattern
 from models.WaveRules import Impulse, Correction, TDWave
+from models.WaveRuleEngine import WaveRuleEngine, WaveFeatures
+from models.functions import find_wave_chains, find_pivots
 import numpy as np
 import pandas as pd
+import heapq
+import time
 
 
 class WaveAnalyzer:
@@ -16,13 +22,45 @@ class WaveAnalyzer:
                  verbose: bool = False):
 
         self.df = df
-        self.lows = np.array(list(self.df['Low']))
-        self.highs = np.array(list(self.df['High']))
-        self.dates = np.array(list(self.df['Date']))
+        # views of the column buffers (no copy for float64 columns), dates stay as stored, e.g. datetime64, and are
+        # only converted when displayed
+        self.lows = self.df['Low'].to_numpy(dtype=np.float64)
+        self.highs = self.df['High'].to_numpy(dtype=np.float64)
+        self.dates = self.df['Date'].to_numpy()
+        self.__setup(verbose)
+
+    @classmethod
+    def from_arrays(cls, lows: np.ndarray, highs: np.ndarray, dates: np.ndarray = None, verbose: bool = False):
+        """
+        Analyzer working directly on arrays, e.g. attached from shared memory, without a DataFrame
+
+        :param lows: float64 (other dtypes are converted)
+        :param highs: float64 (other dtypes are converted)
+        :param dates: optional, e.g. int64 epoch timestamps or datetime64, the indices are used as dates otherwise
+        :param verbose:
+        :return:
+        """
+        wa = cls.__new__(cls)
+        wa.df = None
+        wa.lows = np.ascontiguousarray(lows, dtype=np.float64)
+        wa.highs = np.ascontiguousarray(highs, dtype=np.float64)
+        wa.dates = dates if dates is not None else np.arange(len(lows))
+        wa.__setup(verbose)
+        return wa
+
+    def __setup(self, verbose: bool):
         self.verbose = verbose
 
+        # ends of the MonoWaves per (start index, skip), shared by all searches
+        self.index = MonoWaveIndex(self.lows, self.highs)
+
+        # work done so far, e.g. for metrics: WaveOptions searched from a start index and MonoWaves built for them
+        self.no_options_searched = 0
+        self.no_monowaves_built = 0
+
         self.impulse_rules = list()
         self.correction_rules = list()
+        self.__rule_engines = dict()
 
         self.__waveoptions_up: WaveOptionsGenerator5
         self.__waveoptions_down: WaveOptionsGenerator3
@@ -36,6 +74,35 @@ class WaveAnalyzer:
         """
         return np.min(self.lows)
 
+    def pivots(self, min_swing=0.):
+        """
+        The alternating swing lows and highs of the data, see functions.find_pivots
+
+        :param min_swing: size of the countermove confirming a pivot, a price or an array per index (e.g.
+                          functions.atr_swing or functions.zigzag_swing). 0 gives every swing.
+        :return: idx, kinds (-1: low, 1: high)
+        """
+        if np.ndim(min_swing) == 0:
+            min_swing = np.full(len(self.lows), min_swing, dtype=np.float64)
+        return find_pivots(self.lows, self.highs, np.ascontiguousarray(min_swing, dtype=np.float64))
+
+    def pivot_starts(self, idx_from: int = 0, idx_to: int = None, impulse: bool = True, min_swing=0.) -> list:
+        """
+        Start indices at the pivots in [idx_from, idx_to) instead of every candle: the swing lows for impulsive waves
+        (starting upwards), the swing highs for corrective ones. Searches from the same index give the same patterns,
+        the starts left out are inside a move, where a wave starting there would begin mid-swing.
+
+        :param idx_from:
+        :param idx_to: default: end of the data
+        :param impulse: impulsive (12345) or corrective (ABC) waves
+        :param min_swing: see pivots, larger values only keep the starts of larger moves
+        :return: sorted start indices
+        """
+        idx, kinds = self.pivots(min_swing)
+        idx = idx[kinds == (-1 if impulse else 1)]
+        idx_to = len(self.lows) if idx_to is None else idx_to
+        return idx[(idx >= idx_from) & (idx < idx_to)].tolist()
+
     def set_combinatorial_limits(self, n_up: int = 10, n_down: int = 10):
         """
         Change the limit to skip min / maxima for the WaveOptionsGenerators, e.g. go up to [n_up, n_up, ...] for the
@@ -60,60 +127,54 @@ class WaveAnalyzer:
 
                 False otherwise
         """
-
-
-
         if wave_config is None:
             wave_config = [0, 0, 0, 0, 0]
 
-        wave1 = MonoWaveUp(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=idx_start, skip=wave_config[0])
-        wave1.label = '1'
-        wave1_end = wave1.idx_end
-        if wave1_end is None:
-            if self.verbose: print("Wave 1 has no End in Data")
-            return False
-
-        wave2 = MonoWaveDown(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave1_end, skip=wave_config[1])
-        wave2.label = '2'
-        wave2_end = wave2.idx_end
-        if wave2_end is None:
-            if self.verbose: print("Wave 2 has no End in Data")
-            return False
-
-        wave3 = MonoWaveUp(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave2_end, skip=wave_config[2])
-        wave3.label = '3'
-        wave3_end = wave3.idx_end
-        if wave3_end is None:
-            if self.verbose: print("Wave 3 has no End in Data")
-            return False
-
-        wave4 = MonoWaveDown(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave3_end, skip=wave_config[3])
-        wave4.label = '4'
-        wave4_end = wave4.idx_end
+        waves = list()
+        for skip in wave_config[:5]:
+            wave = self._next_impulsive_wave(waves, idx_start, skip)
+            if wave is None:
+                return False
+            waves.append(wave)
 
-        if wave4_end is None:
-            if self.verbose: print("Wave 4 has no End in Data")
-            return False
-
-        # Check if array slice is not empty before calling np.min
-        wave2_to_4_lows = self.lows[wave2.low_idx:wave4.low_idx]
-        if len(wave2_to_4_lows) > 0 and wave2.low > np.min(wave2_to_4_lows):
-            return False
-
-        wave5 = MonoWaveUp(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave4_end, skip=wave_config[4])
-        wave5.label = '5'
-        wave5_end = wave5.idx_end
-        if wave5_end is None:
-            if self.verbose: print("Wave 5 has no End in Data")
-            return False
+        return waves
 
-        # Check if array slice is not empty before calling np.min
-        wave4_to_5_lows = self.lows[wave4.low_idx:wave5.high_idx]
-        if len(wave4_to_5_lows) > 0 and wave4_to_5_lows.any() and wave4.low > np.min(wave4_to_5_lows):
-            if self.verbose: print('Low of Wave 4 higher than a low between Wave 4 and Wave 5')
-            return False
+    def _next_impulsive_wave(self, waves: list, idx_start: int, skip: int):
+        """
+        Builds the next MonoWave of an impulse on top of the already found waves.
 
-        return [wave1, wave2, wave3, wave4, wave5]
+        :param waves: the MonoWaves found so far (wave1, wave2, ...)
+        :param idx_start: index in dataframe where wave1 starts
+        :param skip: no. of min / maxima to skip for the new MonoWave
+        :return: the new MonoWave, None if it has no end in the data or overlaps with the previous waves
+        """
+        wave_no = len(waves) + 1
+        wave_cls = MonoWaveUp if wave_no % 2 == 1 else MonoWaveDown
+        wave_start = idx_start if wave_no == 1 else waves[-1].idx_end
+
+        end = self.index.up_end(wave_start, skip) if wave_cls is MonoWaveUp else self.index.down_end(wave_start, skip)
+        wave = wave_cls(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave_start, skip=skip, end=end)
+        wave.label = str(wave_no)
+        if wave.idx_end is None:
+            if self.verbose: print(f"Wave {wave_no} has no End in Data")
+            return None
+
+        if wave_no == 4:
+            # Check if array slice is not empty before calling np.min
+            wave2 = waves[1]
+            wave2_to_4_lows = self.lows[wave2.low_idx:wave.low_idx]
+            if len(wave2_to_4_lows) > 0 and wave2.low > np.min(wave2_to_4_lows):
+                return None
+
+        elif wave_no == 5:
+            # Check if array slice is not empty before calling np.min
+            wave4 = waves[3]
+            wave4_to_5_lows = self.lows[wave4.low_idx:wave.high_idx]
+            if len(wave4_to_5_lows) > 0 and wave4_to_5_lows.any() and wave4.low > np.min(wave4_to_5_lows):
+                if self.verbose: print('Low of Wave 4 higher than a low between Wave 4 and Wave 5')
+                return None
+
+        return wave
 
     def find_corrective_wave(self,
                              idx_start: int,
@@ -129,25 +190,185 @@ class WaveAnalyzer:
         if wave_config is None:
             wave_config = [0, 0, 0]
 
-        waveA = MonoWaveDown(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=idx_start, skip=wave_config[0])
-        waveA.label = 'A'
-        waveA_end = waveA.idx_end
-        if waveA_end is None:
-            return False
+        waves = list()
+        for skip in wave_config[:3]:
+            wave = self._next_corrective_wave(waves, idx_start, skip)
+            if wave is None:
+                return False
+            waves.append(wave)
 
-        waveB = MonoWaveUp(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=waveA_end, skip=wave_config[1])
-        waveB.label = 'B'
-        waveB_end = waveB.idx_end
-        if waveB_end is None:
-            return False
+        return waves
 
-        waveC = MonoWaveDown(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=waveB_end, skip=wave_config[2])
-        waveC.label = 'C'
-        waveC_end = waveC.idx_end
-        if waveC_end is None:
-            return False
+    def _next_corrective_wave(self, waves: list, idx_start: int, skip: int):
+        """
+        Builds the next MonoWave of a correction on top of the already found waves.
+
+        :param waves: the MonoWaves found so far (waveA, waveB)
+        :param idx_start: index in dataframe where waveA starts
+        :param skip: no. of min / maxima to skip for the new MonoWave
+        :return: the new MonoWave, None if it has no end in the data
+        """
+        wave_no = len(waves)
+        wave_cls = MonoWaveDown if wave_no % 2 == 0 else MonoWaveUp
+        wave_start = idx_start if wave_no == 0 else waves[-1].idx_end
+
+        end = self.index.up_end(wave_start, skip) if wave_cls is MonoWaveUp else self.index.down_end(wave_start, skip)
+        wave = wave_cls(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave_start, skip=skip, end=end)
+        wave.label = 'ABC'[wave_no]
+        if wave.idx_end is None:
+            return None
+
+        return wave
+
+    def find_impulsive_waves(self,
+                             idx_start: int,
+                             wave_options,
+                             rules: list = None,
+                             unique: bool = False):
+        """
+        Same as find_impulsive_wave, but for many WaveOptions at once. The end points of all options are found by a
+        compiled kernel (functions.find_wave_chains) first and MonoWaves are only built for the valid ones.
+
+        Options sharing the same prefix [i, j, ...] share their MonoWaves, e.g. wave1 is only built once per i.
+        If rules are given, they are checked for all valid options at once by a WaveRuleEngine.
 
-        return [waveA, waveB, waveC]
+        :param idx_start: index in dataframe to start from
+        :param wave_options: list of WaveOptions or a WaveOptionsGenerator.table, sorted from small to large
+        :param rules: WaveRules to check, optional
+        :param unique: only yield the first option of each pattern (same wave ends, see WavePattern.key), the
+                       MonoWaves of the others are not built
+        :return: yields (WaveOptions, list of 5 MonoWaves, list of the passed rules) in the order of wave_options.
+                 If rules are given, only patterns passing at least one of them are yielded.
+        """
+        return self._walk_options(idx_start, wave_options, rules, impulse=True, unique=unique)
+
+    def find_corrective_waves(self,
+                              idx_start: int,
+                              wave_options,
+                              rules: list = None,
+                              unique: bool = False):
+        """
+        Same as find_impulsive_waves, but for corrective movements (ABC)
+
+        :param idx_start: index in dataframe to start from
+        :param wave_options: list of WaveOptions or a WaveOptionsGenerator.table, sorted from small to large
+        :param rules: WaveRules to check, optional
+        :param unique: only yield the first option of each pattern
+        :return: yields (WaveOptions, list of 3 MonoWaves, list of the passed rules)
+        """
+        return self._walk_options(idx_start, wave_options, rules, impulse=False, unique=unique)
+
+    def _walk_options(self, idx_start: int, wave_options, rules: list, impulse: bool, unique: bool = False):
+        table, wave_options = self._options_table(wave_options, impulse)
+        rules = list(rules) if rules else list()
+
+        rows, ends, lows, highs, passed = self.search_chains(idx_start, table, rules, impulse)
+        if unique:
+            # the ends of all waves are the pattern key (the start is the same for all rows), first row per key
+            first = dict()
+            for i, key in enumerate(map(tuple, ends[rows].tolist())):
+                first.setdefault(key, i)
+            if len(first) < len(rows):
+                first = np.fromiter(first.values(), dtype=np.int64, count=len(first))
+                rows, passed = rows[first], passed[first]
+        yield from self._build_waves(idx_start, table, wave_options, rows, ends, lows, highs, passed, rules, impulse)
+
+    def search_chains(self, idx_start: int, table: np.ndarray, rules: list, impulse: bool = True):
+        """
+        The search of find_impulsive_waves / find_corrective_waves without building MonoWaves
+
+        :param idx_start: index in dataframe to start from
+        :param table: WaveOptions table (n, no. of waves), sorted from small to large
+        :param rules: WaveRules to check, the options passing none of them are dropped. No check if empty.
+        :param impulse: impulsive (12345) or corrective (ABC) waves
+        :return: rows: the found rows of table,
+                 ends, lows, highs: output of functions.find_wave_chains for all rows of table,
+                 passed (len(rows), no. of rules): True where the row passed the rule
+        """
+        self.index.reserve(int(table.max(initial=0)))
+        ends, lows, highs, valid, _ = find_wave_chains(self.lows, self.highs, idx_start, table, impulse,
+                                                       self.index.up, self.index.down)
+        self.no_options_searched += len(table)
+        rows = np.flatnonzero(valid)
+
+        if rules:
+            # check all rules on all valid options at once, MonoWaves are only built for the survivors
+            passed = self.rule_engine(rules).check(WaveFeatures.from_chains(idx_start, ends[rows], lows[rows],
+                                                                            highs[rows]))
+            survivors = passed.any(axis=1)
+            rows, passed = rows[survivors], passed[survivors]
+        else:
+            passed = np.zeros((len(rows), 0), dtype=bool)
+
+        return rows, ends, lows, highs, passed
+
+    @staticmethod
+    def _options_table(wave_options, impulse: bool):
+        """
+        :param wave_options: list of WaveOptions or a WaveOptionsGenerator.table
+        :return: the table of skips (n, no. of waves) and the list of WaveOptions (None if a table was given)
+        """
+        if isinstance(wave_options, np.ndarray):
+            return wave_options, None
+
+        no_of_waves = 5 if impulse else 3
+        wave_options = list(wave_options)
+        table = np.array([option.values[:no_of_waves] for option in wave_options], dtype=np.int64)
+        return table.reshape(len(wave_options), no_of_waves), wave_options
+
+    def _build_waves(self, idx_start: int, table: np.ndarray, wave_options: list, rows: np.ndarray,
+                     ends: np.ndarray, lows: np.ndarray, highs: np.ndarray, passed: np.ndarray, rules: list,
+                     impulse: bool):
+        """
+        Builds the MonoWaves of the given rows of a find_wave_chains result. Rows sharing the same prefix share their
+        MonoWaves.
+
+        :return: yields (WaveOptions, list of MonoWaves, list of the passed rules) for each row
+        """
+        no_of_waves = table.shape[1]
+        waves = list()  # MonoWaves of the current prefix
+        prev_values = None
+
+        for row, rules_passed in zip(rows.tolist(), passed.tolist()):
+            values = table[row].tolist()
+
+            shared = 0
+            if prev_values is not None:
+                while shared < len(waves) and values[shared] == prev_values[shared]:
+                    shared += 1
+            prev_values = values
+            del waves[shared:]
+
+            while len(waves) < no_of_waves:
+                wave_no = len(waves)
+                wave_start = idx_start if wave_no == 0 else waves[-1].idx_end
+                wave_end = int(ends[row, wave_no])
+
+                if (wave_no % 2 == 0) == impulse:
+                    wave = MonoWaveUp(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave_start,
+                                      skip=values[wave_no], end=(float(highs[row, wave_no]), wave_end))
+                else:
+                    wave = MonoWaveDown(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave_start,
+                                        skip=values[wave_no], end=(float(lows[row, wave_no]), wave_end))
+                wave.label = str(wave_no + 1) if impulse else 'ABC'[wave_no]
+                waves.append(wave)
+                self.no_monowaves_built += 1
+
+            wave_option = wave_options[row] if wave_options is not None else WaveOptions(*values)
+            yield wave_option, list(waves), [rule for rule, ok in zip(rules, rules_passed) if ok]
+
+    def rule_engine(self, rules: list) -> WaveRuleEngine:
+        """
+        The WaveRuleEngine checking the given rules. It is kept for the lifetime of the analyzer, so its rejection
+        statistics cover all searches done with these rules.
+
+        :param rules: list of WaveRules
+        :return:
+        """
+        key = tuple(rules)
+        if key not in self.__rule_engines:
+            self.__rule_engines[key] = WaveRuleEngine(rules)
+        return self.__rule_engines[key]
 
     def find_td_wave(self, idx_start: int, wave_config: list = None):
         if wave_config is None:
@@ -175,36 +396,89 @@ class WaveAnalyzer:
         impulse = Impulse('impulse')
         correction = Correction('correction')
 
-        wave_cycles = set()
+        wave_cycles = PatternIndex()
+        options_down = self.__waveoptions_down.table
 
-        for new_option_impulse in self.__waveoptions_up.options_sorted:
+        for new_option_impulse, waves_up, _ in self.find_impulsive_waves(idx_start=start_idx,
+                                                                          wave_options=self.__waveoptions_up.table,
+                                                                          rules=[impulse], unique=True):
 
             cycle_complete = False
-            waves_up = self.find_impulsive_wave(idx_start=start_idx,
-                                                wave_config=new_option_impulse.values)
-
-            if waves_up:
-                wavepattern_up = WavePattern(waves_up, verbose=False)
-                if wavepattern_up.check_rule(impulse):
-                    if self.verbose: ('Impulse found!', new_option_impulse.values)
-                    end = waves_up[4].idx_end
+            wavepattern_up = WavePattern(waves_up, verbose=False)
+            if self.verbose: ('Impulse found!', new_option_impulse.values)
+            end = waves_up[4].idx_end
 
-                    for new_option_correction in self.__waveoptions_down.options_sorted:
-                        waves = self.find_corrective_wave(idx_start=end, wave_config=new_option_correction.values)
-                        if waves:
-                            wavepattern = WavePattern(waves, verbose=False)
-                            if wavepattern.check_rule(correction):
+            for new_option_correction, waves, _ in self.find_corrective_waves(idx_start=end,
+                                                                              wave_options=options_down,
+                                                                              rules=[correction], unique=True):
+                wavepattern = WavePattern(waves, verbose=False)
 
-                                cycle_complete = True
-                                wave_cycle = WaveCycle(wavepattern_up, wavepattern)
-                                wave_cycles.add(wave_cycle)
+                cycle_complete = True
+                wave_cycle = WaveCycle(wavepattern_up, wavepattern)
 
-                                # if wave_cycle not in wave_cycles:
-                                if self.verbose and wave_cycle not in wave_cycles:
-                                    print('Corrrection found!', new_option_correction.values)
-                                    print('*' * 40)
+                if wave_cycles.add(wave_cycle) and self.verbose:
+                    print('Corrrection found!', new_option_correction.values)
+                    print('*' * 40)
 
-                    if cycle_complete:
-                        yield wave_cycle
+            if cycle_complete:
+                yield wave_cycle
 
         return None
+
+    def best_cycles(self,
+                    start_idx: int,
+                    score=None,
+                    correction_score=None,
+                    k: int = None,
+                    time_budget: float = None):
+        """
+        Lazy version of next_cycle yielding the WaveCycles best first, e.g. the best few counts within a latency
+        budget. All impulses are found at once (cheap), their corrections are only searched when the impulse is the
+        best one left.
+
+        The score of a cycle is score(impulse) * correction_score(correction). As correction_score is in [0, 1], a
+        cycle is not better than its impulse and it is yielded as soon as no impulse left has a higher score.
+
+        :param start_idx: index to start the impulses from
+        :param score: function of the impulse WavePattern >= 0, e.g.
+                      ElliottWaveTradingSystem._calculate_pattern_confidence. Default: the order of the WaveOptions
+        :param correction_score: function of the corrective WavePattern in [0, 1], default: 1
+        :param k: stop after k cycles
+        :param time_budget: seconds, no more corrections are searched after it (checked before the corrections of
+                            every impulse), the cycles found so far are yielded best first, possibly none
+        :return: yields (score, WaveCycle)
+        """
+        started = time.perf_counter()
+        impulse = Impulse('impulse')
+        correction = Correction('correction')
+
+        impulses = list()  # heap of (-score, order, WavePattern)
+        for order, (option, waves, _) in enumerate(self.find_impulsive_waves(start_idx, self.__waveoptions_up.table,
+                                                                             rules=[impulse], unique=True)):
+            wavepattern_up = WavePattern(waves, wave_options=option, verbose=False)
+            impulses.append((-score(wavepattern_up) if score else -1., order, wavepattern_up))
+        heapq.heapify(impulses)
+
+        cycles = list()  # heap of (-score, order, WaveCycle) of the searched impulses
+        order = 0
+        yielded = 0
+        while impulses or cycles:
+            if cycles and (not impulses or cycles[0][0] <= impulses[0][0]):
+                neg_score, _, wave_cycle = heapq.heappop(cycles)
+                yield -neg_score, wave_cycle
+                yielded += 1
+                if k is not None and yielded >= k:
+                    return
+                continue
+
+            if not impulses or (time_budget is not None and time.perf_counter() - started > time_budget):
+                impulses = list()  # out of time, only the cycles found so far
+                continue
+
+            neg_score, _, wavepattern_up = heapq.heappop(impulses)
+            for option, waves, _ in self.find_corrective_waves(wavepattern_up.idx_end, self.__waveoptions_down.table,
+                                                               rules=[correction], unique=True):
+                wavepattern = WavePattern(waves, wave_options=option, verbose=False)
+                factor = correction_score(wavepattern) if correction_score else 1.
+                heapq.heappush(cycles, (neg_score * factor, order, WaveCycle(wavepattern_up, wavepattern)))
+                order += 1
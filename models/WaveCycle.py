@@ -11,6 +11,9 @@ class WaveCycle:
         self.waves = list()
         self.extract_waves()
 
+        # see WavePattern.key
+        self.key = self.wp_up.key + self.wp_down.key
+
     @property
     def end_idx(self):
         return self.wp_down.end_idx
@@ -58,11 +61,7 @@ class WaveCycle:
     #     return cls(wave_pattern_up, wave_pattern_down)
 
     def __eq__(self, other):
-        if self.wp_down.values == other.wp_down.values and self.wp_up.values == other.wp_up.values:
-            return True
-        else:
-            return False
+        return self.key == other.key
 
     def __hash__(self):
-        str_to_hash = f'{self.wp_up.values}_{self.wp_down.values}'
-        return hash(str_to_hash)
+        return hash(self.key)
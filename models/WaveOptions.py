@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+import os
+import numpy as np
 
 class WaveOptions:
     """
@@ -89,31 +91,105 @@ class WaveOptions:
             return False
 
 
+_TABLES = dict()  # (no. of values, up_to) -> options table, shared by all generators of the process
+
+
+def options_table(no_of_values: int, up_to: int, cache_dir: str = None) -> np.ndarray:
+    """
+    Returns all WaveOptions with no_of_values values from [0, ...] to [up_to - 1, ...] as an array of shape
+    (n, no_of_values), sorted like WaveOptions.__lt__ from small to large, e.g. [0,0,0,0,0], [1,0,0,0,0],
+    [1,1,0,0,0], ...
+
+    A value can only be larger than 0 if all values before are larger than 0, too. The table is computed only once
+    per process and is read only. If cache_dir is given, it is loaded from / saved to this directory.
+
+    :param no_of_values: 5 for impulsive, 3 for corrective movements etc.
+    :param up_to: max. no of skipped min / maxima (excluded)
+    :param cache_dir: optional directory to persist the table
+    :return: np.ndarray
+    """
+    key = (no_of_values, up_to)
+    table = _TABLES.get(key)
+    if table is not None:
+        return table
+
+    filename = os.path.join(cache_dir, f'waveoptions{no_of_values}_{up_to}.npy') if cache_dir else None
+    if filename and os.path.exists(filename):
+        table = np.load(filename)
+    else:
+        table = _build_options_table(no_of_values, up_to)
+        if filename:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.save(filename, table)
+
+    table.setflags(write=False)
+    _TABLES[key] = table
+    return table
+
+
+def _build_options_table(no_of_values: int, up_to: int) -> np.ndarray:
+    dtype = np.int8 if up_to <= np.iinfo(np.int8).max else np.int16
+    if up_to <= 0:
+        return np.zeros((0, no_of_values), dtype=dtype)
+
+    blocks = list()
+    skips = np.arange(1, up_to, dtype=dtype)
+    for no_of_skips in range(no_of_values + 1):
+        # all combinations of [1..up_to-1] for the first no_of_skips values, 0 for the rest
+        block = np.zeros((len(skips) ** no_of_skips, no_of_values), dtype=dtype)
+        if no_of_skips > 0:
+            grid = np.meshgrid(*[skips] * no_of_skips, indexing='ij')
+            block[:, :no_of_skips] = np.stack(grid, axis=-1).reshape(-1, no_of_skips)
+        blocks.append(block)
+
+    table = np.concatenate(blocks)
+    order = np.lexsort(table.T[::-1])
+    return np.ascontiguousarray(table[order])
+
+
 class WaveOptionsGenerator(ABC):
-    def __init__(self, up_to: int):
+    def __init__(self, up_to: int, cache_dir: str = None):
         self.__up_to = up_to
-        self.options = self.populate()
+        self.__cache_dir = cache_dir
+        self.table = self.populate()
 
     @property
     def up_to(self):
         return self.__up_to
 
+    @property
+    def cache_dir(self):
+        return self.__cache_dir
+
     @property
     def number(self):
-        return len(self.options)
+        return len(self.table)
 
     @abstractmethod
-    def populate(self) -> set:
+    def populate(self) -> np.ndarray:
         pass
 
+    @property
+    def options(self) -> set:
+        return set(self.iter_sorted())
+
+    def iter_sorted(self, limit: int = None):
+        """
+        Yields the WaveOptions from small to large values [0,0,0,0,0] -> [n, n, n, n, n] without building all of them
+
+        :param limit: max. no. of WaveOptions, all if None
+        :return:
+        """
+        for values in self.table[:limit].tolist():
+            yield WaveOptions(*values)
+
     @property
     def options_sorted(self):
         """
         Will sort from small to large values [0,0,0,0,0] -> [n, n, n, n, n]
         :return:
         """
-        all_options = list(self.options)
-        return sorted(all_options)
+        return list(self.iter_sorted())
 
 
 class WaveOptionsGenerator5(WaveOptionsGenerator):
@@ -121,60 +197,21 @@ class WaveOptionsGenerator5(WaveOptionsGenerator):
     WaveOptionsGenerator for impulsive 12345 movements
 
     """
-    def populate(self) -> set:
-        checked = set()
-
-        for i in range(0, self.up_to):
-            for j in range(0, self.up_to):
-                for k in range(0, self.up_to):
-                    for l in range(0, self.up_to):
-                        for m in range(0, self.up_to):
-
-                            if i == 0:
-                                j = k = l = m = 0
-                            if j == 0:
-                                k = l = m = 0
-                            if k == 0:
-                                l = m = 0
-                            if l == 0:
-                                m = 0
-                            wave_options = WaveOptions(i, j, k, l, m)
-                            checked.add(wave_options)
-        return checked
+    def populate(self) -> np.ndarray:
+        return options_table(5, self.up_to, self.cache_dir)
 
 
 class WaveOptionsGenerator2(WaveOptionsGenerator):
     """
     WaveOptions for 12 Waves
     """
-    def populate(self) -> set:
-        checked = list
-
-        for i in range(0, self.up_to):
-            for j in range(0, self.up_to):
-                if i == 0:
-                    j = 0
-
-                wave_options = WaveOptions(i, j, None, None, None)
-                checked.append(wave_options)
-        return checked
+    def populate(self) -> np.ndarray:
+        return options_table(2, self.up_to, self.cache_dir)
 
 
 class WaveOptionsGenerator3(WaveOptionsGenerator):
     """
     WaveOptions for corrective (ABC) like movements
     """
-    def populate(self) -> set:
-        checked = set()
-
-        for i in range(0, self.up_to):
-            for j in range(0, self.up_to):
-                for k in range(0, self.up_to):
-                    if i == 0:
-                        j = k = 0
-                    if j == 0:
-                        k = 0
-
-                    wave_options = WaveOptions(i, j, k, None, None)
-                    checked.add(wave_options)
-        return checked
+    def populate(self) -> np.ndarray:
+        return options_table(3, self.up_to, self.cache_dir)
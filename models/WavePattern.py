@@ -22,6 +22,9 @@ class WavePattern:
 
         self.waves = __waves_dict
 
+        # the start and end indices of the waves, two patterns of the same data are the same count if they are equal
+        self.key = (int(waves[0].idx_start), *[int(wave.idx_end) for wave in waves])
+
     def check_rule(self, waverule: WaveRule) -> bool:
         """
         Checks if WaveRule is valid for the WavePattern
@@ -128,11 +131,7 @@ class WavePattern:
         return labels
 
     def __eq__(self, other):
-        if all([self.waves[key].low == other.waves[key].low and self.waves[key].high == other.waves[key].high for key, value in self.waves.items()]):
-            return True
-        else:
-            return False
+        return self.key == other.key
 
     def __hash__(self):
-        hash_str = f'{self.low}{self.high}'
-        return hash(hash_str)
+        return hash(self.key)
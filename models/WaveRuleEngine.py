@@ -0,0 +1,133 @@
+from __future__ import annotations
+import numpy as np
+
+
+class WaveColumns:
+    """
+    The i-th wave of many patterns at once. Offers the same attributes as a MonoWave, but as arrays, so the functions
+    of the WaveRule conditions can be evaluated on all patterns with one call.
+    """
+    def __init__(self, low: np.ndarray, high: np.ndarray, idx_start: np.ndarray, idx_end: np.ndarray):
+        self.low = low
+        self.high = high
+        self.idx_start = idx_start
+        self.idx_end = idx_end
+
+    @property
+    def length(self) -> np.ndarray:
+        return np.abs(self.high - self.low)
+
+    @property
+    def duration(self) -> np.ndarray:
+        return self.idx_end - self.idx_start
+
+
+class WaveFeatures:
+    """
+    Columnar low, high, start and end of the waves of n patterns, each an array of shape (n, no. of waves)
+    """
+    def __init__(self, lows: np.ndarray, highs: np.ndarray, idx_starts: np.ndarray, idx_ends: np.ndarray):
+        self.lows = lows
+        self.highs = highs
+        self.idx_starts = idx_starts
+        self.idx_ends = idx_ends
+
+    def __len__(self):
+        return len(self.lows)
+
+    def wave(self, idx: int) -> WaveColumns:
+        return WaveColumns(self.lows[:, idx], self.highs[:, idx], self.idx_starts[:, idx], self.idx_ends[:, idx])
+
+    @classmethod
+    def from_chains(cls, idx_start: int, ends: np.ndarray, lows: np.ndarray, highs: np.ndarray):
+        """
+        Features of the output of functions.find_wave_chains
+
+        :param idx_start: index the first wave started from
+        :param ends: end idx of each wave
+        :param lows: low of each wave
+        :param highs: high of each wave
+        :return:
+        """
+        idx_starts = np.empty_like(ends)
+        idx_starts[:, 0] = idx_start
+        idx_starts[:, 1:] = ends[:, :-1]
+        return cls(lows, highs, idx_starts, ends)
+
+    @classmethod
+    def from_patterns(cls, wave_patterns: list):
+        """
+        Features of WavePatterns with the same no. of waves
+
+        :param wave_patterns:
+        :return:
+        """
+        waves = [list(wave_pattern.waves.values()) for wave_pattern in wave_patterns]
+        return cls(np.array([[wave.low for wave in pattern] for pattern in waves], dtype=float),
+                   np.array([[wave.high for wave in pattern] for pattern in waves], dtype=float),
+                   np.array([[wave.idx_start for wave in pattern] for pattern in waves], dtype=np.int64),
+                   np.array([[wave.idx_end for wave in pattern] for pattern in waves], dtype=np.int64))
+
+
+class WaveRuleEngine:
+    """
+    Evaluates the conditions of several WaveRules on many patterns at once.
+
+    Every condition is one column of the result matrix (patterns x conditions), so e.g. Impulse and LeadingDiagonal
+    are checked in one pass. The engine also counts how many patterns were rejected by each condition.
+    """
+    def __init__(self, rules: list):
+        self.rules = list(rules)
+        self.columns = list()  # (rule no., condition name, wave indices, function) per column
+
+        for rule_no, rule in enumerate(self.rules):
+            for name, conditions in rule.conditions.items():
+                indices = [int(wave[len('wave'):]) - 1 for wave in conditions.get('waves')]
+                self.columns.append((rule_no, name, indices, conditions.get('function')))
+
+        self.__rule_of_column = np.array([column[0] for column in self.columns], dtype=np.int64)
+        self.no_checked = 0
+        self.no_rejected = np.zeros(len(self.columns), dtype=np.int64)
+
+    def evaluate(self, features: WaveFeatures) -> np.ndarray:
+        """
+        :param features: the waves of n patterns
+        :return: boolean matrix of shape (n, no. of conditions), True where the condition is fulfilled
+        """
+        waves = [features.wave(idx) for idx in range(features.lows.shape[1])]
+        matrix = np.ones((len(features), len(self.columns)), dtype=bool)
+
+        # conditions dividing by zero, e.g. LeadingDiagonal.slope, are violated (comparisons with nan are False)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for column, (_, _, indices, function) in enumerate(self.columns):
+                matrix[:, column] = function(*[waves[idx] for idx in indices])
+
+        self.no_checked += len(features)
+        self.no_rejected += len(features) - matrix.sum(axis=0)
+        return matrix
+
+    def passed(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        :param matrix: result of evaluate
+        :return: boolean matrix of shape (n, no. of rules), True where all conditions of the rule are fulfilled
+        """
+        passed = np.ones((len(matrix), len(self.rules)), dtype=bool)
+        for rule_no in range(len(self.rules)):
+            passed[:, rule_no] = matrix[:, self.__rule_of_column == rule_no].all(axis=1)
+        return passed
+
+    def check(self, features: WaveFeatures) -> np.ndarray:
+        """
+        Shortcut for passed(evaluate(features))
+        """
+        return self.passed(self.evaluate(features))
+
+    @property
+    def rejections(self) -> dict:
+        """
+        :return: {rule name: {condition: no. of patterns violating it}} of all patterns evaluated so far
+        """
+        rejections = {rule.name: dict() for rule in self.rules}
+        for (rule_no, name, _, _), no_rejected in zip(self.columns, self.no_rejected.tolist()):
+            rejections[self.rules[rule_no].name][name] = no_rejected
+        return rejections
@@ -5,6 +5,9 @@ from abc import ABC, abstractmethod
 class WaveRule(ABC):
     """
     base class for implementing wave rules
+
+    The functions of the conditions are evaluated on single MonoWaves as well as on columns of many waves at once
+    (see WaveRuleEngine), so they have to use | / & instead of or / and / not.
     """
     def __init__(self, name: str):
         self.name = name
@@ -47,9 +50,8 @@ class Impulse(WaveRule):
             # WAVE 3
             "w3_1": {
                 "waves": ["wave1", "wave3", "wave5"],
-                "function": lambda wave1, wave3, wave5: not (
-                    wave3.length < wave5.length and wave3.length < wave1.length
-                ),
+                "function": lambda wave1, wave3, wave5: (wave3.length >= wave5.length)
+                | (wave3.length >= wave1.length),
                 "message": "Wave3 is the shortest Wave.",
             },
             "w3_2": {
@@ -203,12 +205,11 @@ class LeadingDiagonal(WaveRule):
         conditions = {  # WAVE 2
             "w2_0": {
                 "waves": ["wave1", "wave2", "wave3", "wave4"],
-                "function": lambda wave1, wave2, wave3, wave4: self.slope(
-                    wave2.idx_end, wave4.idx_end, wave2.low, wave4.low
+                "function": lambda wave1, wave2, wave3, wave4: (
+                    self.slope(wave2.idx_end, wave4.idx_end, wave2.low, wave4.low)
+                    > self.slope(wave1.idx_end, wave3.idx_end, wave1.high, wave3.high)
                 )
-                > self.slope(wave1.idx_end, wave3.idx_end, wave1.high, wave3.high)
-                and self.slope(wave1.idx_end, wave3.idx_end, wave1.high, wave3.high)
-                > 0,
+                & (self.slope(wave1.idx_end, wave3.idx_end, wave1.high, wave3.high) > 0),
                 "message": "Trend lines of Wave1-3 and Wave2-4 not forming Leading Diagonal.",
             },
             "w2_1": {
@@ -229,9 +230,8 @@ class LeadingDiagonal(WaveRule):
             # WAVE 3
             "w3_1": {
                 "waves": ["wave1", "wave3", "wave5"],
-                "function": lambda wave1, wave3, wave5: not (
-                    wave3.length < wave5.length and wave3.length < wave1.length
-                ),
+                "function": lambda wave1, wave3, wave5: (wave3.length >= wave5.length)
+                | (wave3.length >= wave1.length),
                 "message": "Wave3 is the shortest Wave.",
             },
             "w3_2": {
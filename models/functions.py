@@ -97,4 +97,470 @@ def lo(lows_arr: np.array, highs_arr: np.array, idx_start):
         else:
             return low, low_idx
 
-    return low, low_idx
\ No newline at end of file
+    return low, low_idx
+
+# marks a (start index, skip) of a wave end memo which was not computed yet
+UNKNOWN = -2
+
+
+def new_memo(n: int, max_skip: int) -> np.ndarray:
+    """
+    Empty memo of the wave ends of a series, see up_scan_memo
+
+    :param n: length of the series
+    :param max_skip: largest skip memoized
+    :return: (n, max_skip + 1, 2) array of end idx and horizon per (start index, skip)
+    """
+    return np.full((n, max_skip + 1, 2), UNKNOWN, dtype=np.int32)
+
+
+@njit(cache=True)
+def up_end(lows_arr: np.array, highs_arr: np.array, idx_start: int, skip: int):
+    """
+    Compiled version of MonoWaveUp.find_end: the end of an upwards movement starting at idx_start, skipping [skip]
+    smaller downtrends
+
+    :return: high, high_idx. high_idx is -1 if there is no end in the data
+    """
+    high, high_idx, _ = up_scan(lows_arr, highs_arr, idx_start, skip)
+    return high, high_idx
+
+
+@njit(cache=True)
+def up_first(lows_arr: np.array, highs_arr: np.array, idx_start: int):
+    """
+    The end of an upwards movement without skips (hi)
+
+    :return: high, high_idx, horizon (see up_scan)
+    """
+    n = len(highs_arr)
+    high = lows_arr[idx_start]
+    high_idx = idx_start
+    for idx in range(idx_start + 1, n):
+        if highs_arr[idx] > high:
+            high = highs_arr[idx]
+            high_idx = idx
+        else:
+            return high, high_idx, idx
+    return high, high_idx, n
+
+
+@njit(cache=True)
+def up_skip(lows_arr: np.array, highs_arr: np.array, idx_start: int, high: float, high_idx: int, horizon: int):
+    """
+    Skips one smaller downtrend after the end high, high_idx of an upwards movement starting at idx_start (next_hi)
+
+    :return: high, high_idx, horizon, status. status is 0 if the movement was extended, 1 if the next skips would
+             search from the same high again (the end stays) and 2 if there is no end in the data (high_idx is -1)
+    """
+    n = len(highs_arr)
+    act_high = lows_arr[high_idx]
+    act_high_idx = -1
+    prev_high_reached = False
+    found = False
+    for idx in range(high_idx + 1, n):
+        value = highs_arr[idx]
+        if value < high and not prev_high_reached:
+            continue
+        elif value > high and not prev_high_reached:
+            prev_high_reached = True
+            act_high = value
+            act_high_idx = idx
+        elif value > act_high:
+            act_high = value
+            act_high_idx = idx
+        else:
+            found = True
+            horizon = max(horizon, idx)
+            break
+
+    if not found:
+        return high, -1, n, 2
+
+    if act_high_idx >= 0 and act_high > high:
+        below_start = True
+        for idx in range(idx_start, act_high_idx):
+            if not lows_arr[idx] < lows_arr[idx_start]:
+                below_start = False
+                break
+        if below_start:
+            return act_high, -1, horizon, 2
+        return act_high, act_high_idx, horizon, 0
+
+    return high, high_idx, horizon, 1
+
+
+@njit(cache=True)
+def up_scan(lows_arr: np.array, highs_arr: np.array, idx_start: int, skip: int):
+    """
+    Same as up_end, but also returns how far the data was read
+
+    :return: high, high_idx, horizon. horizon is the last index the result depends on, len(data) if the scan ran
+             until the end of the data (so the result may change if candles are appended)
+    """
+    high, high_idx, horizon = up_first(lows_arr, highs_arr, idx_start)
+    for _ in range(skip):
+        high, high_idx, horizon, status = up_skip(lows_arr, highs_arr, idx_start, high, high_idx, horizon)
+        if status != 0:
+            break
+    return high, high_idx, horizon
+
+
+@njit(cache=True)
+def up_scan_memo(lows_arr: np.array, highs_arr: np.array, idx_start: int, skip: int, memo: np.array):
+    """
+    Same as up_scan, but looks the result up in memo. A miss computes the ends of all skips up to [skip] from
+    idx_start in one pass (the skips extend each other) and stores them.
+
+    :param memo: (n, max_skip + 1, 2) end idx and horizon per (start index, skip), UNKNOWN if not computed yet
+                 (see new_memo). Larger skips are scanned without the memo.
+    :return: high, high_idx, horizon
+    """
+    if skip >= memo.shape[1] or idx_start >= memo.shape[0]:
+        return up_scan(lows_arr, highs_arr, idx_start, skip)
+
+    high_idx = memo[idx_start, skip, 0]
+    if high_idx != UNKNOWN:
+        return up_high(lows_arr, highs_arr, idx_start, high_idx), high_idx, memo[idx_start, skip, 1]
+
+    high, high_idx, horizon = up_first(lows_arr, highs_arr, idx_start)
+    memo[idx_start, 0, 0] = high_idx
+    memo[idx_start, 0, 1] = horizon
+    status = 0
+    for k in range(1, skip + 1):
+        if status == 0:
+            high, high_idx, horizon, status = up_skip(lows_arr, highs_arr, idx_start, high, high_idx, horizon)
+        memo[idx_start, k, 0] = high_idx
+        memo[idx_start, k, 1] = horizon
+    return high, high_idx, horizon
+
+
+@njit(cache=True)
+def up_high(lows_arr: np.array, highs_arr: np.array, idx_start: int, high_idx: int):
+    """The high of an upwards movement from idx_start ending at high_idx (up_scan starts from the low at idx_start)"""
+    if high_idx == idx_start:
+        return lows_arr[idx_start]
+    return highs_arr[high_idx]
+
+
+@njit(cache=True)
+def down_end(lows_arr: np.array, highs_arr: np.array, idx_start: int, skip: int):
+    """
+    Compiled version of MonoWaveDown.find_end: the end of a downwards movement starting at idx_start, skipping [skip]
+    smaller uptrends
+
+    :return: low, low_idx. low_idx is -1 if there is no end in the data
+    """
+    low, low_idx, _ = down_scan(lows_arr, highs_arr, idx_start, skip)
+    return low, low_idx
+
+
+@njit(cache=True)
+def down_first(lows_arr: np.array, highs_arr: np.array, idx_start: int):
+    """
+    The end of a downwards movement without skips (lo)
+
+    :return: low, low_idx, horizon (see up_scan)
+    """
+    n = len(lows_arr)
+    low = highs_arr[idx_start]
+    low_idx = idx_start
+    for idx in range(idx_start + 1, n):
+        if lows_arr[idx] < low:
+            low = lows_arr[idx]
+            low_idx = idx
+        else:
+            return low, low_idx, idx
+    return low, low_idx, n
+
+
+@njit(cache=True)
+def down_skip(lows_arr: np.array, highs_arr: np.array, idx_start: int, low: float, low_idx: int, horizon: int):
+    """
+    Skips one smaller uptrend after the end low, low_idx of a downwards movement starting at idx_start (next_lo)
+
+    :return: low, low_idx, horizon, status (see up_skip)
+    """
+    n = len(lows_arr)
+    act_low = highs_arr[low_idx]
+    act_low_idx = -1
+    prev_low_reached = False
+    found = False
+    for idx in range(low_idx + 1, n):
+        value = lows_arr[idx]
+        if value > low and not prev_low_reached:
+            continue
+        elif value < low and not prev_low_reached:
+            prev_low_reached = True
+            act_low = value
+            act_low_idx = idx
+        elif value < act_low:
+            act_low = value
+            act_low_idx = idx
+        else:
+            found = True
+            horizon = max(horizon, idx)
+            break
+
+    if not found:
+        return low, -1, n, 2
+
+    if act_low_idx >= 0 and act_low < low:
+        for idx in range(idx_start, act_low_idx):
+            if highs_arr[idx] > highs_arr[idx_start]:
+                return act_low, -1, horizon, 2
+        return act_low, act_low_idx, horizon, 0
+
+    return low, low_idx, horizon, 1
+
+
+@njit(cache=True)
+def down_scan(lows_arr: np.array, highs_arr: np.array, idx_start: int, skip: int):
+    """
+    Same as down_end, but also returns how far the data was read (see up_scan)
+
+    :return: low, low_idx, horizon
+    """
+    low, low_idx, horizon = down_first(lows_arr, highs_arr, idx_start)
+    for _ in range(skip):
+        low, low_idx, horizon, status = down_skip(lows_arr, highs_arr, idx_start, low, low_idx, horizon)
+        if status != 0:
+            break
+    return low, low_idx, horizon
+
+
+@njit(cache=True)
+def down_scan_memo(lows_arr: np.array, highs_arr: np.array, idx_start: int, skip: int, memo: np.array):
+    """
+    Same as down_scan, but looks the result up in memo (see up_scan_memo)
+
+    :return: low, low_idx, horizon
+    """
+    if skip >= memo.shape[1] or idx_start >= memo.shape[0]:
+        return down_scan(lows_arr, highs_arr, idx_start, skip)
+
+    low_idx = memo[idx_start, skip, 0]
+    if low_idx != UNKNOWN:
+        return down_low(lows_arr, highs_arr, idx_start, low_idx), low_idx, memo[idx_start, skip, 1]
+
+    low, low_idx, horizon = down_first(lows_arr, highs_arr, idx_start)
+    memo[idx_start, 0, 0] = low_idx
+    memo[idx_start, 0, 1] = horizon
+    status = 0
+    for k in range(1, skip + 1):
+        if status == 0:
+            low, low_idx, horizon, status = down_skip(lows_arr, highs_arr, idx_start, low, low_idx, horizon)
+        memo[idx_start, k, 0] = low_idx
+        memo[idx_start, k, 1] = horizon
+    return low, low_idx, horizon
+
+
+@njit(cache=True)
+def down_low(lows_arr: np.array, highs_arr: np.array, idx_start: int, low_idx: int):
+    """The low of a downwards movement from idx_start ending at low_idx (down_scan starts from the high at idx_start)"""
+    if low_idx == idx_start:
+        return highs_arr[idx_start]
+    return lows_arr[low_idx]
+
+
+@njit(cache=True)
+def fill_memo(lows_arr: np.array, highs_arr: np.array, memo: np.array, up: bool, idx_from: int = 0):
+    """
+    Computes all entries of a memo from idx_from on, O(n * max_skip) scans
+
+    :param memo: see new_memo
+    :param up: memo of upwards (up_scan) or downwards (down_scan) movements
+    """
+    max_skip = memo.shape[1] - 1
+    for idx_start in range(idx_from, min(memo.shape[0], len(lows_arr))):
+        if up:
+            up_scan_memo(lows_arr, highs_arr, idx_start, max_skip, memo)
+        else:
+            down_scan_memo(lows_arr, highs_arr, idx_start, max_skip, memo)
+
+
+@njit(cache=True)
+def find_wave_chains(lows_arr: np.array, highs_arr: np.array, idx_start: int, configs: np.array, impulse: bool,
+                     up_memo: np.array, down_memo: np.array):
+    """
+    Batch version of WaveAnalyzer.find_impulsive_wave (impulse=True, up-down-up-down-up) and
+    WaveAnalyzer.find_corrective_wave (impulse=False, down-up-down) for every row of configs.
+
+    The rows should be sorted (see WaveOptionsGenerator.table): a row reuses the waves of the prefix it shares with
+    the previous row and is skipped right away if this prefix has no valid waves.
+
+    :param idx_start: index to start the first wave from
+    :param configs: (n, no. of waves) array of skips, e.g. a WaveOptions table
+    :param up_memo: memo of the ends of upwards movements of the series, shared by all searches (see up_scan_memo)
+    :param down_memo: memo of the ends of downwards movements
+    :return: ends (n, no. of waves): end idx of each wave,
+             lows, highs (n, no. of waves): low / high of each wave,
+             valid (n): True if all waves of the row were found,
+             horizons (n): last index the result of the row depends on, len(data) if a wave ran until the end of the
+             data (see up_scan)
+    """
+    n, no_of_waves = configs.shape
+    ends = np.full((n, no_of_waves), -1, dtype=np.int64)
+    lows = np.zeros((n, no_of_waves))
+    highs = np.zeros((n, no_of_waves))
+    valid = np.zeros(n, dtype=np.bool_)
+    horizons = np.zeros(n, dtype=np.int64)
+
+    cur_ends = np.full(no_of_waves, -1, dtype=np.int64)
+    cur_lows = np.zeros(no_of_waves)
+    cur_highs = np.zeros(no_of_waves)
+    cur_horizons = np.zeros(no_of_waves + 1, dtype=np.int64)  # horizon of the first [depth] waves
+    depth = 0  # no. of waves found for the prefix of the current row
+    horizon = 0  # horizon of the current row, including a failed wave
+
+    for row in range(n):
+        shared = 0
+        if row > 0:
+            while shared < no_of_waves and configs[row, shared] == configs[row - 1, shared]:
+                shared += 1
+
+        # the previous row failed at wave depth + 1 and this row has the same prefix
+        if shared > depth:
+            horizons[row] = horizon
+            continue
+        depth = shared
+        horizon = cur_horizons[depth]
+
+        while depth < no_of_waves:
+            wave_start = idx_start if depth == 0 else cur_ends[depth - 1]
+
+            if (depth % 2 == 0) == impulse:
+                high, wave_end, wave_horizon = up_scan_memo(lows_arr, highs_arr, wave_start, configs[row, depth],
+                                                            up_memo)
+                low = lows_arr[wave_start]
+            else:
+                low, wave_end, wave_horizon = down_scan_memo(lows_arr, highs_arr, wave_start, configs[row, depth],
+                                                             down_memo)
+                high = highs_arr[wave_start]
+            horizon = max(horizon, wave_horizon)
+
+            if wave_end < 0:
+                break
+
+            if impulse and depth == 3:
+                # the low of wave 2 must be the lowest low until the end of wave 4
+                if wave_end > cur_ends[1] and cur_lows[1] > np.min(lows_arr[cur_ends[1]:wave_end]):
+                    break
+
+            elif impulse and depth == 4:
+                # the low of wave 4 must be the lowest low until the end of wave 5
+                lows_4_to_5 = lows_arr[cur_ends[3]:wave_end]
+                if len(lows_4_to_5) > 0 and lows_4_to_5.any() and cur_lows[3] > np.min(lows_4_to_5):
+                    break
+
+            cur_ends[depth] = wave_end
+            cur_lows[depth] = low
+            cur_highs[depth] = high
+            depth += 1
+            cur_horizons[depth] = horizon
+
+        if depth == no_of_waves:
+            valid[row] = True
+            ends[row] = cur_ends
+            lows[row] = cur_lows
+            highs[row] = cur_highs
+        horizons[row] = horizon
+
+    return ends, lows, highs, valid, horizons
+
+
+@njit(cache=True)
+def find_pivots(lows_arr: np.array, highs_arr: np.array, min_swing: np.array):
+    """
+    Alternating swing lows and highs (zigzag) of a series. A candidate high becomes a pivot when the lows fall more
+    than min_swing below it before a higher high is made, same for the lows. With min_swing 0 the pivots after the
+    first one are the ends of the MonoWaves without skips chained from it (up_first, down_first).
+
+    :param min_swing: per index, size of the countermove confirming a candidate pivot at this index
+    :return: idx, kinds (-1: low, 1: high) of the pivots. The last one is the extreme of the move in progress and
+             not confirmed yet
+    """
+    n = len(lows_arr)
+    idx = np.empty(n, dtype=np.int64)
+    kinds = np.empty(n, dtype=np.int8)
+    count = 0
+    trend = 0  # 1: searching the high of an upwards move, -1: the low of a downwards move, 0: not known yet
+    high_idx = 0
+    low_idx = 0
+
+    for i in range(1, n):
+        if trend == 0:
+            if highs_arr[i] > highs_arr[high_idx]:
+                high_idx = i
+            if lows_arr[i] < lows_arr[low_idx]:
+                low_idx = i
+            if high_idx > low_idx and highs_arr[high_idx] - lows_arr[low_idx] > min_swing[low_idx]:
+                idx[count] = low_idx
+                kinds[count] = -1
+                count += 1
+                trend = 1
+            elif low_idx > high_idx and highs_arr[high_idx] - lows_arr[low_idx] > min_swing[high_idx]:
+                idx[count] = high_idx
+                kinds[count] = 1
+                count += 1
+                trend = -1
+
+        elif trend == 1:
+            if highs_arr[i] > highs_arr[high_idx]:
+                high_idx = i
+            elif highs_arr[high_idx] - lows_arr[i] > min_swing[high_idx]:
+                idx[count] = high_idx
+                kinds[count] = 1
+                count += 1
+                trend = -1
+                low_idx = i
+
+        else:
+            if lows_arr[i] < lows_arr[low_idx]:
+                low_idx = i
+            elif highs_arr[i] - lows_arr[low_idx] > min_swing[low_idx]:
+                idx[count] = low_idx
+                kinds[count] = -1
+                count += 1
+                trend = 1
+                high_idx = i
+
+    if trend == 1:
+        idx[count] = high_idx
+        kinds[count] = 1
+        count += 1
+    elif trend == -1:
+        idx[count] = low_idx
+        kinds[count] = -1
+        count += 1
+
+    return idx[:count], kinds[:count]
+
+
+def zigzag_swing(lows_arr: np.array, highs_arr: np.array, pct: float) -> np.ndarray:
+    """
+    min_swing of find_pivots for a zigzag of pct percent (e.g. 0.5) of the price
+
+    :return: per index threshold
+    """
+    return (lows_arr + highs_arr) * (pct / 200.)
+
+
+def atr_swing(lows_arr: np.array, highs_arr: np.array, closes_arr: np.array = None, period: int = 14,
+              multiple: float = 1.) -> np.ndarray:
+    """
+    min_swing of find_pivots of [multiple] average true ranges, the mean is taken over the available candles for the
+    first [period] ones
+
+    :param closes_arr: optional, without the true range is the range of the candle (high - low)
+    :return: per index threshold
+    """
+    true_range = highs_arr - lows_arr
+    if closes_arr is not None and len(closes_arr) > 1:
+        prev_closes = closes_arr[:-1]
+        true_range[1:] = np.maximum(true_range[1:], np.maximum(np.abs(highs_arr[1:] - prev_closes),
+                                                               np.abs(lows_arr[1:] - prev_closes)))
+    sums = np.cumsum(true_range)
+    counts = np.minimum(np.arange(1, len(true_range) + 1), period)
+    sums[period:] -= sums[:-period].copy()
+    return sums / counts * multiple
@@ -0,0 +1,250 @@
+"""
+Order Execution Engine for Binance Futures
+==========================================
+
+Opens a position together with its protective bracket (stop loss and take profit) without idle time:
+1. Entry: MARKET order with newOrderRespType=RESULT, so the response already contains the fill
+2. Fill: average price from the response, or from the user data stream (ORDER_TRADE_UPDATE) if the
+   response was not final yet. The order is only polled if neither arrives in time, and if the poll fails
+   the reference price (or the mark price) is used, the bracket is placed in any case.
+3. Bracket: stop loss and take profit are submitted at once, concurrently or through the batch orders
+   endpoint
+
+Every stage is timed, so the latency of the entry path can be monitored.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import ORDER_SECONDS
+
+
+def order_id(order):
+    """Id of an order response, conditional (algo) orders are identified by their algoId"""
+    if order is None:
+        return None
+    return order.get('orderId', order.get('algoId'))
+
+
+def fill_price(order):
+    """
+    Average fill price of an order response
+
+    Returns:
+        Price or None if nothing is filled yet
+    """
+    executed_qty = float(order.get('executedQty', 0) or 0)
+    if executed_qty <= 0:
+        return None
+    avg_price = float(order.get('avgPrice', 0) or 0)
+    if avg_price > 0:
+        return avg_price
+    return float(order['cumQuote']) / executed_qty
+
+
+class OrderExecutionEngine:
+    """
+    Places entry and bracket orders and reports the latency of every stage
+    """
+
+    def __init__(self, client, use_batch_orders=False, fill_timeout=1.0, clock=time.perf_counter):
+        """
+        Initialize the execution engine
+
+        Args:
+            client: Binance client (or anything with the same futures order methods, e.g. a mock exchange)
+            use_batch_orders: Submit the bracket with one futures_place_batch_order request. Binance routes
+                              STOP_MARKET / TAKE_PROFIT_MARKET orders to the algo order endpoint, which has no
+                              batch variant, so by default both legs are sent concurrently instead.
+            fill_timeout: Seconds to wait for the fill of an entry on the user data stream before polling it
+            clock: Time function in seconds for the latency measurements
+        """
+        self.client = client
+        self.use_batch_orders = use_batch_orders
+        self.fill_timeout = fill_timeout
+        self.clock = clock
+
+        # latency of the last executions, for status reports
+        self.latency_history = deque(maxlen=100)
+
+        self._fills = OrderedDict()  # order id: fill price, from the user data stream
+        self._waiting = {}  # order id: Event of open_position waiting for the fill
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='bracket')
+
+    def open_position(self, symbol, side, quantity, rules, stop_loss_pct, take_profit_pct, reference_price=None):
+        """
+        Open a position with a MARKET order and protect it with a stop loss and a take profit
+
+        Args:
+            symbol: Trading pair (e.g., 'BTCUSDT')
+            side: 'BUY' or 'SELL'
+            quantity: Order quantity, already rounded to the step size
+            rules: SymbolRules of the symbol (for the tick size of the stop prices)
+            stop_loss_pct: Distance of the stop loss from the entry price (e.g. 0.02)
+            take_profit_pct: Distance of the take profit from the entry price
+            reference_price: Price used if no fill price can be determined (e.g. the last ticker price), the mark
+                             price is fetched if it is None
+
+        Returns:
+            Dict with the orders, entry / stop prices, errors of the bracket legs and latency_ms per stage
+            (entry, fill, bracket, total)
+        """
+        started = self.clock()
+        entry = self.client.futures_create_order(
+            symbol=symbol,
+            side=side,
+            type='MARKET',
+            quantity=quantity,
+            newOrderRespType='RESULT'
+        )
+        entered = self.clock()
+
+        entry_price, fill_source = self._entry_fill(symbol, entry, reference_price)
+        filled = self.clock()
+
+        if side == 'BUY':
+            stop_loss = rules.round_price(entry_price * (1 - stop_loss_pct))
+            take_profit = rules.round_price(entry_price * (1 + take_profit_pct))
+        else:
+            stop_loss = rules.round_price(entry_price * (1 + stop_loss_pct))
+            take_profit = rules.round_price(entry_price * (1 - take_profit_pct))
+
+        close_side = 'SELL' if side == 'BUY' else 'BUY'
+        legs = [
+            {'symbol': symbol, 'side': close_side, 'type': 'STOP_MARKET', 'stopPrice': stop_loss,
+             'closePosition': 'true'},
+            {'symbol': symbol, 'side': close_side, 'type': 'TAKE_PROFIT_MARKET', 'stopPrice': take_profit,
+             'closePosition': 'true'},
+        ]
+        (sl_order, tp_order), errors = self._submit_bracket(legs)
+        done = self.clock()
+
+        latency_ms = {
+            'entry': (entered - started) * 1000,
+            'fill': (filled - entered) * 1000,
+            'bracket': (done - filled) * 1000,
+            'total': (done - started) * 1000,
+        }
+        self.latency_history.append(latency_ms)
+        for stage, latency in latency_ms.items():
+            ORDER_SECONDS.observe(latency / 1000, stage=stage)
+
+        return {
+            'symbol': symbol,
+            'side': side,
+            'quantity': quantity,
+            'entry_price': entry_price,
+            'fill_source': fill_source,
+            'stop_loss': stop_loss,
+            'take_profit': take_profit,
+            'order_id': order_id(entry),
+            'sl_order_id': order_id(sl_order),
+            'tp_order_id': order_id(tp_order),
+            'errors': errors,
+            'latency_ms': latency_ms,
+        }
+
+    def _entry_fill(self, symbol, entry, reference_price):
+        """
+        Fill price of the entry and where it came from ('response', 'stream', 'poll', 'reference' or 'mark').
+        The entry is filled already, so a failed poll falls back to a price instead of raising: the bracket
+        has to be submitted in any case.
+        """
+        price = fill_price(entry)
+        if price is not None:
+            return price, 'response'
+
+        entry_id = order_id(entry)
+        with self._lock:
+            if entry_id in self._fills:
+                return self._fills.pop(entry_id), 'stream'
+            event = self._waiting.setdefault(entry_id, threading.Event())
+
+        try:
+            if event.wait(self.fill_timeout):
+                with self._lock:
+                    return self._fills.pop(entry_id), 'stream'
+
+            try:
+                price = fill_price(self.client.futures_get_order(symbol=symbol, orderId=entry_id))
+            except Exception:
+                price = None
+            if price is not None:
+                return price, 'poll'
+        finally:
+            with self._lock:
+                self._waiting.pop(entry_id, None)
+
+        if reference_price is not None:
+            return reference_price, 'reference'
+        return float(self.client.futures_mark_price(symbol=symbol)['markPrice']), 'mark'
+
+    def _submit_bracket(self, legs):
+        """
+        Submit the bracket legs at once
+
+        Returns:
+            (list of order responses with None for failed legs, list of error messages)
+        """
+        orders, errors = [], []
+
+        if self.use_batch_orders:
+            batch = [{key: str(value) for key, value in leg.items()} for leg in legs]
+            try:
+                responses = self.client.futures_place_batch_order(batchOrders=batch)
+            except Exception as e:
+                return [None] * len(legs), [f"{leg['type']}: {e}" for leg in legs]
+
+            for leg, response in zip(legs, responses):
+                if 'code' in response and order_id(response) is None:
+                    orders.append(None)
+                    errors.append(f"{leg['type']}: {response.get('msg', response['code'])}")
+                else:
+                    orders.append(response)
+            return orders, errors
+
+        futures = [self._executor.submit(self.client.futures_create_order, **leg) for leg in legs]
+        for leg, future in zip(legs, futures):
+            try:
+                orders.append(future.result())
+            except Exception as e:
+                orders.append(None)
+                errors.append(f"{leg['type']}: {e}")
+        return orders, errors
+
+    def on_order_update(self, event):
+        """
+        Handle an ORDER_TRADE_UPDATE event of the user data stream, wakes up an entry waiting for its fill
+
+        Args:
+            event: Event as received from the user data stream ({'e': 'ORDER_TRADE_UPDATE', 'o': {...}})
+        """
+        order = event.get('o', {})
+        if event.get('e') != 'ORDER_TRADE_UPDATE' or order.get('X') != 'FILLED':
+            return
+
+        price = float(order.get('ap', 0))
+        if price <= 0:
+            return
+
+        with self._lock:
+            self._fills[order['i']] = price
+            while len(self._fills) > 1000:
+                self._fills.popitem(last=False)
+            waiting = self._waiting.get(order['i'])
+        if waiting is not None:
+            waiting.set()
+
+    def average_latency_ms(self):
+        """Average latency per stage of the recent executions, empty if nothing was executed yet"""
+        if not self.latency_history:
+            return {}
+        return {stage: sum(latency[stage] for latency in self.latency_history) / len(self.latency_history)
+                for stage in self.latency_history[0]}
+
+    def shutdown(self):
+        """Stop the threads submitting the bracket legs"""
+        self._executor.shutdown(wait=True)
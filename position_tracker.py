@@ -0,0 +1,303 @@
+"""
+Position Tracker driven by the Binance Futures User Data Stream
+===============================================================
+
+Keeps positions, realized / unrealized PnL and the status of all orders (e.g. the SL / TP bracket) in
+memory, updated in real time by the ACCOUNT_UPDATE and ORDER_TRADE_UPDATE events of the user data
+stream. Polling the REST API remains only as reconciliation: after every (re)connect and on a slow
+timer, to repair anything missed while the stream was down.
+
+The transport is pluggable like in kline_stream: any callable transport(url) returning a connection
+context manager with recv(timeout) can drive the stream, e.g. a local fake server in tests.
+"""
+
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+FUTURES_USER_STREAM_URL = 'wss://fstream.binance.com/ws/'
+TESTNET_USER_STREAM_URL = 'wss://stream.binancefuture.com/ws/'
+
+# listen keys expire after 60 minutes without keepalive
+LISTEN_KEY_KEEPALIVE = 30 * 60
+
+
+class PositionTracker:
+    """
+    Thread-safe state of positions and orders, updated from user data stream events and REST snapshots
+    """
+
+    def __init__(self, on_position_closed=None, on_order_update=None):
+        """
+        Initialize the tracker
+
+        Args:
+            on_position_closed: Callback on_position_closed(symbol, position) when a position went flat,
+                                position['realized_pnl'] is the PnL of the fills reported while it was open
+                                (the closing fill may arrive afterwards, realized_pnl of the tracker has all)
+            on_order_update: Callback on_order_update(event) for every ORDER_TRADE_UPDATE event
+                             (e.g. OrderExecutionEngine.on_order_update)
+        """
+        self.on_position_closed = on_position_closed
+        self.on_order_update = on_order_update
+
+        self.positions = {}  # symbol: {'amount', 'entry_price', 'unrealized_pnl', 'realized_pnl', 'updated'}
+        self.orders = {}  # order id: {'symbol', 'side', 'type', 'status', 'stop_price', 'avg_price', ...}
+        self.balances = {}  # asset: wallet balance
+        self.realized_pnl = 0.0  # since start, after fees
+
+        self._lock = threading.RLock()
+
+    def handle_event(self, event):
+        """
+        Apply one user data stream event
+
+        Args:
+            event: Decoded event ({'e': 'ACCOUNT_UPDATE' | 'ORDER_TRADE_UPDATE' | ..., ...})
+        """
+        event_type = event.get('e')
+        if event_type == 'ACCOUNT_UPDATE':
+            self._account_update(event)
+        elif event_type == 'ORDER_TRADE_UPDATE':
+            self._order_update(event)
+            if self.on_order_update is not None:
+                self.on_order_update(event)
+
+    def _account_update(self, event):
+        update = event['a']
+        event_time = event.get('T', event.get('E', 0))
+        closed = []
+
+        with self._lock:
+            for balance in update.get('B', []):
+                self.balances[balance['a']] = float(balance['wb'])
+
+            for position in update.get('P', []):
+                closed_position = self._set_position(position['s'], float(position['pa']), float(position['ep']),
+                                                     float(position['up']), event_time)
+                if closed_position is not None:
+                    closed.append((position['s'], closed_position))
+
+        self._notify_closed(closed)
+
+    def _order_update(self, event):
+        order = event['o']
+        realized = float(order.get('rp', 0))
+        if order.get('N') == 'USDT':
+            realized -= float(order.get('n', 0))
+
+        with self._lock:
+            self.orders[order['i']] = {
+                'symbol': order['s'],
+                'side': order['S'],
+                'type': order.get('ot', order['o']),  # a triggered STOP_MARKET executes as MARKET
+                'status': order['X'],
+                'stop_price': float(order.get('sp', 0)),
+                'avg_price': float(order.get('ap', 0)),
+                'filled_qty': float(order.get('z', 0)),
+                'realized_pnl': float(order.get('rp', 0)),
+                'updated': order.get('T', event.get('E', 0)),
+            }
+
+            self.realized_pnl += realized
+            position = self.positions.get(order['s'])
+            if position is not None:
+                position['realized_pnl'] += realized
+
+    def _set_position(self, symbol, amount, entry_price, unrealized_pnl, updated):
+        """Apply a position update, returns the closed position if it went flat (call with the lock held)"""
+        position = self.positions.get(symbol)
+        if position is not None and updated < position['updated']:
+            return None  # older than the state we have
+
+        if amount == 0:
+            if position is None:
+                return None
+            del self.positions[symbol]
+            position['unrealized_pnl'] = 0.0
+            position['updated'] = updated
+            return position
+
+        if position is None:
+            position = self.positions[symbol] = {'realized_pnl': 0.0}
+        position.update(amount=amount, entry_price=entry_price, unrealized_pnl=unrealized_pnl, updated=updated)
+        return None
+
+    def _notify_closed(self, closed):
+        for symbol, position in closed:
+            if self.on_position_closed is not None:
+                self.on_position_closed(symbol, position)
+
+    def reconcile(self, position_information, snapshot_time):
+        """
+        Repair the state from a REST snapshot of all positions (client.futures_position_information())
+
+        Args:
+            position_information: Positions as returned by the REST API
+            snapshot_time: Time in ms the snapshot was requested, positions updated later by the stream are kept
+
+        Returns:
+            Symbols whose state was changed by the snapshot
+        """
+        changed, closed = [], []
+        with self._lock:
+            reported = set()
+            for info in position_information:
+                symbol = info['symbol']
+                amount = float(info['positionAmt'])
+                if amount == 0:
+                    continue
+                reported.add(symbol)
+
+                position = self.positions.get(symbol)
+                if position is None or position['amount'] != amount:
+                    changed.append(symbol)
+                self._set_position(symbol, amount, float(info['entryPrice']), float(info['unRealizedProfit']),
+                                   info.get('updateTime', 0))
+
+            for symbol in set(self.positions) - reported:
+                position = self._set_position(symbol, 0.0, 0.0, 0.0, snapshot_time)
+                if position is not None:
+                    changed.append(symbol)
+                    closed.append((symbol, position))
+
+        self._notify_closed(closed)
+        return changed
+
+    def update_mark_price(self, symbol, price):
+        """
+        Revalue the open position of a symbol, the stream only reports unrealized PnL on account changes
+
+        Args:
+            symbol: Trading pair (e.g., 'BTCUSDT')
+            price: Current mark / last price
+        """
+        with self._lock:
+            position = self.positions.get(symbol)
+            if position is not None:
+                position['unrealized_pnl'] = position['amount'] * (price - position['entry_price'])
+
+    def position(self, symbol):
+        """Copy of the open position of a symbol, None if flat"""
+        with self._lock:
+            position = self.positions.get(symbol)
+            return dict(position) if position is not None else None
+
+    def order(self, order_id):
+        """Copy of the last known state of an order, None if unknown"""
+        with self._lock:
+            order = self.orders.get(order_id)
+            return dict(order) if order is not None else None
+
+    def unrealized_pnl(self):
+        """Unrealized PnL of all open positions"""
+        with self._lock:
+            return sum(position['unrealized_pnl'] for position in self.positions.values())
+
+
+class UserDataStream:
+    """
+    Streams the user data of a Binance Futures account into a PositionTracker
+    """
+
+    def __init__(self, client, tracker, testnet=False, reconcile_interval=300, transport=None, base_url=None,
+                 reconnect_delay=1.0, clock=time.monotonic):
+        """
+        Initialize the user data stream
+
+        Args:
+            client: Binance client with API key (listen key and position information)
+            tracker: PositionTracker the events are applied to
+            testnet: Use the testnet stream
+            reconcile_interval: Seconds between REST reconciliations while connected
+            transport: Callable transport(url) returning a connection context manager with recv(timeout)
+                       (default: websockets.sync.client.connect)
+            base_url: URL the listen key is appended to (default: Binance Futures)
+            reconnect_delay: Seconds to wait before reconnecting, doubled on every failed attempt up to a minute
+            clock: Monotonic time function in seconds
+        """
+        self.client = client
+        self.tracker = tracker
+        self.reconcile_interval = reconcile_interval
+        self.transport = transport
+        self.base_url = base_url or (TESTNET_USER_STREAM_URL if testnet else FUTURES_USER_STREAM_URL)
+        self.reconnect_delay = reconnect_delay
+        self.clock = clock
+
+        self.connected = threading.Event()
+        self.last_reconcile = None
+        self._running = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Connect and stream in a background thread"""
+        self._running.set()
+        self._thread = threading.Thread(target=self.run, name='user-data-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Stop streaming and wait for the thread to finish"""
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def reconcile(self):
+        """Apply a REST snapshot of all positions to the tracker"""
+        self.last_reconcile = self.clock()
+        requested = int(time.time() * 1000)
+        changed = self.tracker.reconcile(self.client.futures_position_information(), requested)
+        if changed:
+            logger.info("🔄 Reconciled positions changed by REST snapshot: %s", ', '.join(changed))
+        return changed
+
+    def run(self):
+        """Receive events until stopped, reconnecting with a new listen key on errors"""
+        transport = self.transport
+        if transport is None:
+            from websockets.sync.client import connect
+            transport = connect
+
+        delay = self.reconnect_delay
+        while self._running.is_set():
+            try:
+                listen_key = self.client.futures_stream_get_listen_key()
+                with transport(self.base_url + listen_key) as connection:
+                    self.connected.set()
+                    # events missed while disconnected are repaired by a snapshot
+                    self.reconcile()
+                    delay = self.reconnect_delay
+                    self._receive(connection, listen_key)
+
+            except Exception as e:
+                if self._running.is_set():
+                    logger.warning("⚠️ User data stream disconnected: %s, reconnecting in %.0fs", e, delay)
+                    time.sleep(delay)
+                    delay = min(delay * 2, 60)
+            finally:
+                self.connected.clear()
+
+    def _receive(self, connection, listen_key):
+        keepalive = self.clock()
+        while self._running.is_set():
+            try:
+                message = connection.recv(timeout=1)
+            except TimeoutError:
+                message = None
+
+            if message is not None:
+                event = json.loads(message)
+                if event.get('e') == 'listenKeyExpired':
+                    return
+                self.tracker.handle_event(event)
+
+            now = self.clock()
+            if now - keepalive >= LISTEN_KEY_KEEPALIVE:
+                self.client.futures_stream_keepalive(listenKey=listen_key)
+                keepalive = now
+            if now - self.last_reconcile >= self.reconcile_interval:
+                self.reconcile()
@@ -0,0 +1,212 @@
+"""
+Concurrent Multi-Symbol Scan Pipeline
+=====================================
+
+Scans many (symbol, interval) pairs at once in three stages:
+1. Fetching: a thread pool does the REST calls, throttled by a shared RateLimiter
+2. Analysis: a process pool runs the CPU heavy wave search
+3. Sink: the results are handed to a single callback in the order of the pairs
+
+A scan therefore takes about as long as its slowest pair instead of the sum of all pairs.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from elliott_wave_trading_system import ElliottWaveTradingSystem
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket for the request weight of the Binance API
+    """
+
+    def __init__(self, weight_per_minute=1200, burst=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize the rate limiter
+
+        Args:
+            weight_per_minute: Request weight which may be used per minute (Binance Futures allows 2400)
+            burst: Maximum weight which may be used at once (default: weight of 10 seconds)
+            clock: Monotonic time function in seconds
+            sleep: Sleep function in seconds
+        """
+        self.rate = weight_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(self.rate * 10, 1)
+        self.clock = clock
+        self.sleep = sleep
+
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, weight=1):
+        """
+        Block until the given request weight is available and use it
+
+        Args:
+            weight: Request weight of the call
+
+        Returns:
+            Seconds waited
+        """
+        weight = min(weight, self.capacity)
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    return waited
+
+                delay = (weight - self._tokens) / self.rate
+
+            self.sleep(delay)
+            waited += delay
+
+
+# Trading system of a worker process of the analysis stage, created on first use
+_worker_system = None
+
+
+def analyze_klines(df, symbol, interval, time_budget_ms=None):
+    """
+    Analysis stage of the pipeline, runs in a worker process
+
+    Args:
+        df: Klines fetched for the pair
+        symbol: Trading pair (e.g., 'BTCUSDT')
+        interval: Timeframe of df
+        time_budget_ms: Time for the wave search of the pair, None: no budget (bind it with functools.partial)
+
+    Returns:
+        Analysis results of ElliottWaveTradingSystem.analyze_dataframe
+    """
+    global _worker_system
+    if _worker_system is None:
+        _worker_system = ElliottWaveTradingSystem()
+    return _worker_system.analyze_dataframe(df, symbol, interval, time_budget_ms)
+
+
+class ScanPipeline:
+    """
+    Fetches and analyzes (symbol, interval) pairs concurrently and hands the results to a sink in order
+    """
+
+    def __init__(self, fetch, analyze=analyze_klines, fetch_workers=8, analysis_workers=None, worker_init=None):
+        """
+        Initialize the scan pipeline
+
+        Args:
+            fetch: Callable fetch(symbol, interval) returning the data to analyze, None to skip the pair.
+                   Runs in the fetch threads.
+            analyze: Callable analyze(data, symbol, interval) returning the analysis results. Runs in the
+                     worker processes, so it has to be a picklable module-level function.
+            fetch_workers: Number of fetch threads
+            analysis_workers: Number of analysis processes (default: number of CPUs),
+                              0 to analyze in the fetch threads
+            worker_init: Callable without arguments run once in every analysis process, e.g. to send its log
+                         records to the parent (see log_setup.LogPipeline.worker_initializer)
+        """
+        self.fetch = fetch
+        self.analyze = analyze
+        self.fetch_workers = fetch_workers
+        self.analysis_workers = (os.cpu_count() or 1) if analysis_workers is None else analysis_workers
+        self.worker_init = worker_init
+
+        self._fetch_pool = None
+        self._analysis_pool = None
+
+    def _pools(self):
+        # The pools are kept between scans, starting worker processes is expensive
+        if self._fetch_pool is None:
+            self._fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_workers,
+                                                  thread_name_prefix='scan-fetch')
+        if self._analysis_pool is None and self.analysis_workers > 0:
+            self._analysis_pool = ProcessPoolExecutor(max_workers=self.analysis_workers,
+                                                     initializer=self.worker_init)
+        return self._fetch_pool, self._analysis_pool
+
+    def _fetch_and_analyze(self, symbol, interval):
+        data = self.fetch(symbol, interval)
+        if data is None:
+            return None
+        return self.analyze(data, symbol, interval)
+
+    def run(self, pairs, sink):
+        """
+        Scan all pairs
+
+        Args:
+            pairs: Iterable of (symbol, interval)
+            sink: Callable sink(symbol, interval, result, error), called from the calling thread in the order of
+                  pairs. result is None if the pair was skipped or failed, error is the exception of a failed pair.
+
+        Returns:
+            Seconds the scan took
+        """
+        started = time.perf_counter()
+        pairs = list(pairs)
+        fetch_pool, analysis_pool = self._pools()
+
+        # future: (pair no., stage)
+        stages = {}
+        for pair_no, (symbol, interval) in enumerate(pairs):
+            if analysis_pool is None:
+                stages[fetch_pool.submit(self._fetch_and_analyze, symbol, interval)] = (pair_no, 'analysis')
+            else:
+                stages[fetch_pool.submit(self.fetch, symbol, interval)] = (pair_no, 'fetch')
+
+        results = {}  # pair no.: (result, error), waiting for the sink
+        next_pair = 0
+        pending = set(stages)
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                pair_no, stage = stages.pop(future)
+                symbol, interval = pairs[pair_no]
+
+                error = future.exception()
+                if isinstance(error, BrokenProcessPool):
+                    # a worker died, start new ones for the next scan
+                    self._analysis_pool = None
+                if error is not None:
+                    results[pair_no] = (None, error)
+                elif stage == 'fetch' and future.result() is not None:
+                    try:
+                        analysis = analysis_pool.submit(self.analyze, future.result(), symbol, interval)
+                    except BrokenProcessPool as e:
+                        self._analysis_pool = None
+                        results[pair_no] = (None, e)
+                        continue
+                    stages[analysis] = (pair_no, 'analysis')
+                    pending.add(analysis)
+                else:
+                    results[pair_no] = (future.result() if stage == 'analysis' else None, None)
+
+            # Hand over the finished results in order
+            while next_pair in results:
+                result, error = results.pop(next_pair)
+                symbol, interval = pairs[next_pair]
+                sink(symbol, interval, result, error)
+                next_pair += 1
+
+        return time.perf_counter() - started
+
+    def shutdown(self):
+        """Stop the fetch threads and analysis processes"""
+        if self._fetch_pool is not None:
+            self._fetch_pool.shutdown(wait=True)
+            self._fetch_pool = None
+        if self._analysis_pool is not None:
+            self._analysis_pool.shutdown(wait=True, cancel_futures=True)
+            self._analysis_pool = None
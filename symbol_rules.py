@@ -0,0 +1,151 @@
+"""
+Symbol Rules Cache for Binance Futures
+======================================
+
+Keeps the trading rules of all futures contracts (LOT_SIZE, PRICE_FILTER, MIN_NOTIONAL, ...) from
+the exchange info, indexed by symbol and refreshed on a TTL. The exchange info response covers every
+contract and is several hundred KB, so it is loaded once instead of on every trade.
+"""
+
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def decimal_places(value):
+    """Number of decimals of a filter value given as string, e.g. '0.00100000' -> 3"""
+    value = str(value)
+    if '.' not in value:
+        return 0
+    return len(value.rstrip('0').split('.')[1])
+
+
+class SymbolRules:
+    """
+    Trading rules of one futures contract, precomputed from its exchange info entry
+    """
+
+    def __init__(self, symbol_info):
+        """
+        Initialize the rules
+
+        Args:
+            symbol_info: Entry of exchange_info['symbols'] (see client.futures_exchange_info)
+        """
+        self.symbol = symbol_info['symbol']
+        self.status = symbol_info.get('status')
+        self.contract_type = symbol_info.get('contractType')
+        self.base_asset = symbol_info.get('baseAsset')
+        self.quote_asset = symbol_info.get('quoteAsset')
+
+        filters = {f['filterType']: f for f in symbol_info.get('filters', [])}
+        lot_size = filters.get('LOT_SIZE', {})
+        market_lot_size = filters.get('MARKET_LOT_SIZE', lot_size)
+        price_filter = filters.get('PRICE_FILTER', {})
+        min_notional = filters.get('MIN_NOTIONAL', {})
+
+        self.step_size = float(lot_size.get('stepSize', 0))
+        self.min_qty = float(lot_size.get('minQty', 0))
+        self.max_qty = float(lot_size.get('maxQty', 0))
+        self.market_max_qty = float(market_lot_size.get('maxQty', 0))
+        self.tick_size = float(price_filter.get('tickSize', 0))
+        self.min_price = float(price_filter.get('minPrice', 0))
+        self.max_price = float(price_filter.get('maxPrice', 0))
+        self.min_notional = float(min_notional.get('notional', min_notional.get('minNotional', 0)))
+
+        # decimals accepted by the exchange for quantities / prices of orders
+        self.quantity_precision = decimal_places(lot_size['stepSize']) if 'stepSize' in lot_size \
+            else symbol_info.get('quantityPrecision', 0)
+        self.price_precision = decimal_places(price_filter['tickSize']) if 'tickSize' in price_filter \
+            else symbol_info.get('pricePrecision', 2)
+
+    def round_quantity(self, quantity):
+        """Quantity rounded down to a multiple of the step size"""
+        if self.step_size > 0:
+            quantity = math.floor(quantity / self.step_size + 1e-9) * self.step_size
+        return round(quantity, self.quantity_precision)
+
+    def round_price(self, price):
+        """Price rounded to the nearest multiple of the tick size"""
+        if self.tick_size > 0:
+            price = round(price / self.tick_size) * self.tick_size
+        return round(price, self.price_precision)
+
+    def is_tradable_usdt_perpetual(self):
+        """True for USDT margined perpetual contracts which are currently trading"""
+        return self.status == 'TRADING' and self.contract_type == 'PERPETUAL' and self.quote_asset == 'USDT'
+
+
+class SymbolRulesCache:
+    """
+    Thread-safe cache of the SymbolRules of all futures contracts, refreshed on a TTL
+    """
+
+    def __init__(self, exchange_info, ttl=3600, clock=time.monotonic):
+        """
+        Initialize the cache, the exchange info is loaded on first use or by refresh()
+
+        Args:
+            exchange_info: Callable returning the exchange info (e.g. client.futures_exchange_info)
+            ttl: Seconds after which the rules are loaded again
+            clock: Monotonic time function in seconds
+        """
+        self.exchange_info = exchange_info
+        self.ttl = ttl
+        self.clock = clock
+
+        self._rules = {}
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Load the exchange info and index it by symbol
+
+        Returns:
+            Number of symbols loaded
+        """
+        rules = {info['symbol']: SymbolRules(info) for info in self.exchange_info()['symbols']}
+        with self._lock:
+            self._rules = rules
+            self._loaded = self.clock()
+        return len(rules)
+
+    def is_stale(self):
+        """True if nothing is loaded yet or the rules are older than the TTL"""
+        return self._loaded is None or self.clock() - self._loaded >= self.ttl
+
+    def _ensure_loaded(self):
+        if not self.is_stale():
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            if self._loaded is None:
+                raise
+            # keep trading on the last known rules, they rarely change
+            logger.warning("⚠️ Could not refresh symbol rules, using rules of %.0fs ago: %s",
+                           self.clock() - self._loaded, e)
+            with self._lock:
+                self._loaded = self.clock()
+
+    def get(self, symbol):
+        """
+        Trading rules of a symbol
+
+        Returns:
+            SymbolRules or None if the symbol is unknown
+        """
+        self._ensure_loaded()
+        return self._rules.get(symbol)
+
+    def __contains__(self, symbol):
+        return self.get(symbol) is not None
+
+    def symbols(self):
+        """Names of all USDT margined perpetual contracts which are currently trading"""
+        self._ensure_loaded()
+        return [symbol for symbol, rules in self._rules.items() if rules.is_tradable_usdt_perpetual()]
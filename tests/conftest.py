@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_zigzag_df(n: int = 300, seed: int = 0) -> pd.DataFrame:
+    """
+    Deterministic OHLC data made of noisy 12345-ABC like zigzags
+    """
+    rng = np.random.default_rng(seed)
+    moves = [1.0, -0.5, 1.6, -0.4, 1.0, -0.8, 0.4, -0.7]
+    points = [100.0]
+    while len(points) < n:
+        for move in moves:
+            target = points[-1] + move * rng.uniform(6, 12)
+            points.extend(np.linspace(points[-1], target, int(rng.integers(4, 14)) + 1)[1:])
+    close = np.array(points[:n]) + rng.normal(0, 0.4, n)
+    spread = np.abs(rng.normal(0, 0.4, n))
+    return pd.DataFrame({'Date': np.arange(n), 'Open': close, 'High': close + spread, 'Low': close - spread,
+                         'Close': close})
+
+
+@pytest.fixture
+def zigzag_df():
+    return make_zigzag_df
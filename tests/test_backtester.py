@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from backtester import Backtester, first_exits, performance
+
+
+def test_first_exits():
+    highs = np.array([10.0, 10.5, 11.0, 12.5, 10.2, 10.0, 10.0])
+    lows = np.array([9.0, 9.5, 9.8, 10.5, 8.5, 9.5, 9.5])
+
+    exit_bars, reasons = first_exits(
+        direction=np.array([1, -1, 1, 1, 1]),
+        entry_bars=np.array([0, 0, 0, 1, 5]),
+        stop_losses=np.array([9.0, 12.0, 8.0, 9.9, 5.0]),
+        take_profits=np.array([12.0, 8.0, 20.0, 10.2, 20.0]),
+        highs=highs, lows=lows, max_holding=3)
+
+    assert list(exit_bars) == [3, 3, 3, 2, 6]
+    # both levels inside bar 2 of the fourth trade: the stop loss is assumed
+    assert list(reasons) == ['TAKE_PROFIT', 'STOP_LOSS', 'TIME', 'STOP_LOSS', 'OPEN']
+
+
+def test_performance():
+    result = performance([0.1, -0.05, -0.05, 0.02])
+
+    assert result['trades'] == 4 and result['win_rate'] == 0.5
+    assert result['expectancy'] == pytest.approx(0.005)
+    assert result['profit_factor'] == pytest.approx(1.2)
+    assert result['max_drawdown'] == pytest.approx(0.1)
+    assert performance([])['trades'] == 0
+
+
+def test_backtest_replays_signals(zigzag_df):
+    df = zigzag_df(700, seed=3)
+    backtester = Backtester(lookback=300, min_confidence=0.0, min_risk_reward=0.0, max_holding_bars=100)
+
+    results = backtester.run([('ZIGZAG', '1h')], lambda symbol, interval: df, workers=0)
+
+    assert len(results) == 1 and results[0]['trades'] > 0
+    trades = results[0]['trades_list']
+    for previous, trade in zip(trades, trades[1:]):
+        assert previous['exit_bar'] < trade['entry_bar']
+
+    for trade in trades:
+        path = df.iloc[trade['entry_bar'] + 1:trade['exit_bar'] + 1]
+        adverse, favorable = (path['Low'], path['High']) if trade['type'] == 'BUY' else (-path['High'], -path['Low'])
+        sign = 1 if trade['type'] == 'BUY' else -1
+        if trade['exit_reason'] == 'STOP_LOSS':
+            assert adverse.iloc[-1] <= sign * trade['stop_loss']
+        if trade['exit_reason'] == 'TAKE_PROFIT':
+            assert favorable.iloc[-1] >= sign * trade['take_profit']
+        # no level was hit before the exit bar
+        assert (adverse.iloc[:-1] > sign * trade['stop_loss']).all()
+        assert (favorable.iloc[:-1] < sign * trade['take_profit']).all()
@@ -0,0 +1,31 @@
+from benchmarks.fixtures import synthetic_ohlc
+from benchmarks.run import load_history, param_combinations, previous_results, report, run_benchmarks, save_run
+
+
+class Example:
+    params = [[1, 2], ['a', 'b']]
+    param_names = ['x', 'y']
+
+
+def test_synthetic_series_is_deterministic():
+    df = synthetic_ohlc(5000, seed=3)
+    assert len(df) == 5000
+    assert df.equals(synthetic_ohlc(5000, seed=3))
+    assert (df['High'] >= df['Low']).all()
+
+
+def test_runner_keeps_history(tmp_path):
+    assert param_combinations(Example) == [{'x': 1, 'y': 'a'}, {'x': 1, 'y': 'b'}, {'x': 2, 'y': 'a'},
+                                           {'x': 2, 'y': 'b'}]
+
+    results = run_benchmarks('Kernels', max_bars=1000, min_time=0.001, repeat=1)
+    assert 'kernels.Kernels.time_hi[bars=1000]' in results
+    assert all('bars=1000]' in key and result['min'] > 0 for key, result in results.items())
+
+    path = str(tmp_path / 'machine.jsonl')
+    save_run(path, results)
+    save_run(path, results)
+
+    history = load_history(path)
+    assert len(history) == 2 and history[0]['results'] == results
+    assert '1.00x' in report(results, previous_results(history))
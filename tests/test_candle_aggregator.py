@@ -0,0 +1,110 @@
+import numpy as np
+
+from candle_aggregator import CandleAggregator, aggregate_candles, base_interval_for, bucket_open_times
+from candle_cache import KLINE_DTYPE, CandleCache, interval_to_ms, klines_to_array
+
+MINUTE = 60 * 1000
+DAY = 24 * 60 * MINUTE
+
+
+def base_candles(start, count, interval='15m', seed=0):
+    rng = np.random.default_rng(seed)
+    interval_ms = interval_to_ms(interval)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    candles = np.empty(count, dtype=KLINE_DTYPE)
+    candles['open_time'] = start + np.arange(count) * interval_ms
+    candles['open'] = close - rng.normal(0, 0.5, count)
+    candles['high'] = np.maximum(candles['open'], close) + rng.uniform(0, 1, count)
+    candles['low'] = np.minimum(candles['open'], close) - rng.uniform(0, 1, count)
+    candles['close'] = close
+    candles['volume'] = rng.uniform(1, 10, count)
+    candles['close_time'] = candles['open_time'] + interval_ms - 1
+    return candles
+
+
+def rolled_up_by_loop(candles, interval):
+    interval_ms = interval_to_ms(interval)
+    result = []
+    for bucket in sorted(set(candles['open_time'] // interval_ms * interval_ms)):
+        part = candles[candles['open_time'] // interval_ms * interval_ms == bucket]
+        result.append((bucket, part['open'][0], part['high'].max(), part['low'].min(), part['close'][-1],
+                       part['volume'].sum(), bucket + interval_ms - 1))
+    return np.array(result, dtype=KLINE_DTYPE)
+
+
+def test_aggregate_candles_matches_buckets():
+    # starts at 00:30, ends within the bucket of the last hour
+    candles = base_candles(1000 * DAY + 30 * MINUTE, 102)
+
+    hourly = aggregate_candles(candles, '1h')
+    expected = rolled_up_by_loop(candles, '1h')[1:]  # the first hour misses its first two candles
+    assert hourly['open_time'][0] == 1000 * DAY + 60 * MINUTE and len(hourly) == 25
+    for field in KLINE_DTYPE.names:
+        assert np.allclose(hourly[field], expected[field])
+
+    assert bucket_open_times([1000 * DAY + 5 * 60 * MINUTE], '4h')[0] == 1000 * DAY + 4 * 60 * MINUTE
+    # 1970-01-05 was a Monday
+    assert bucket_open_times([10 * DAY], '1w')[0] == 4 * DAY
+
+
+def test_base_interval_for():
+    assert base_interval_for(['15m', '30m', '1h', '4h']) == '15m'
+    assert base_interval_for(['5m', '15m', '30m', '1h', '2h', '4h']) == '5m'
+    assert base_interval_for(['3m', '5m', '1h']) == '1m'
+
+
+def test_aggregator_fetches_base_once_and_updates_incrementally():
+    history = base_candles(2000 * DAY, 3000)
+    now = {'count': 2000, 'time': 0.0}
+    requests = list()
+
+    def fetch(symbol, interval, limit):
+        requests.append((symbol, interval, limit))
+        return history[:now['count']][-limit:]
+
+    aggregator = CandleAggregator(['15m', '1h', '4h', '1M'], fetch, lookback=100, clock=lambda: now['time'])
+    assert aggregator.base_interval == '15m' and aggregator.intervals == ['15m', '1h', '4h']
+    assert not aggregator.can_derive('1M')
+
+    for interval in ['15m', '1h', '4h']:
+        aggregator.get_klines('BTCUSDT', interval, 100)
+    assert requests == [('BTCUSDT', '15m', 101 * 16)]
+
+    # new candles, the last one still open: only the buckets reached by them are rolled up again
+    now['count'], now['time'] = 2023, 10.0
+    history['close'][2022] += 1.5
+    four_hourly = aggregator.get_klines('BTCUSDT', '4h', 100)
+    assert len(requests) == 2
+
+    expected = aggregate_candles(history[:2023], '4h')[-100:]
+    assert (four_hourly == expected).all()
+    assert four_hourly['close'][-1] == history['close'][2022]
+
+    assert aggregator.closed_intervals(2001 * DAY - 1) == ['15m', '1h', '4h']
+    assert aggregator.closed_intervals(2000 * DAY + 60 * MINUTE - 1) == ['15m', '1h']
+    assert aggregator.closed_intervals(2000 * DAY + 15 * MINUTE - 1) == ['15m']
+
+
+def test_aggregator_serves_full_lookback_from_a_short_cached_history(tmp_path):
+    history = base_candles(2000 * DAY, 3000)
+    now_ms = int(history['close_time'][-1]) + 1
+
+    def exchange(symbol, interval, limit, start_time):
+        candles = history if interval == '15m' else aggregate_candles(history, interval)
+        if start_time is not None:
+            candles = candles[candles['open_time'] >= start_time][:limit]
+        return candles[-limit:].tolist()
+
+    # a cache kept from an earlier run with a shorter base series
+    cache = CandleCache(str(tmp_path))
+    cache.get_klines('BTCUSDT', '15m', 500, exchange, now_ms=now_ms)
+
+    aggregator = CandleAggregator(['15m', '1h', '4h'], lambda symbol, interval, limit: cache.get_klines(
+        symbol, interval, limit, exchange, now_ms=now_ms), lookback=100)
+    assert (aggregator.get_klines('BTCUSDT', '4h', 100) == aggregate_candles(history, '4h')[-100:]).all()
+
+    # base candles which stay short, the interval is fetched itself
+    aggregator = CandleAggregator(['15m', '1h', '4h'], lambda symbol, interval, limit: history[-500:], lookback=100,
+                                  fetch_direct=lambda symbol, interval, limit: klines_to_array(
+                                      exchange(symbol, interval, limit, None)))
+    assert (aggregator.get_klines('BTCUSDT', '4h', 100) == aggregate_candles(history, '4h')[-100:]).all()
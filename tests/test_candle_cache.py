@@ -0,0 +1,111 @@
+import pytest
+
+from candle_cache import CandleCache, interval_to_ms
+
+HOUR = interval_to_ms('1h')
+
+
+class FakeExchange:
+    """Serves hourly klines up to now_ms like client.futures_klines, the last one may still be open"""
+    def __init__(self, now_ms):
+        self.now_ms = now_ms
+        self.requests = list()
+
+    def kline(self, open_time):
+        price = 100.0 + (open_time // HOUR) % 17
+        return [open_time, str(price), str(price + 1), str(price - 1), str(price + 0.5), '10.0', open_time + HOUR - 1]
+
+    def fetch(self, symbol, interval, limit, start_time):
+        self.requests.append((limit, start_time))
+        last_open = self.now_ms // HOUR * HOUR
+        if start_time is None:
+            start_time = last_open - (limit - 1) * HOUR
+        first_open = -(-start_time // HOUR) * HOUR
+        return [self.kline(t) for t in range(first_open, min(last_open, first_open + (limit - 1) * HOUR) + 1, HOUR)]
+
+
+def test_get_klines_fetches_only_new_candles(tmp_path):
+    exchange = FakeExchange(now_ms=1000 * HOUR + HOUR // 2)
+    cache = CandleCache(str(tmp_path))
+
+    first = cache.get_klines('BTCUSDT', '1h', 500, exchange.fetch, now_ms=exchange.now_ms)
+    assert len(first) == 500
+    assert first['open_time'][-1] == 1000 * HOUR  # still open, not stored
+    assert len(cache.load('BTCUSDT', '1h')) == 499
+
+    exchange.now_ms += 3 * HOUR
+    second = cache.get_klines('BTCUSDT', '1h', 500, exchange.fetch, now_ms=exchange.now_ms)
+
+    limit, start_time = exchange.requests[-1]
+    assert start_time == 1000 * HOUR and limit == 5
+    assert list(second['open_time']) == list(range(504 * HOUR, 1004 * HOUR, HOUR))
+    assert len(cache.load('BTCUSDT', '1h')) == 502
+
+    expected = [exchange.kline(t) for t in second['open_time'].tolist()]
+    assert [[int(c['open_time']), str(c['open']), str(c['high']), str(c['low']), str(c['close']),
+             str(c['volume']), int(c['close_time'])] for c in second] == expected
+
+
+def test_get_klines_refetches_stale_cache(tmp_path):
+    exchange = FakeExchange(now_ms=1000 * HOUR + 1)
+    cache = CandleCache(str(tmp_path))
+    cache.get_klines('ETHUSDT', '1h', 100, exchange.fetch, now_ms=exchange.now_ms)
+
+    exchange.now_ms += 5000 * HOUR
+    candles = cache.get_klines('ETHUSDT', '1h', 100, exchange.fetch, now_ms=exchange.now_ms)
+
+    assert exchange.requests[-1] == (100, None)
+    assert list(candles['open_time']) == list(range(5901 * HOUR, 6001 * HOUR, HOUR))
+    assert len(cache.load('ETHUSDT', '1h')) == 99
+
+
+def test_backfill_pages_through_history(tmp_path):
+    exchange = FakeExchange(now_ms=4000 * HOUR + HOUR // 2)
+    cache = CandleCache(str(tmp_path))
+    cache.get_klines('BTCUSDT', '1h', 100, exchange.fetch, now_ms=exchange.now_ms)
+
+    # stored candles start too late, the history is fetched from the start on
+    count = cache.backfill('BTCUSDT', '1h', 1000 * HOUR, exchange.fetch, now_ms=exchange.now_ms)
+
+    candles = cache.load('BTCUSDT', '1h')
+    assert count == 3000 and list(candles['open_time']) == list(range(1000 * HOUR, 4000 * HOUR, HOUR))
+    assert [start_time for _, start_time in exchange.requests[1:]] == [1000 * HOUR, 2500 * HOUR, 4000 * HOUR]
+
+    # nothing new closed
+    assert cache.backfill('BTCUSDT', '1h', 1000 * HOUR, exchange.fetch, now_ms=exchange.now_ms) == 3000
+    assert len(exchange.requests) == 5
+
+
+def test_get_klines_pages_limits_above_one_request(tmp_path):
+    exchange = FakeExchange(now_ms=5000 * HOUR + HOUR // 2)
+    cache = CandleCache(str(tmp_path))
+
+    candles = cache.get_klines('BTCUSDT', '1h', 2000, exchange.fetch, now_ms=exchange.now_ms)
+
+    assert list(candles['open_time']) == list(range(3001 * HOUR, 5001 * HOUR, HOUR))
+    assert [start_time for _, start_time in exchange.requests] == [3001 * HOUR, 4501 * HOUR]
+
+
+def test_get_klines_refetches_if_fewer_candles_are_stored_than_the_limit(tmp_path):
+    exchange = FakeExchange(now_ms=5000 * HOUR + HOUR // 2)
+    cache = CandleCache(str(tmp_path))
+    cache.get_klines('BTCUSDT', '1h', 500, exchange.fetch, now_ms=exchange.now_ms)
+
+    exchange.now_ms += HOUR
+    candles = cache.get_klines('BTCUSDT', '1h', 2000, exchange.fetch, now_ms=exchange.now_ms)
+
+    assert list(candles['open_time']) == list(range(3002 * HOUR, 5002 * HOUR, HOUR))
+    assert len(cache.load('BTCUSDT', '1h')) == 1999
+
+    # enough stored now, only the delta is fetched
+    exchange.now_ms += HOUR
+    cache.get_klines('BTCUSDT', '1h', 2000, exchange.fetch, now_ms=exchange.now_ms)
+    assert exchange.requests[-1][1] == 5001 * HOUR
+
+
+def test_months_are_not_cached(tmp_path):
+    cache = CandleCache(str(tmp_path))
+    with pytest.raises(ValueError):
+        cache.path('BTCUSDT', '1M')
+    with pytest.raises(ValueError):
+        interval_to_ms('1M')
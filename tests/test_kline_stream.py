@@ -0,0 +1,83 @@
+import json
+import threading
+from functools import partial
+
+import numpy as np
+from websockets.sync.client import connect
+from websockets.sync.server import serve
+
+from candle_cache import KLINE_DTYPE
+from kline_stream import KlineRingBuffer, KlineStream
+
+HOUR = 60 * 60 * 1000
+
+
+def candle(open_time, price):
+    return open_time, price, price + 1, price - 1, price + 0.5, 10.0, open_time + HOUR - 1
+
+
+def kline_message(symbol, open_time, price, closed):
+    return json.dumps({'stream': f'{symbol.lower()}@kline_1h', 'data': {
+        'e': 'kline', 'E': open_time, 's': symbol, 'k': {
+            't': open_time, 'T': open_time + HOUR - 1, 's': symbol, 'i': '1h', 'o': str(price),
+            'c': str(price + 0.5), 'h': str(price + 1), 'l': str(price - 1), 'v': '10.0', 'x': closed}}})
+
+
+def test_ring_buffer_keeps_latest_candles():
+    buffer = KlineRingBuffer(capacity=3)
+    buffer.seed(np.array([candle(t * HOUR, 100.0) for t in range(5)], dtype=KLINE_DTYPE))
+    assert list(buffer.to_array()['open_time']) == [2 * HOUR, 3 * HOUR, 4 * HOUR]
+
+    assert not buffer.update(candle(4 * HOUR, 105.0))  # update of the open candle
+    assert not buffer.update(candle(1 * HOUR, 90.0))  # older than the buffer
+    assert buffer.update(candle(5 * HOUR, 106.0))
+
+    candles = buffer.to_array()
+    assert list(candles['open_time']) == [3 * HOUR, 4 * HOUR, 5 * HOUR]
+    assert list(candles['open']) == [100.0, 105.0, 106.0]
+
+
+def test_stream_from_local_server_calls_back_on_candle_close():
+    requested = list()
+
+    def handler(connection):
+        requested.append(connection.request.path)
+        connection.send(kline_message('BTCUSDT', 10 * HOUR, 110.0, closed=False))
+        connection.send(json.dumps({'stream': 'btcusdt@bookTicker', 'data': {
+            'e': 'bookTicker', 's': 'BTCUSDT', 'b': '110.1', 'B': '2', 'a': '110.2', 'A': '3', 'T': 1}}))
+        connection.send(kline_message('BTCUSDT', 10 * HOUR, 111.0, closed=True))
+        connection.send(kline_message('ETHUSDT', 10 * HOUR, 11.0, closed=True))
+        for _ in connection:
+            pass
+
+    closed = list()
+    done = threading.Event()
+
+    def on_candle_close(symbol, interval, candles):
+        closed.append((symbol, interval, candles))
+        if len(closed) == 2:
+            done.set()
+
+    def history(symbol, interval):
+        return np.array([candle(t * HOUR, 100.0 + t) for t in range(10)], dtype=KLINE_DTYPE)
+
+    with serve(handler, '127.0.0.1', 0) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.socket.getsockname()[1]
+
+        stream = KlineStream(['BTCUSDT', 'ETHUSDT'], ['1h'], on_candle_close=on_candle_close, history=history,
+                             transport=partial(connect, proxy=None),
+                             base_url=f'ws://127.0.0.1:{port}/stream?streams=')
+        stream.start()
+        try:
+            assert done.wait(10)
+        finally:
+            stream.stop()
+            server.shutdown()
+
+    assert requested == ['/stream?streams=btcusdt@kline_1h/btcusdt@bookTicker/ethusdt@kline_1h/ethusdt@bookTicker']
+    assert [(symbol, interval) for symbol, interval, _ in closed] == [('BTCUSDT', '1h'), ('ETHUSDT', '1h')]
+
+    candles = closed[0][2]
+    assert len(candles) == 11 and candles['open_time'][-1] == 10 * HOUR and candles['open'][-1] == 111.0
+    assert stream.book_ticker('BTCUSDT')['bid'] == 110.1 and stream.book_ticker('BTCUSDT')['ask'] == 110.2
@@ -0,0 +1,78 @@
+import logging
+import threading
+
+import pytest
+
+import log_setup
+from log_setup import LogPipeline
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []  # (thread name, message)
+
+    def emit(self, record):
+        self.lines.append((threading.current_thread().name, self.format(record)))
+
+
+class Formatted:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return self.text
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    for name in (log_setup.ANALYSIS, log_setup.FETCH):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+
+def test_records_are_formatted_by_the_listener_thread(restore_root_logger):
+    handler = RecordingHandler()
+    pipeline = LogPipeline([handler], level='INFO', levels={log_setup.ANALYSIS: 'DEBUG'})
+    pipeline.start()
+
+    rejected = Formatted('BTCUSDT')
+    fetched = Formatted('ETHUSDT')
+    logging.getLogger(log_setup.ANALYSIS).debug('Pattern rejected for %s', rejected)
+    logging.getLogger(log_setup.FETCH).debug('Fetched %s', fetched)
+    logging.getLogger(log_setup.FETCH).info('Fetched %s', fetched)
+    pipeline.stop()
+
+    assert [message for thread, message in handler.lines] == ['Pattern rejected for BTCUSDT', 'Fetched ETHUSDT']
+    assert all(thread != threading.current_thread().name for thread, message in handler.lines)
+    assert (rejected.calls, fetched.calls) == (1, 1)
+
+    # written directly after the listener stopped
+    logging.getLogger(log_setup.FETCH).warning('late')
+    assert handler.lines[-1] == (threading.current_thread().name, 'late')
+
+
+def test_rejected_patterns_are_only_logged_at_debug_level(restore_root_logger, zigzag_df):
+    from elliott_wave_trading_system import ElliottWaveTradingSystem
+
+    df = zigzag_df(300, seed=3)
+    rejected = []
+    for levels in (None, {log_setup.ANALYSIS: 'DEBUG'}):
+        handler = RecordingHandler()
+        pipeline = LogPipeline([handler], level='INFO', levels=levels)
+        pipeline.start()
+        ElliottWaveTradingSystem().analyze_dataframe(df, 'BTCUSDT', '1h')
+        pipeline.stop()
+
+        assert handler.lines
+        rejected.append(sum('rejected' in message for thread, message in handler.lines))
+    assert rejected[0] == 0 and rejected[1] > 0
@@ -0,0 +1,36 @@
+from market_snapshot import MarketSnapshot
+
+
+def ticker(symbol, last_price, quote_volume):
+    return {'symbol': symbol, 'lastPrice': str(last_price), 'quoteVolume': str(quote_volume),
+            'priceChangePercent': '1.5', 'volume': '0'}
+
+
+def book_ticker(symbol, bid, ask):
+    return {'symbol': symbol, 'bidPrice': str(bid), 'bidQty': '1', 'askPrice': str(ask), 'askQty': '1', 'time': 1}
+
+
+def test_filters_are_answered_from_one_refresh():
+    requests = list()
+
+    def tickers():
+        requests.append('ticker')
+        return [ticker('BTCUSDT', 64000, 5e9), ticker('THINUSDT', 1.0, 2e5), ticker('WIDEUSDT', 1.0, 5e7),
+                ticker('NEWUSDT', 1.0, 5e7)]
+
+    def book_tickers():
+        requests.append('bookTicker')
+        return [book_ticker('BTCUSDT', 63999.9, 64000.0), book_ticker('THINUSDT', 0.999, 1.0),
+                book_ticker('WIDEUSDT', 0.99, 1.0), book_ticker('DELISTEDUSDT', 1.0, 1.1)]
+
+    snapshot = MarketSnapshot(tickers, book_tickers, clock=lambda: 10.0)
+    assert snapshot.age is None and snapshot.passes_filters('BTCUSDT', 1e6, 0.001) is None
+
+    assert snapshot.refresh() == 4
+    results = {symbol: snapshot.passes_filters(symbol, 1e6, 0.001)
+               for symbol in ('BTCUSDT', 'THINUSDT', 'WIDEUSDT', 'NEWUSDT', 'DELISTEDUSDT')}
+
+    assert results == {'BTCUSDT': True, 'THINUSDT': False, 'WIDEUSDT': False, 'NEWUSDT': True, 'DELISTEDUSDT': None}
+    assert snapshot.get('NEWUSDT')['spread'] is None
+    assert snapshot.get('BTCUSDT')['bid'] == 63999.9 and snapshot.age == 0
+    assert requests == ['ticker', 'bookTicker']
@@ -0,0 +1,55 @@
+import json
+import urllib.request
+
+import pytest
+
+from metrics import MetricsRegistry, MetricsServer, JsonDumper
+
+
+def test_prometheus_text_of_counters_and_histograms():
+    registry = MetricsRegistry()
+    options = registry.counter('options_total', 'Options searched', ('symbol',))
+    latency = registry.histogram('fetch_seconds', 'Fetch latency', ('symbol',), buckets=(0.1, 1.0))
+
+    options.inc(100, symbol='BTCUSDT')
+    options.inc(50, symbol='BTCUSDT')
+    latency.observe(0.05, symbol='BTCUSDT')
+    latency.observe(0.5, symbol='BTCUSDT')
+    latency.observe(2.0, symbol='BTCUSDT')
+
+    assert registry.render().splitlines() == [
+        '# HELP options_total Options searched',
+        '# TYPE options_total counter',
+        'options_total{symbol="BTCUSDT"} 150',
+        '# HELP fetch_seconds Fetch latency',
+        '# TYPE fetch_seconds histogram',
+        'fetch_seconds_bucket{symbol="BTCUSDT",le="0.1"} 1',
+        'fetch_seconds_bucket{symbol="BTCUSDT",le="1.0"} 2',
+        'fetch_seconds_bucket{symbol="BTCUSDT",le="+Inf"} 3',
+        'fetch_seconds_sum{symbol="BTCUSDT"} 2.55',
+        'fetch_seconds_count{symbol="BTCUSDT"} 3',
+    ]
+    assert registry.counter('options_total', 'Options searched', ('symbol',)) is options
+    with pytest.raises(ValueError):
+        options.inc(symbol='BTCUSDT', interval='1h')
+
+
+def test_endpoint_and_json_dump(tmp_path):
+    registry = MetricsRegistry()
+    registry.histogram('analysis_seconds', 'Analysis time', ('symbol', 'interval')).observe(
+        0.02, symbol='ETHUSDT', interval='4h')
+
+    server = MetricsServer(port=0, registry=registry).start()
+    try:
+        url = f'http://{server.host}:{server.port}'
+        with urllib.request.urlopen(f'{url}/metrics') as response:
+            assert 'analysis_seconds_count{symbol="ETHUSDT",interval="4h"} 1' in response.read().decode()
+        with urllib.request.urlopen(f'{url}/metrics.json') as response:
+            assert json.load(response)['analysis_seconds']['values'][0]['count'] == 1
+    finally:
+        server.stop()
+
+    path = tmp_path / 'metrics.json'
+    dumper = JsonDumper(str(path), interval=3600, registry=registry).start()
+    dumper.stop()  # writes a last dump
+    assert json.loads(path.read_text())['analysis_seconds']['values'][0]['mean'] == pytest.approx(0.02)
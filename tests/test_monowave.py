@@ -1,4 +1,5 @@
-from models.MonoWave import MonoWaveUp
+from models.MonoWave import MonoWaveUp, MonoWaveDown
+from models.MonoWaveIndex import MonoWaveIndex
 import numpy as np
 
 
@@ -9,4 +10,38 @@ def test_monowave_instance_is_created():
 
     monowave_up = MonoWaveUp(lows, highs, dates, 0)
 
-    assert isinstance(monowave_up, MonoWaveUp)
\ No newline at end of file
+    assert isinstance(monowave_up, MonoWaveUp)
+
+
+def test_monowave_dates_are_looked_up_by_index():
+    lows = np.array([1.0, 2.0, 3.0, 2.5, 2.0])
+    highs = lows + 0.5
+    dates = np.array(['d0', 'd1', 'd2', 'd3', 'd4'])
+
+    monowave_up = MonoWaveUp(lows, highs, dates, 0)
+
+    assert not hasattr(monowave_up, '__dict__')
+    assert monowave_up.dates == ['d0', 'd2']
+
+
+def test_index_answers_like_find_end(zigzag_df):
+    df = zigzag_df(200)
+    lows, highs = df['Low'].to_numpy(), df['High'].to_numpy()
+
+    def expected(n):
+        return [(MonoWaveUp(lows[:n], highs[:n], None, idx, skip).points,
+                 MonoWaveDown(lows[:n], highs[:n], None, idx, skip).points)
+                for idx in range(n) for skip in range(6)]
+
+    # the index follows a growing series like in StreamingWaveAnalyzer
+    index = MonoWaveIndex(lows[:150], highs[:150])
+    index.build(max_skip=5)
+    for first_changed, n in ((149, 150), (150, 151), (151, 200)):
+        index.update(lows[:n], highs[:n], first_changed)
+        found = list()
+        for idx in range(n):
+            for skip in range(6):
+                high, high_idx = index.up_end(idx, skip)
+                low, low_idx = index.down_end(idx, skip)
+                found.append(((lows[idx], high), (highs[idx], low)))
+        assert found == expected(n)
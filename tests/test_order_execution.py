@@ -0,0 +1,139 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from order_execution import OrderExecutionEngine
+from symbol_rules import SymbolRules
+
+RULES = SymbolRules({'symbol': 'BTCUSDT', 'filters': [
+    {'filterType': 'PRICE_FILTER', 'tickSize': '0.10'}, {'filterType': 'LOT_SIZE', 'stepSize': '0.001'}]})
+
+
+class MockExchange:
+    """Local stand-in for the futures order endpoints of the Binance client, every request takes `latency` s"""
+
+    def __init__(self, latency=0.05, fill_in_response=True, on_fill=None, reject=()):
+        self.latency = latency
+        self.fill_in_response = fill_in_response
+        self.on_fill = on_fill
+        self.reject = reject
+        self.requests = list()
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def request(self, name, params):
+        with self.lock:
+            self.requests.append((name, params))
+        time.sleep(self.latency)
+
+    def futures_create_order(self, **params):
+        self.request('order', params)
+        if params['type'] in self.reject:
+            raise RuntimeError('APIError(code=-2021): Order would immediately trigger.')
+        if params['type'] != 'MARKET':
+            return {'algoId': next(self.ids), 'algoStatus': 'NEW', 'type': params['type']}
+
+        order_id = next(self.ids)
+        if self.fill_in_response:
+            return {'orderId': order_id, 'status': 'FILLED', 'executedQty': str(params['quantity']),
+                    'avgPrice': '64000.5', 'cumQuote': str(64000.5 * params['quantity'])}
+
+        threading.Timer(self.latency, self.on_fill, [{'e': 'ORDER_TRADE_UPDATE', 'o': {
+            'i': order_id, 's': params['symbol'], 'X': 'FILLED', 'ap': '63990.0', 'z': str(params['quantity'])}}]).start()
+        return {'orderId': order_id, 'status': 'NEW', 'executedQty': '0', 'avgPrice': '0', 'cumQuote': '0'}
+
+    def futures_place_batch_order(self, batchOrders):
+        self.request('batchOrders', batchOrders)
+        return [{'code': -2021, 'msg': 'Order would immediately trigger.'} if order['type'] in self.reject
+                else {'orderId': next(self.ids), 'status': 'NEW', 'type': order['type']} for order in batchOrders]
+
+    def futures_get_order(self, **params):
+        self.request('get_order', params)
+        if 'get_order' in self.reject:
+            raise ConnectionError('Connection aborted.')
+        return {'orderId': params['orderId'], 'status': 'FILLED', 'executedQty': '0.01', 'avgPrice': '63000.0'}
+
+    def futures_mark_price(self, **params):
+        self.request('mark_price', params)
+        return {'symbol': params['symbol'], 'markPrice': '63500.00000000'}
+
+
+def test_bracket_is_placed_concurrently_with_fill_from_response():
+    exchange = MockExchange()
+    engine = OrderExecutionEngine(exchange)
+    try:
+        execution = engine.open_position('BTCUSDT', 'BUY', 0.01, RULES, 0.02, 0.04, reference_price=64100.0)
+    finally:
+        engine.shutdown()
+
+    assert execution['entry_price'] == 64000.5 and execution['fill_source'] == 'response'
+    assert (execution['stop_loss'], execution['take_profit']) == (62720.5, 66560.5)
+    assert execution['sl_order_id'] is not None and execution['tp_order_id'] is not None
+    assert execution['errors'] == []
+
+    assert [name for name, _ in exchange.requests] == ['order', 'order', 'order']
+    assert exchange.requests[0][1]['newOrderRespType'] == 'RESULT'
+    # both legs in flight at once: one request latency, not two
+    assert execution['latency_ms']['bracket'] < 90
+    assert set(execution['latency_ms']) == {'entry', 'fill', 'bracket', 'total'}
+    assert engine.average_latency_ms()['total'] == execution['latency_ms']['total']
+
+
+@pytest.mark.parametrize('use_batch_orders', [False, True])
+def test_failed_leg_is_reported(use_batch_orders):
+    exchange = MockExchange(latency=0.0, reject=('TAKE_PROFIT_MARKET',))
+    engine = OrderExecutionEngine(exchange, use_batch_orders=use_batch_orders)
+    try:
+        execution = engine.open_position('BTCUSDT', 'SELL', 0.01, RULES, 0.02, 0.04)
+    finally:
+        engine.shutdown()
+
+    assert (execution['stop_loss'], execution['take_profit']) == (65280.5, 61440.5)
+    assert execution['sl_order_id'] is not None and execution['tp_order_id'] is None
+    assert len(execution['errors']) == 1 and execution['errors'][0].startswith('TAKE_PROFIT_MARKET')
+    if use_batch_orders:
+        assert [name for name, _ in exchange.requests] == ['order', 'batchOrders']
+        assert exchange.requests[1][1][0] == {'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'STOP_MARKET',
+                                              'stopPrice': '65280.5', 'closePosition': 'true'}
+
+
+def test_fill_from_user_data_stream_without_polling():
+    exchange = MockExchange(fill_in_response=False)
+    engine = OrderExecutionEngine(exchange, fill_timeout=2.0)
+    exchange.on_fill = engine.on_order_update
+    try:
+        execution = engine.open_position('BTCUSDT', 'BUY', 0.01, RULES, 0.02, 0.04)
+    finally:
+        engine.shutdown()
+
+    assert execution['entry_price'] == 63990.0 and execution['fill_source'] == 'stream'
+    assert 'get_order' not in [name for name, _ in exchange.requests]
+
+
+def test_entry_is_polled_if_stream_is_silent():
+    exchange = MockExchange(latency=0.0, fill_in_response=False, on_fill=lambda event: None)
+    engine = OrderExecutionEngine(exchange, fill_timeout=0.05)
+    try:
+        execution = engine.open_position('BTCUSDT', 'BUY', 0.01, RULES, 0.02, 0.04)
+    finally:
+        engine.shutdown()
+
+    assert execution['entry_price'] == 63000.0 and execution['fill_source'] == 'poll'
+
+
+@pytest.mark.parametrize('reference_price, fill_source, entry_price', [(64100.0, 'reference', 64100.0),
+                                                                       (None, 'mark', 63500.0)])
+def test_bracket_is_placed_if_the_poll_fails(reference_price, fill_source, entry_price):
+    exchange = MockExchange(latency=0.0, fill_in_response=False, on_fill=lambda event: None, reject=('get_order',))
+    engine = OrderExecutionEngine(exchange, fill_timeout=0.01)
+    try:
+        execution = engine.open_position('BTCUSDT', 'BUY', 0.01, RULES, 0.02, 0.04, reference_price=reference_price)
+    finally:
+        engine.shutdown()
+
+    assert execution['entry_price'] == entry_price and execution['fill_source'] == fill_source
+    assert execution['sl_order_id'] is not None and execution['tp_order_id'] is not None
+    assert sorted(params['type'] for name, params in exchange.requests if name == 'order') == [
+        'MARKET', 'STOP_MARKET', 'TAKE_PROFIT_MARKET']
@@ -0,0 +1,32 @@
+from models.ParallelWaveAnalyzer import ParallelWaveAnalyzer
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WaveOptions import WaveOptionsGenerator5
+from models.WavePattern import WavePattern
+from models.WaveRules import Impulse, LeadingDiagonal
+
+
+def test_parallel_search_matches_serial_search(zigzag_df):
+    wa = WaveAnalyzer(zigzag_df(n=400, seed=5))
+    options = list(WaveOptionsGenerator5(10).iter_sorted(limit=200))
+    rules = [Impulse('impulse'), LeadingDiagonal('leading_diagonal')]
+    starts = range(0, 380, 5)
+
+    expected = [(idx_start, option.values, WavePattern(waves).values, [rule.name for rule in passed_rules])
+                for idx_start in starts for option, waves, passed_rules in wa.find_impulsive_waves(idx_start, options,
+                                                                                                   rules)]
+
+    parallel = ParallelWaveAnalyzer(workers=2)
+    try:
+        found = [(idx_start, option.values, WavePattern(waves).values, [rule.name for rule in passed_rules])
+                 for idx_start, patterns in parallel.find_impulsive_waves(wa, starts, options, rules)
+                 for option, waves, passed_rules in patterns]
+
+        # stopping early releases the shared memory of the search
+        search = parallel.find_impulsive_waves(wa, starts, options, rules)
+        next(search)
+        search.close()
+    finally:
+        parallel.shutdown()
+
+    assert len(expected) > 0
+    assert found == expected
@@ -0,0 +1,113 @@
+import json
+import threading
+from functools import partial
+
+import pytest
+from websockets.sync.client import connect
+from websockets.sync.server import serve
+
+from position_tracker import PositionTracker, UserDataStream
+
+
+def account_update(time, symbol, amount, entry_price, unrealized_pnl=0.0):
+    return {'e': 'ACCOUNT_UPDATE', 'E': time, 'T': time, 'a': {
+        'm': 'ORDER', 'B': [{'a': 'USDT', 'wb': '1000.0', 'cw': '1000.0', 'bc': '0'}],
+        'P': [{'s': symbol, 'pa': str(amount), 'ep': str(entry_price), 'up': str(unrealized_pnl), 'mt': 'cross',
+               'ps': 'BOTH'}]}}
+
+
+def order_update(time, order_id, symbol, order_type, status, avg_price, realized_pnl=0.0, fee=0.0):
+    return {'e': 'ORDER_TRADE_UPDATE', 'E': time, 'T': time, 'o': {
+        's': symbol, 'S': 'SELL', 'o': 'MARKET', 'ot': order_type, 'X': status, 'i': order_id, 'ap': str(avg_price),
+        'sp': '0', 'z': '0.01', 'rp': str(realized_pnl), 'n': str(fee), 'N': 'USDT', 'T': time}}
+
+
+def test_positions_follow_stream_events():
+    closed, order_events = list(), list()
+    tracker = PositionTracker(on_position_closed=lambda symbol, position: closed.append((symbol, position)),
+                              on_order_update=order_events.append)
+
+    tracker.handle_event(order_update(1, 10, 'BTCUSDT', 'MARKET', 'FILLED', 64000.0, fee=0.25))
+    tracker.handle_event(account_update(2, 'BTCUSDT', 0.01, 64000.0))
+    assert tracker.position('BTCUSDT')['amount'] == 0.01 and tracker.balances['USDT'] == 1000.0
+
+    tracker.update_mark_price('BTCUSDT', 64500.0)
+    assert tracker.unrealized_pnl() == pytest.approx(5.0)
+
+    # an older update does not overwrite newer state
+    tracker.handle_event(account_update(1, 'BTCUSDT', 0.02, 63000.0))
+    assert tracker.position('BTCUSDT')['amount'] == 0.01
+
+    # take profit triggered
+    tracker.handle_event(order_update(5, 11, 'BTCUSDT', 'TAKE_PROFIT_MARKET', 'FILLED', 66000.0, 20.0, 0.25))
+    tracker.handle_event(account_update(5, 'BTCUSDT', 0, 0))
+
+    assert tracker.position('BTCUSDT') is None
+    assert [symbol for symbol, _ in closed] == ['BTCUSDT'] and closed[0][1]['realized_pnl'] == pytest.approx(19.75)
+    assert tracker.realized_pnl == pytest.approx(19.5)
+    assert tracker.order(11)['type'] == 'TAKE_PROFIT_MARKET' and tracker.order(11)['status'] == 'FILLED'
+    assert len(order_events) == 2
+
+
+def test_reconcile_repairs_missed_events():
+    closed = list()
+    tracker = PositionTracker(on_position_closed=lambda symbol, position: closed.append(symbol))
+    tracker.handle_event(account_update(100, 'ETHUSDT', 1.0, 3000.0))
+    tracker.handle_event(account_update(300, 'SOLUSDT', 5.0, 150.0))
+
+    changed = tracker.reconcile([
+        {'symbol': 'BTCUSDT', 'positionAmt': '0.01', 'entryPrice': '64000', 'unRealizedProfit': '1.5',
+         'updateTime': 150},
+        {'symbol': 'XRPUSDT', 'positionAmt': '0', 'entryPrice': '0', 'unRealizedProfit': '0', 'updateTime': 0},
+    ], snapshot_time=200)
+
+    # ETHUSDT was closed while disconnected, SOLUSDT opened after the snapshot was requested
+    assert sorted(changed) == ['BTCUSDT', 'ETHUSDT'] and closed == ['ETHUSDT']
+    assert tracker.position('BTCUSDT')['unrealized_pnl'] == 1.5
+    assert tracker.position('SOLUSDT')['amount'] == 5.0
+
+
+class FakeClient:
+    def __init__(self):
+        self.listen_keys = list()
+
+    def futures_stream_get_listen_key(self):
+        self.listen_keys.append(f'key{len(self.listen_keys)}')
+        return self.listen_keys[-1]
+
+    def futures_position_information(self):
+        return [{'symbol': 'ETHUSDT', 'positionAmt': '1.0', 'entryPrice': '3000', 'unRealizedProfit': '0',
+                 'updateTime': 0}]
+
+
+def test_stream_from_local_server_reconnects_on_expired_listen_key():
+    paths = list()
+
+    def handler(connection):
+        paths.append(connection.request.path)
+        if len(paths) == 1:
+            connection.send(json.dumps({'e': 'listenKeyExpired', 'E': 1}))
+        else:
+            connection.send(json.dumps(account_update(10 ** 15, 'ETHUSDT', 0, 0)))
+        for _ in connection:
+            pass
+
+    closed = threading.Event()
+    tracker = PositionTracker(on_position_closed=lambda symbol, position: closed.set())
+
+    with serve(handler, '127.0.0.1', 0) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.socket.getsockname()[1]
+
+        client = FakeClient()
+        stream = UserDataStream(client, tracker, transport=partial(connect, proxy=None),
+                                base_url=f'ws://127.0.0.1:{port}/ws/')
+        stream.start()
+        try:
+            assert closed.wait(10)
+        finally:
+            stream.stop()
+            server.shutdown()
+
+    assert paths == ['/ws/key0', '/ws/key1']
+    assert tracker.position('ETHUSDT') is None and stream.last_reconcile is not None
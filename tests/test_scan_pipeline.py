@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from scan_pipeline import RateLimiter, ScanPipeline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = list()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_rate_limiter_waits_for_tokens():
+    clock = FakeClock()
+    limiter = RateLimiter(weight_per_minute=600, burst=20, clock=clock, sleep=clock.sleep)
+
+    assert limiter.acquire(15) == 0
+    assert limiter.acquire(5) == 0
+    assert limiter.acquire(10) == pytest.approx(1.0)  # 10 tokens per second
+    clock.now += 0.5
+    assert limiter.acquire(5) == 0
+    assert limiter.acquire(1) == pytest.approx(0.1)
+
+
+def scale(data, symbol, interval):
+    return data * 2
+
+
+@pytest.mark.parametrize('analysis_workers', [0, 2])
+def test_sink_gets_results_in_order(analysis_workers):
+    pairs = [(symbol, interval) for symbol in ('BTCUSDT', 'ETHUSDT', 'SOLUSDT') for interval in ('1h', '4h')]
+    delays = [0.3, 0.05, 0.2, 0.0, 0.1, 0.25]
+
+    def fetch(symbol, interval):
+        pair_no = pairs.index((symbol, interval))
+        time.sleep(delays[pair_no])
+        if symbol == 'ETHUSDT' and interval == '4h':
+            raise ValueError('Invalid symbol')
+        if symbol == 'SOLUSDT' and interval == '1h':
+            return None
+        return pair_no
+
+    received = list()
+    pipeline = ScanPipeline(fetch, analyze=scale, fetch_workers=len(pairs), analysis_workers=analysis_workers)
+    try:
+        scan_time = pipeline.run(pairs, lambda *args: received.append(args))
+    finally:
+        pipeline.shutdown()
+
+    assert [(symbol, interval, result) for symbol, interval, result, _ in received] == [
+        ('BTCUSDT', '1h', 0), ('BTCUSDT', '4h', 2), ('ETHUSDT', '1h', 4), ('ETHUSDT', '4h', None),
+        ('SOLUSDT', '1h', None), ('SOLUSDT', '4h', 10)]
+    assert [type(error) for *_, error in received] == [type(None)] * 3 + [ValueError] + [type(None)] * 2
+
+    if analysis_workers == 0:
+        # bounded by the slowest pair, not the sum of all
+        assert scan_time < sum(delays)
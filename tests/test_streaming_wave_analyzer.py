@@ -0,0 +1,66 @@
+from models.StreamingWaveAnalyzer import StreamingWaveAnalyzer
+from models.functions import atr_swing
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WaveOptions import WaveOptionsGenerator5
+from models.WavePattern import WavePattern
+from models.WaveRules import Impulse, LeadingDiagonal
+
+
+def test_append_matches_full_search(zigzag_df):
+    df = zigzag_df(n=400, seed=3)
+    options = list(WaveOptionsGenerator5(10).iter_sorted(limit=200))
+    rules = [Impulse('impulse'), LeadingDiagonal('leading_diagonal')]
+
+    def key(idx_start, option, waves, passed_rules):
+        return idx_start, tuple(option.values), WavePattern(waves).values, [rule.name for rule in passed_rules]
+
+    stream = StreamingWaveAnalyzer(df.iloc[:250], options, rules, lookback=150, step=5)
+    found = {key(*pattern)[:2]: key(*pattern) for pattern in stream.patterns()}
+
+    for n, candle in enumerate(df.iloc[250:].to_dict('records'), start=251):
+        # an update of the still open candle first, then the closed one
+        for pattern in stream.append(dict(candle, High=candle['Low'])) + stream.append(candle):
+            found[key(*pattern)[:2]] = key(*pattern)
+
+        wa = WaveAnalyzer(df.iloc[:n])
+        expected = [key(idx_start, *pattern) for idx_start in sorted(stream.states)
+                    for pattern in wa.find_impulsive_waves(idx_start, options, rules)]
+
+        assert [key(*pattern) for pattern in stream.patterns()] == expected
+        assert all(found[pattern[:2]] == pattern for pattern in expected)
+
+
+def test_pivot_starts_follow_the_stream(zigzag_df):
+    df = zigzag_df(n=300, seed=4)
+    options = list(WaveOptionsGenerator5(5).iter_sorted(limit=50))
+    rules = [Impulse('impulse')]
+
+    stream = StreamingWaveAnalyzer(df.iloc[:200], options, rules, lookback=100, pivot_atr=1.)
+    for n, candle in enumerate(df.iloc[200:].to_dict('records'), start=201):
+        stream.append(candle)
+        wa = WaveAnalyzer(df.iloc[:n])
+        assert sorted(stream.states) == wa.pivot_starts(n - 100, n, min_swing=atr_swing(wa.lows, wa.highs,
+                                                                                         multiple=1.))
+
+
+def test_old_candles_are_dropped_and_indices_move_down(zigzag_df):
+    df = zigzag_df(n=500, seed=3)
+    options = list(WaveOptionsGenerator5(5).iter_sorted(limit=50))
+    rules = [Impulse('impulse')]
+
+    def key(idx_start, option, waves, passed_rules):
+        return idx_start, tuple(option.values), WavePattern(waves).values, [rule.name for rule in passed_rules]
+
+    stream = StreamingWaveAnalyzer(df.iloc[:100], options, rules, lookback=50, step=5, history=20)
+    for n, candle in enumerate(df.iloc[100:].to_dict('records'), start=101):
+        stream.append(candle)
+        assert stream.n <= 140 and len(stream.index.up) <= 280
+        assert stream.dropped % 5 == 0 and stream.dates[-1] == candle['Date']
+
+        wa = WaveAnalyzer(df.iloc[stream.dropped:n])
+        expected = [key(idx_start, *pattern) for idx_start in sorted(stream.states)
+                    for pattern in wa.find_impulsive_waves(idx_start, options, rules)]
+        assert [key(*pattern) for pattern in stream.patterns()] == expected
+        assert sorted(stream.states) == list(range(-(-(n - stream.dropped - 50) // 5) * 5, n - stream.dropped, 5))
+
+    assert stream.dropped > 300
@@ -0,0 +1,65 @@
+import pytest
+
+from symbol_rules import SymbolRulesCache, decimal_places
+
+
+def symbol_info(symbol, step_size='0.001', tick_size='0.10', notional='100', status='TRADING'):
+    return {'symbol': symbol, 'status': status, 'contractType': 'PERPETUAL', 'baseAsset': symbol[:-4],
+            'quoteAsset': 'USDT', 'pricePrecision': 2, 'quantityPrecision': 3, 'filters': [
+                {'filterType': 'PRICE_FILTER', 'minPrice': '556.80', 'maxPrice': '4529764', 'tickSize': tick_size},
+                {'filterType': 'LOT_SIZE', 'stepSize': step_size, 'maxQty': '1000', 'minQty': step_size},
+                {'filterType': 'MIN_NOTIONAL', 'notional': notional}]}
+
+
+class FakeExchange:
+    def __init__(self):
+        self.calls = 0
+        self.now = 0.0
+        self.fail = False
+
+    def exchange_info(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError('timeout')
+        return {'symbols': [symbol_info('BTCUSDT'), symbol_info('DOGEUSDT', '1', '0.000010', '5'),
+                            symbol_info('OLDUSDT', status='SETTLING')]}
+
+
+def test_rules_are_precomputed_per_symbol():
+    assert decimal_places('0.00100000') == 3 and decimal_places('1') == 0 and decimal_places('10.0') == 0
+
+    exchange = FakeExchange()
+    cache = SymbolRulesCache(exchange.exchange_info)
+
+    btc = cache.get('BTCUSDT')
+    assert (btc.step_size, btc.tick_size, btc.min_notional) == (0.001, 0.1, 100.0)
+    assert (btc.quantity_precision, btc.price_precision) == (3, 1)
+    assert btc.round_quantity(0.0129) == 0.012
+    assert btc.round_price(64123.456) == 64123.5
+
+    doge = cache.get('DOGEUSDT')
+    assert doge.round_quantity(1234.9) == 1234 and doge.round_price(0.1234567) == 0.12346
+
+    assert cache.get('XYZUSDT') is None
+    assert cache.symbols() == ['BTCUSDT', 'DOGEUSDT']
+    assert exchange.calls == 1
+
+
+def test_rules_are_refreshed_on_ttl():
+    exchange = FakeExchange()
+    cache = SymbolRulesCache(exchange.exchange_info, ttl=60, clock=lambda: exchange.now)
+
+    assert 'BTCUSDT' in cache
+    exchange.now = 59
+    assert 'BTCUSDT' in cache and exchange.calls == 1
+    exchange.now = 60
+    assert 'BTCUSDT' in cache and exchange.calls == 2
+
+    # the last known rules are kept if a refresh fails
+    exchange.fail = True
+    exchange.now = 200
+    assert cache.get('BTCUSDT').tick_size == 0.1 and exchange.calls == 3
+    assert 'BTCUSDT' in cache and exchange.calls == 3
+
+    with pytest.raises(ConnectionError):
+        SymbolRulesCache(exchange.exchange_info).get('BTCUSDT')
@@ -0,0 +1,20 @@
+from elliott_wave_trading_system import ElliottWaveTradingSystem
+
+
+def test_time_budget_searches_the_lowest_starts_first(zigzag_df):
+    df = zigzag_df(n=500, seed=3)
+    system = ElliottWaveTradingSystem()
+
+    unlimited = system.analyze_dataframe(df, 'TEST', time_budget_ms=60_000)
+    assert unlimited['coverage'] == 1.0
+    assert unlimited['stats']['options_evaluated'] == 100 * len(range(350, 475, 5))
+    assert unlimited['stats']['patterns_passed']['impulse'] >= len(unlimited['bullish_patterns']) > 0
+    confidences = [signal['confidence'] for signal in unlimited['signals']]
+    assert confidences == sorted(confidences, reverse=True)
+
+    # out of time after the first start index: the lowest one
+    first = system.analyze_dataframe(df, 'TEST', time_budget_ms=0)
+    assert 0 < first['coverage'] < 1
+    lowest = min(range(350, 475, 5), key=lambda idx: df['Low'][idx])
+    assert len(first['signals']) > 0
+    assert {pattern['start_idx'] for pattern in first['bullish_patterns']} == {lowest}
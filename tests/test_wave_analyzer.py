@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WaveOptions import WaveOptionsGenerator5, WaveOptionsGenerator3
+from models.WavePattern import WavePattern
+from models.PatternIndex import PatternIndex
+from models.WaveRules import Impulse, Correction
+
+
+def test_find_impulsive_waves_matches_single_option_search(zigzag_df):
+    wa = WaveAnalyzer(zigzag_df())
+    options = WaveOptionsGenerator5(5).options_sorted
+    impulse = Impulse('impulse')
+
+    for idx_start in range(0, 250, 25):
+        expected = list()
+        for option in options:
+            waves = wa.find_impulsive_wave(idx_start, option.values)
+            if waves and WavePattern(waves).check_rule(impulse):
+                expected.append((option.values, WavePattern(waves).values))
+
+        found = [(option.values, WavePattern(waves).values)
+                 for option, waves, _ in wa.find_impulsive_waves(idx_start, options, [impulse])]
+
+        assert found == expected
+
+
+def test_find_corrective_waves_matches_single_option_search(zigzag_df):
+    wa = WaveAnalyzer(zigzag_df(seed=1))
+    generator = WaveOptionsGenerator3(6)
+
+    for idx_start in range(0, 250, 25):
+        expected = [(option.values, WavePattern(waves).values) for option in generator.options_sorted
+                    if (waves := wa.find_corrective_wave(idx_start, option.values))]
+
+        found = [(option.values, WavePattern(waves).values)
+                 for option, waves, _ in wa.find_corrective_waves(idx_start, generator.table)]
+
+        assert found == expected
+
+
+def test_arrays_are_views_of_the_dataframe(zigzag_df):
+    df = zigzag_df()
+    df['Date'] = pd.date_range('2024-01-01', periods=len(df), freq='h', unit='ms')
+    wa = WaveAnalyzer(df)
+
+    assert np.shares_memory(wa.lows, df['Low'].to_numpy()) and np.shares_memory(wa.highs, df['High'].to_numpy())
+    assert wa.dates.dtype == np.dtype('datetime64[ms]')
+
+    waves = wa.find_impulsive_wave(0, [0, 0, 0, 0, 0])
+    assert waves[0].date_start == np.datetime64('2024-01-01T00:00')
+
+
+def test_pivots_are_the_ends_of_the_monowaves_without_skips(zigzag_df):
+    wa = WaveAnalyzer(zigzag_df(n=300, seed=5))
+    idx, kinds = wa.pivots()
+
+    assert (kinds[1:] != kinds[:-1]).all()
+    for start, end, kind in zip(idx[:-2], idx[1:-1], kinds[:-2]):
+        waves = wa.find_impulsive_wave(start, [0]) if kind == -1 else wa.find_corrective_wave(start, [0])
+        assert waves[0].idx_end == end
+
+    starts = wa.pivot_starts(100, 200)
+    assert starts == [i for i, kind in zip(idx, kinds) if kind == -1 and 100 <= i < 200]
+    assert len(wa.pivot_starts(100, 200, min_swing=np.ptp(wa.highs))) < len(starts)
+
+
+def test_unique_search_yields_the_first_option_of_each_pattern(zigzag_df):
+    # prices on a tick grid: equal highs / lows let different skips end in the same extremum
+    df = zigzag_df()
+    df[['Low', 'High']] = df[['Low', 'High']].round(1)
+    wa = WaveAnalyzer(df)
+    options = WaveOptionsGenerator5(4).table
+
+    duplicates = 0
+    for idx_start in range(0, 60, 10):
+        expected = PatternIndex()
+        for option, waves, _ in wa.find_impulsive_waves(idx_start, options):
+            duplicates += not expected.add(WavePattern(waves, wave_options=option))
+
+        found = [(option.values, WavePattern(waves).key)
+                 for option, waves, _ in wa.find_impulsive_waves(idx_start, options, unique=True)]
+        assert found == [(pattern.wave_options.values, pattern.key) for pattern in expected]
+    assert duplicates > 0
+
+
+def test_best_cycles_are_yielded_best_first(zigzag_df):
+    wa = WaveAnalyzer(zigzag_df(n=600, seed=7))
+    wa.set_combinatorial_limits(6, 6)
+
+    def score(pattern):
+        return pattern.waves['wave3'].length / pattern.waves['wave1'].length
+
+    def correction_score(pattern):
+        return 1 / (1 + pattern.waves['wave2'].length)
+
+    expected = dict()
+    for _, waves_up, _ in wa.find_impulsive_waves(0, WaveOptionsGenerator5(6).table, [Impulse('impulse')]):
+        impulse = WavePattern(waves_up)
+        for _, waves, _ in wa.find_corrective_waves(waves_up[-1].idx_end, WaveOptionsGenerator3(6).table,
+                                                    [Correction('correction')]):
+            correction = WavePattern(waves)
+            expected[impulse.key + correction.key] = score(impulse) * correction_score(correction)
+    assert len(expected) > 3
+
+    found = [(cycle.key, cycle_score) for cycle_score, cycle in wa.best_cycles(0, score, correction_score)]
+    assert dict(found) == expected and len(found) == len(expected)
+    assert [cycle_score for _, cycle_score in found] == sorted(expected.values(), reverse=True)
+
+    assert [(cycle.key, cycle_score) for cycle_score, cycle in wa.best_cycles(0, score, correction_score, k=3)] \
+        == found[:3]
+    assert list(wa.best_cycles(0, score, correction_score, time_budget=0.)) == []
+
+
+def test_best_cycles_stop_at_the_time_budget_without_cycles(zigzag_df, monkeypatch):
+    wa = WaveAnalyzer(zigzag_df(n=600, seed=7).iloc[:120])
+    wa.set_combinatorial_limits(6, 6)
+
+    searched = list()
+    find_corrective_waves = wa.find_corrective_waves
+    monkeypatch.setattr(wa, 'find_corrective_waves', lambda idx_start, *args, **kwargs: searched.append(idx_start)
+                        or find_corrective_waves(idx_start, *args, **kwargs))
+    assert list(wa.best_cycles(0)) == [] and len(searched) > 0  # impulses without a valid correction
+
+    searched.clear()
+    assert list(wa.best_cycles(0, time_budget=0.)) == []
+    assert searched == []
@@ -0,0 +1,25 @@
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WaveOptions import WaveOptionsGenerator5
+from models.WavePattern import WavePattern
+from models.WaveRuleEngine import WaveRuleEngine, WaveFeatures
+from models.WaveRules import Impulse, LeadingDiagonal
+
+
+def test_engine_agrees_with_check_rule(zigzag_df):
+    wa = WaveAnalyzer(zigzag_df(seed=2))
+    options = WaveOptionsGenerator5(4).table
+    rules = [Impulse('impulse'), LeadingDiagonal('leading diagonal')]
+
+    patterns = [WavePattern(waves) for idx_start in range(0, 250, 10)
+                for _, waves, _ in wa.find_impulsive_waves(idx_start, options)]
+
+    engine = WaveRuleEngine(rules)
+    passed = engine.check(WaveFeatures.from_patterns(patterns))
+
+    assert passed.shape == (len(patterns), 2)
+    assert passed[:, 0].any()
+    for pattern, row in zip(patterns, passed.tolist()):
+        assert row == [pattern.check_rule(rule) for rule in rules]
+
+    assert engine.no_checked == len(patterns)
+    assert engine.rejections['impulse']['w2_1'] >= 0
@@ -0,0 +1,27 @@
+from models.WaveOptions import WaveOptions, WaveOptionsGenerator5, WaveOptionsGenerator3, options_table
+
+
+def brute_force_options(up_to: int) -> list:
+    options = set()
+    for i in range(up_to):
+        for j in range(up_to):
+            for k in range(up_to):
+                if i == 0:
+                    j = k = 0
+                if j == 0:
+                    k = 0
+                options.add(WaveOptions(i, j, k, None, None))
+    return [option.values for option in sorted(options)]
+
+
+def test_options_table_is_sorted_and_complete():
+    assert [option.values for option in WaveOptionsGenerator3(6).options_sorted] == brute_force_options(6)
+    assert WaveOptionsGenerator5(4).number == 1 + 3 + 3 ** 2 + 3 ** 3 + 3 ** 4 + 3 ** 5
+
+
+def test_options_table_is_shared_and_persisted(tmp_path):
+    assert WaveOptionsGenerator5(6).table is WaveOptionsGenerator5(6).table
+
+    table = options_table(3, 9, cache_dir=str(tmp_path))
+    assert (tmp_path / 'waveoptions3_9.npy').exists()
+    assert not table.flags.writeable